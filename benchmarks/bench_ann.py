@@ -0,0 +1,88 @@
+"""Recall@k vs query latency of the approximate index types against the flat baseline.
+
+Run from the repository root:
+    python -m benchmarks.bench_ann [--embeddings kb_index/embeddings.npy] [--num-vectors 100000]
+
+Without --embeddings a synthetic clustered corpus of MiniLM-sized vectors is used,
+since the bundled PDFs are far too small for approximate search to matter.
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from knowledge_base import DEFAULT_INDEX_PARAMS, build_index, set_search_params
+
+
+def synthetic_corpus(num_vectors: int, dimension: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, num_vectors // 100), dimension)).astype('float32')
+    assignments = rng.integers(0, len(centers), num_vectors)
+    vectors = centers[assignments] + 0.5 * rng.standard_normal((num_vectors, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def timed_search(index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    return ids, 1000 * elapsed / len(queries)
+
+
+def recall_at_k(ids: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(ids, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--embeddings", help="a saved embeddings.npy to use instead of synthetic data")
+    parser.add_argument("--num-vectors", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--num-queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = np.array(np.load(args.embeddings), dtype='float32')
+        faiss.normalize_L2(corpus)
+    else:
+        corpus = synthetic_corpus(args.num_vectors, args.dimension)
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.integers(0, len(corpus), args.num_queries)].copy()
+    queries += 0.1 * rng.standard_normal(queries.shape).astype('float32')
+    faiss.normalize_L2(queries)
+    ids = np.arange(len(corpus), dtype='int64')
+    print(f"{len(corpus)} vectors x {corpus.shape[1]} dims, {len(queries)} queries, k={args.k}\n")
+
+    flat, _ = build_index(corpus, "flat", DEFAULT_INDEX_PARAMS)
+    flat.add_with_ids(corpus, ids)
+    truth, flat_latency = timed_search(flat, queries, args.k)
+
+    print(f"{'index':<10} {'setting':<14} {'build s':>8} {'ms/query':>9} {'recall@k':>9}")
+    print(f"{'flat':<10} {'-':<14} {'-':>8} {flat_latency:>9.3f} {1.0:>9.3f}")
+
+    sweeps = {
+        "ivf_flat": ("nprobe", [1, 4, 16, 64]),
+        "ivf_pq": ("nprobe", [1, 4, 16, 64]),
+        "hnsw": ("ef_search", [16, 32, 64, 128]),
+    }
+    for index_type, (knob, values) in sweeps.items():
+        start = time.perf_counter()
+        index, built_type = build_index(corpus, index_type, DEFAULT_INDEX_PARAMS)
+        index.add_with_ids(corpus, ids)
+        build_seconds = time.perf_counter() - start
+        if built_type != index_type:
+            print(f"{index_type:<10} skipped: corpus too small to train")
+            continue
+        for value in values:
+            set_search_params(index, built_type, **{knob: value})
+            found, latency = timed_search(index, queries, args.k)
+            print(f"{index_type:<10} {f'{knob}={value}':<14} {build_seconds:>8.2f} "
+                  f"{latency:>9.3f} {recall_at_k(found, truth):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
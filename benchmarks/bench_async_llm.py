@@ -0,0 +1,111 @@
+"""Concurrent chats through AsyncGroqClient against a local mock OpenAI-compatible server.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_llm [--requests 200] [--latency 0.2]
+
+The mock server answers /v1/chat/completions (streaming and non-streaming) after a
+fixed delay, so the numbers show how many chats one event loop keeps in flight
+rather than model speed. Every reply is checked against the expected text.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_client import AsyncGroqClient, GroqClient
+
+REPLY_TOKENS = ["Refunds ", "are ", "issued ", "within ", "5-7 ", "business ", "days."]
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the default backlog of 5 drops bursts of connections
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests_served = 0
+        self.counter_lock = threading.Lock()
+
+
+def make_handler(latency: float):
+    class MockCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with self.server.counter_lock:
+                self.server.requests_served += 1
+            time.sleep(latency)
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for token in REPLY_TOKENS:
+                    chunk = {"choices": [{"delta": {"content": token}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+            else:
+                payload = json.dumps({"choices": [{"message": {"content": "".join(REPLY_TOKENS)}}]}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return MockCompletionsHandler
+
+
+async def run_async(base_url: str, num_requests: int, stream: bool) -> float:
+    expected = "".join(REPLY_TOKENS)
+    async with AsyncGroqClient("test-key", base_url=base_url, max_connections=num_requests) as client:
+        async def one_chat(i: int) -> str:
+            if stream:
+                parts = [token async for token in client.generate_stream(f"question {i}")]
+                return "".join(parts)
+            return await client.generate_with_context(f"question {i}", "policy context")
+
+        start = time.perf_counter()
+        replies = await asyncio.gather(*(one_chat(i) for i in range(num_requests)))
+        elapsed = time.perf_counter() - start
+
+    wrong = [reply for reply in replies if reply != expected]
+    if wrong:
+        raise SystemExit(f"{len(wrong)} unexpected replies, e.g. {wrong[0]!r}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="mock server delay per request (s)")
+    parser.add_argument("--sync-requests", type=int, default=10)
+    args = parser.parse_args()
+
+    server = MockServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+    sync_client = GroqClient("test-key", base_url=base_url)
+    start = time.perf_counter()
+    for i in range(args.sync_requests):
+        assert sync_client.generate(f"question {i}") == "".join(REPLY_TOKENS)
+    sync_rate = args.sync_requests / (time.perf_counter() - start)
+
+    for stream in (False, True):
+        elapsed = asyncio.run(run_async(base_url, args.requests, stream))
+        label = "async streaming" if stream else "async non-streaming"
+        print(f"{label:<20} {args.requests} chats in {elapsed:.2f}s ({args.requests / elapsed:.0f} chats/sec)")
+    print(f"{'sync sequential':<20} {sync_rate:.0f} chats/sec")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Sidebar listing cost with many archived chats: index pages vs parsing every file.
+
+Run from the repository root:
+    python -m benchmarks.bench_chat_history [--sessions 20000] [--messages 20]
+
+Creates a temporary history of N sessions, then times what one sidebar render
+costs: the old approach (json.load every session file, sorted by mtime), the
+first index page, a page deep in the history via its cursor, and a title search.
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import time
+
+from chat_history import ChatHistory
+
+TOPICS = ["refund policy", "shipping times", "payout schedule", "data privacy", "domain setup", "theme editing"]
+
+
+def timed(fn, repeat: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=20, help="messages per session")
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        history = ChatHistory(os.path.join(folder, "history"))
+        legacy_folder = os.path.join(folder, "legacy")
+        os.makedirs(legacy_folder)
+        for i in range(args.sessions):
+            session_id = f"session_{i:06d}"
+            messages = []
+            for j in range(args.messages):
+                role = "user" if j % 2 == 0 else "assistant"
+                messages.append({"role": role, "content": f"Question {j} about the {TOPICS[i % len(TOPICS)]}, #{i}"})
+            history.append_messages(session_id, messages, mode="chat")
+            with open(os.path.join(legacy_folder, f"{session_id}.json"), "w") as f:
+                json.dump({"session_id": session_id, "mode": "chat", "messages": messages}, f, indent=2)
+        print(f"{args.sessions} sessions x {args.messages} messages")
+
+        def legacy_listing():
+            files = sorted(glob.glob(os.path.join(legacy_folder, "*.json")), key=os.path.getmtime, reverse=True)
+            for path in files:
+                with open(path) as f:
+                    json.load(f)
+
+        _, cursor = history.list_sessions(limit=args.sessions // 2)
+        results = [
+            ("parse every file (before)", timed(legacy_listing, repeat=1)),
+            ("first page", timed(lambda: history.list_sessions(limit=args.page_size))),
+            ("page at the middle", timed(lambda: history.list_sessions(limit=args.page_size, after=cursor))),
+            ("title search", timed(lambda: history.list_sessions(limit=args.page_size, query="payout"))),
+            ("count matching", timed(lambda: history.count_sessions(query="payout"))),
+        ]
+        for label, ms in results:
+            print(f"{label:<28} {ms:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
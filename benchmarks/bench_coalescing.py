@@ -0,0 +1,81 @@
+"""A burst of identical questions, with and without request coalescing.
+
+Run from the repository root:
+    python -m benchmarks.bench_coalescing [--users 100] [--latency 0.5]
+
+Simulates many users asking the same question at once (e.g. right after a
+campaign email) through one shared GroqClient from a thread per user, and
+through AsyncGroqClient from one event loop. Reports upstream requests made and
+wall time, and checks every user received the full reply.
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_async_llm import REPLY_TOKENS, MockServer, make_handler
+from llm_client import AsyncGroqClient, GroqClient
+
+QUESTION = "How long do refunds take?"
+CONTEXT = "Refunds are issued within 5-7 business days."
+
+
+def run_threads(server: MockServer, base_url: str, users: int, coalesce: bool, stream: bool):
+    client = GroqClient("test-key", base_url=base_url, coalesce=coalesce)
+
+    def ask(_) -> str:
+        if stream:
+            return "".join(client.generate_with_context_stream(QUESTION, CONTEXT))
+        return client.generate_with_context(QUESTION, CONTEXT)
+
+    before = server.requests_served
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        replies = list(pool.map(ask, range(users)))
+    return replies, server.requests_served - before, time.perf_counter() - start
+
+
+def run_async(server: MockServer, base_url: str, users: int, coalesce: bool, stream: bool):
+    async def burst():
+        async with AsyncGroqClient("test-key", base_url=base_url, coalesce=coalesce,
+                                   max_connections=users) as client:
+            async def ask() -> str:
+                if stream:
+                    return "".join([t async for t in client.generate_with_context_stream(QUESTION, CONTEXT)])
+                return await client.generate_with_context(QUESTION, CONTEXT)
+            return await asyncio.gather(*(ask() for _ in range(users)))
+
+    before = server.requests_served
+    start = time.perf_counter()
+    replies = asyncio.run(burst())
+    return replies, server.requests_served - before, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.5, help="mock server delay per request (s)")
+    args = parser.parse_args()
+
+    server = MockServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    expected = "".join(REPLY_TOKENS)
+
+    print(f"{args.users} users asking the same question, {args.latency}s upstream latency")
+    print(f"{'client':<8} {'mode':<10} {'coalesce':<9} {'upstream':>8} {'seconds':>8}")
+    for name, run in (("threads", run_threads), ("async", run_async)):
+        for stream in (False, True):
+            for coalesce in (False, True):
+                replies, upstream, elapsed = run(server, base_url, args.users, coalesce, stream)
+                wrong = [reply for reply in replies if reply != expected]
+                if wrong:
+                    raise SystemExit(f"{len(wrong)} unexpected replies, e.g. {wrong[0]!r}")
+                mode = "stream" if stream else "complete"
+                print(f"{name:<8} {mode:<10} {str(coalesce):<9} {upstream:>8} {elapsed:>8.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
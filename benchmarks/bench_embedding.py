@@ -0,0 +1,45 @@
+"""Chunk embedding throughput: one encode() call per chunk vs batched encoding.
+
+Run from the repository root:
+    python -m benchmarks.bench_embedding [--pdf-folder pdfs/] [--batch-size 64]
+"""
+import argparse
+import os
+import time
+
+from knowledge_base import RAGKnowledgeBase
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf-folder", default="pdfs/")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    kb = RAGKnowledgeBase(batch_size=args.batch_size, show_progress=False)
+    chunks = []
+    for filename in sorted(os.listdir(args.pdf_folder)):
+        if filename.lower().endswith(".pdf"):
+            text = kb.extract_pdf_text(os.path.join(args.pdf_folder, filename))
+            chunks.extend(kb.chunk_document(text, filename))
+    print(f"{len(chunks)} chunks from {args.pdf_folder}")
+
+    # Warm up the model so neither run pays for lazy initialisation
+    kb.embedding_model.encode(["warm up"])
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        chunk.embedding = kb.embedding_model.encode([chunk.content])[0]
+    per_chunk = time.perf_counter() - start
+
+    start = time.perf_counter()
+    kb.embed_chunks(chunks)
+    batched = time.perf_counter() - start
+
+    print(f"per-chunk encode: {per_chunk:.2f}s ({len(chunks) / per_chunk:.1f} chunks/sec)")
+    print(f"batched encode:   {batched:.2f}s ({len(chunks) / batched:.1f} chunks/sec, batch_size={args.batch_size})")
+    print(f"speedup: {per_chunk / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
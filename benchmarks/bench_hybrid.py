@@ -0,0 +1,85 @@
+"""Hit rate and latency of dense-only vs hybrid (BM25 + dense, RRF-fused) retrieval.
+
+Run from the repository root:
+    python -m benchmarks.bench_hybrid [--pdf-folder pdfs/] [-k 3] [--repeat 20]
+
+Builds the knowledge base from the bundled policy PDFs and runs a labeled set
+of support questions, each paired with a phrase from the passage that answers
+it. A question is a hit when any of the top k chunks contains its phrase. The
+set mixes paraphrased questions with the section-number and exact-name lookups
+dense retrieval tends to miss. Latency is measured with the query embeddings
+already cached, so it is the retrieval cost alone.
+"""
+import argparse
+import re
+import time
+
+from knowledge_base import RAGKnowledgeBase
+
+PDF_MAPPING = {
+    "shopify-privacy policy.pdf": "Privacy Policy",
+    "shopify-terms of services.pdf": "Terms of Service",
+}
+
+# (question, phrase found in the chunk that answers it)
+QUESTIONS = [
+    ("What does section 2.4 say?", "2.4 Shop Pay"),
+    ("Terms section 2.7", "2.7 Meta Pay"),
+    ("What is in 2.2 of the terms of service?", "2.2 Staff Accounts"),
+    ("Rules for Apple Pay for Safari", "Apple Pay for Safari"),
+    ("PayPal Express Checkout account terms", "PayPal Express Checkout"),
+    ("Can I use Google Pay with my store?", "Google Pay"),
+    ("How old do I have to be to open a store?", "18 years"),
+    ("Can I resell the Shopify services?", "resell"),
+    ("Who owns the account if I sign up for my employer?", "on behalf of your employer"),
+    ("How long do you keep my information?", "How long we keep"),
+    ("How can I contact Shopify about privacy?", "How you can reach us"),
+    ("Does Shopify have a Data Protection Officer?", "Data Protection Officer"),
+    ("Who owns my personal information?", "belongs to you"),
+    ("Do you use cookies?", "cookies"),
+    ("Can my account be suspended?", "suspend"),
+    ("What are the Shopify Payments terms?", "Shopify Payments"),
+]
+WEIGHTS = [0.0, 0.3, 0.5, 0.7]
+
+
+def contains(chunk, phrase: str) -> bool:
+    return phrase.lower() in re.sub(r'\s+', ' ', chunk.content).lower()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf-folder", default="pdfs/")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=20, help="timed passes over the question set")
+    args = parser.parse_args()
+
+    kb = RAGKnowledgeBase(show_progress=False)
+    kb.load_pdf_folder(args.pdf_folder, PDF_MAPPING)
+    for question, _ in QUESTIONS:
+        kb.encode_query(question)  # warm the query embedding cache
+    print(f"\n{len(kb.chunks)} chunks, {kb.lexical_index.get_stats()['postings']} postings, "
+          f"{len(QUESTIONS)} questions, k={args.k}\n")
+
+    print(f"{'lexical weight':<16} {'hit@k':>7} {'ms/query':>9}  misses")
+    for weight in WEIGHTS:
+        hits, misses = 0, []
+        for question, phrase in QUESTIONS:
+            results = kb.search(question, k=args.k, lexical_weight=weight)
+            if any(contains(chunk, phrase) for chunk, _ in results):
+                hits += 1
+            else:
+                misses.append(question)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for question, _ in QUESTIONS:
+                kb.search(question, k=args.k, lexical_weight=weight)
+        latency = (time.perf_counter() - start) / (args.repeat * len(QUESTIONS)) * 1000
+
+        label = "dense only" if weight == 0 else f"{weight:.1f}"
+        print(f"{label:<16} {hits / len(QUESTIONS):>7.2f} {latency:>9.3f}  {'; '.join(misses)}")
+
+
+if __name__ == "__main__":
+    main()
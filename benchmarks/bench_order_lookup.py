@@ -0,0 +1,111 @@
+"""Order lookup latency on a synthetic data set: store backends vs linear scans.
+
+Run from the repository root:
+    python -m benchmarks.bench_order_lookup [--rows 1000000] [--lookups 1000]
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from order_manager import OrderManager
+
+
+def write_csv(path: str, header: list, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def write_dataset(folder: str, num_orders: int, num_customers: int = 10_000, num_products: int = 500):
+    write_csv(
+        os.path.join(folder, "orders.csv"),
+        ["id", "date", "time", "quantity", "code"],
+        ((i, "2025-08-04", "12:42:45", 1 + i % 5, f"ORD{i:08d}") for i in range(1, num_orders + 1))
+    )
+    write_csv(
+        os.path.join(folder, "customers.csv"),
+        ["id", "name", "email", "phone", "gender"],
+        ((i, f"Customer {i}", f"c{i}@example.com", "+1-555-0000", "Female") for i in range(1, num_customers + 1))
+    )
+    write_csv(
+        os.path.join(folder, "products.csv"),
+        ["id", "name", "price", "weight"],
+        ((i, f"Product {i}", "19.99", "1.0") for i in range(1, num_products + 1))
+    )
+    write_csv(
+        os.path.join(folder, "transactions.csv"),
+        ["id", "customer_id", "product_id", "order_id", "amount", "payment_method", "status"],
+        (
+            (i, 1 + i % num_customers, 1 + i % num_products, i, "99.95", "Credit Card", "Paid")
+            for i in range(1, num_orders + 1)
+        )
+    )
+
+
+def linear_order_details(store, order_id: str):
+    """The pre-index lookup path: one full scan per table."""
+    def find(data, field, value):
+        return next((record for record in data if record.get(field) == value), None)
+
+    order = find(store.orders, 'id', order_id)
+    if not order:
+        return None
+    transaction = find(store.transactions, 'order_id', order_id)
+    return (
+        order,
+        transaction,
+        find(store.customers, 'id', transaction['customer_id']),
+        find(store.products, 'id', transaction['product_id'])
+    )
+
+
+def time_lookups(manager: OrderManager, order_ids: list) -> float:
+    start = time.perf_counter()
+    for order_id in order_ids:
+        manager.get_order_details(order_id)
+    return (time.perf_counter() - start) / len(order_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--linear-lookups", type=int, default=20, help="linear scans are slow; keep this small")
+    args = parser.parse_args()
+
+    order_ids = [str(random.randint(1, args.rows)) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        print(f"Writing {args.rows} synthetic orders...")
+        write_dataset(folder, args.rows)
+
+        start = time.perf_counter()
+        memory = OrderManager(folder, backend="memory")
+        print(f"memory backend load + index: {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        OrderManager(folder, backend="sqlite")
+        print(f"sqlite backend first start (import): {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        sqlite = OrderManager(folder, backend="sqlite")
+        print(f"sqlite backend warm start: {time.perf_counter() - start:.3f}s\n")
+
+        indexed = time_lookups(memory, order_ids)
+        queried = time_lookups(sqlite, order_ids)
+
+    start = time.perf_counter()
+    for order_id in order_ids[:args.linear_lookups]:
+        linear_order_details(memory.store, order_id)
+    linear = (time.perf_counter() - start) / args.linear_lookups
+
+    print(f"memory get_order_details: {indexed * 1e6:10.2f} us/lookup")
+    print(f"sqlite get_order_details: {queried * 1e6:10.2f} us/lookup")
+    print(f"linear scans:             {linear * 1e6:10.2f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
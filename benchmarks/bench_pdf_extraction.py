@@ -0,0 +1,57 @@
+"""PDF text extraction throughput: serial string concatenation vs the process pool.
+
+Run from the repository root:
+    python -m benchmarks.bench_pdf_extraction [--copies 20] [--workers 1 2 4 8]
+
+Extracts N copies of the bundled PDFs (the same files under different source
+names) with the old approach (one file after another, page text appended with
+`text +=`) and with PDFExtractor at several worker counts, reporting pages per
+second. Gains are bounded by the cores available: see os.cpu_count().
+"""
+import argparse
+import glob
+import os
+import time
+
+import PyPDF2
+
+from pdf_extraction import PDFExtractor
+
+
+def extract_concatenated(pdf_path: str) -> int:
+    """The previous RAGKnowledgeBase.extract_pdf_text; returns the number of pages read."""
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        text = ""
+        for page in pdf_reader.pages:
+            text += page.extract_text() + "\n"
+        return len(pdf_reader.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf-folder", default="pdfs/")
+    parser.add_argument("--copies", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.pdf_folder, "*.pdf")))
+    files = [(path, f"{os.path.basename(path)} #{i}") for i in range(args.copies) for path in paths]
+    print(f"{len(files)} files, {os.cpu_count()} cores\n")
+
+    start = time.perf_counter()
+    pages = 0
+    for path, _ in files:
+        pages += extract_concatenated(path)
+    elapsed = time.perf_counter() - start
+    print(f"{'serial, text +=':<22} {elapsed:>7.2f} s {pages / elapsed:>8.0f} pages/s")
+
+    for workers in sorted(set(args.workers)):
+        start = time.perf_counter()
+        pages = sum(1 for _ in PDFExtractor(workers).extract(files))
+        elapsed = time.perf_counter() - start
+        print(f"{f'PDFExtractor, {workers} workers':<22} {elapsed:>7.2f} s {pages / elapsed:>8.0f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
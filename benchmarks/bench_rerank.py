@@ -0,0 +1,67 @@
+"""Quality and latency of cross-encoder reranking under different time budgets.
+
+Run from the repository root:
+    python -m benchmarks.bench_rerank [--model cross-encoder/ms-marco-MiniLM-L-6-v2] [--candidates 20] [-k 3]
+
+Uses the labeled question set of bench_hybrid over the bundled PDFs. For the
+retrieval order alone, and for reranking with no budget and with shrinking
+budgets, it reports hit@k, MRR@k (reciprocal rank of the first chunk holding
+the expected phrase), mean and p95 search latency, and how often the reranker
+scored every candidate, only some, or none (falling back to retrieval order).
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_hybrid import PDF_MAPPING, QUESTIONS, contains
+from knowledge_base import RAGKnowledgeBase
+from reranker import DEFAULT_RERANKER_MODEL, CrossEncoderReranker
+
+BUDGETS = [None, 0.2, 0.1, 0.05, 0.0]
+
+
+def evaluate(kb: RAGKnowledgeBase, k: int, rerank: bool):
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for question, phrase in QUESTIONS:
+        start = time.perf_counter()
+        results = kb.search(question, k=k, rerank=rerank)
+        latencies.append(time.perf_counter() - start)
+        rank = next((i for i, (chunk, _) in enumerate(results, start=1) if contains(chunk, phrase)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    latencies_ms = 1000 * np.array(latencies)
+    return hits / len(QUESTIONS), float(np.mean(reciprocal_ranks)), latencies_ms.mean(), np.percentile(latencies_ms, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf-folder", default="pdfs/")
+    parser.add_argument("--model", default=DEFAULT_RERANKER_MODEL)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    reranker = CrossEncoderReranker(args.model, candidates=args.candidates)
+    kb = RAGKnowledgeBase(show_progress=False, reranker=reranker)
+    kb.load_pdf_folder(args.pdf_folder, PDF_MAPPING)
+    for question, _ in QUESTIONS:
+        kb.encode_query(question)  # warm the query embedding cache
+    print(f"\n{len(kb.chunks)} chunks, {len(QUESTIONS)} questions, "
+          f"{args.candidates} candidates reranked to k={args.k}\n")
+
+    print(f"{'setting':<18} {'hit@k':>6} {'MRR':>6} {'mean ms':>8} {'p95 ms':>8}  complete/partial/fallback")
+    hit_rate, mrr, mean_ms, p95_ms = evaluate(kb, args.k, rerank=False)
+    print(f"{'retrieval order':<18} {hit_rate:>6.2f} {mrr:>6.2f} {mean_ms:>8.2f} {p95_ms:>8.2f}")
+    for budget in BUDGETS:
+        reranker.time_budget = budget
+        before = reranker.get_stats()
+        hit_rate, mrr, mean_ms, p95_ms = evaluate(kb, args.k, rerank=True)
+        after = reranker.get_stats()
+        counts = "/".join(str(after[name] - before[name]) for name in ("complete", "partial", "fallback"))
+        label = "rerank, no budget" if budget is None else f"rerank, {1000 * budget:.0f} ms"
+        print(f"{label:<18} {hit_rate:>6.2f} {mrr:>6.2f} {mean_ms:>8.2f} {p95_ms:>8.2f}  {counts}")
+
+
+if __name__ == "__main__":
+    main()
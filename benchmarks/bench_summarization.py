@@ -0,0 +1,87 @@
+"""Cost and effect of conversation summarization: truncation vs extractive.
+
+Run from the repository root:
+    python -m benchmarks.bench_summarization [--turns 60] [--max-history 5]
+
+Replays a scripted support conversation in which the user states facts early
+on (store name, plan, country, ...) among small talk and routine questions.
+For each strategy it reports the time spent compressing per turn, the summary
+size in tokens against the tokens of all dropped messages, and how many of the
+early facts are still in the summary at the end.
+"""
+import argparse
+import time
+
+from context_manager import ConversationContext, ExtractiveSummarizer
+from knowledge_base import RAGKnowledgeBase
+from prompt_budget import Tokenizer
+
+FACTS = [
+    ("My store is called Maple Goods and we sell handmade candles.", "Maple Goods"),
+    ("We are based in Canada and ship mostly to the United States.", "Canada"),
+    ("I'm currently on the Basic plan but thinking about upgrading.", "Basic plan"),
+    ("Our payment provider is Shopify Payments with about 300 orders a month.", "Shopify Payments"),
+    ("We had a chargeback dispute last week that is still open.", "chargeback"),
+]
+FILLER = [
+    ("user", "Thanks, that makes sense. Could you explain that a bit more?"),
+    ("assistant", "Of course. Shopify lets you manage this from the admin settings page, "
+                  "and changes take effect immediately for new orders."),
+    ("user", "Okay great. And how does that interact with taxes in general?"),
+    ("assistant", "Taxes are calculated at checkout based on the customer's address. "
+                  "You can review the tax settings under Settings and then Taxes and duties."),
+]
+
+
+def conversation(turns: int):
+    """Yield (role, content) for `turns` messages, facts first, then filler."""
+    script = []
+    for fact, _ in FACTS:
+        script.append(("user", f"Some background first. {fact}"))
+        script.append(("assistant", "Thanks for the context, noted. How can I help you with that today?"))
+    while len(script) < turns:
+        script.extend(FILLER)
+    return script[:turns]
+
+
+def run(summarizer, turns: int, max_history: int, tokenizer: Tokenizer):
+    context = ConversationContext(max_history=max_history, summarizer=summarizer)
+    compress_times = []
+    for role, content in conversation(turns):
+        will_compress = len(context.messages) + 1 > max_history * 2
+        start = time.perf_counter()
+        context.add_message(role, content)
+        if will_compress:
+            compress_times.append(time.perf_counter() - start)
+
+    script = conversation(turns)
+    dropped = script[:len(script) - len(context.messages)]
+    dropped_tokens = sum(tokenizer.count(content) for _, content in dropped)
+    summary = context.summary or ""
+    retained = sum(1 for _, keyword in FACTS if keyword in summary)
+    per_turn_ms = 1000 * sum(compress_times) / max(1, len(compress_times))
+    return per_turn_ms, tokenizer.count(summary), dropped_tokens, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--max-history", type=int, default=5, help="message pairs kept verbatim")
+    args = parser.parse_args()
+
+    kb = RAGKnowledgeBase(show_progress=False)
+    kb.encode_texts(["warm up"])
+    tokenizer = Tokenizer()
+
+    print(f"{args.turns} messages, last {args.max_history} pairs kept verbatim")
+    print(f"{'strategy':<12} {'ms/turn':>8} {'summary tok':>12} {'dropped tok':>12} {'facts kept':>11}")
+    for name, summarizer in (("truncate", None), ("extractive", ExtractiveSummarizer(kb.encode_texts))):
+        per_turn_ms, summary_tokens, dropped_tokens, retained = run(
+            summarizer, args.turns, args.max_history, tokenizer
+        )
+        print(f"{name:<12} {per_turn_ms:>8.2f} {summary_tokens:>12} {dropped_tokens:>12} "
+              f"{retained:>6}/{len(FACTS)}")
+
+
+if __name__ == "__main__":
+    main()
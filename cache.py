@@ -0,0 +1,218 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import faiss
+import numpy as np
+
+from storage import save_json, save_npy, write_atomically
+
+SEMANTIC_ENTRIES_FILE = "entries.json"
+SEMANTIC_EMBEDDINGS_FILE = "embeddings.npy"
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a user question for cache lookups (case, whitespace, trailing punctuation)."""
+    return re.sub(r'\s+', ' ', text).strip().rstrip('?!.').strip().lower()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional time-to-live and hit/miss counters."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_entries: Least recently used entries are evicted beyond this size
+            ttl_seconds: Entries older than this are treated as missing (None = never expire)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class SemanticCache:
+    """Answers to previously asked questions, looked up by embedding similarity.
+
+    Entries are tied to a knowledge base fingerprint and dropped when it changes,
+    so answers are never served from outdated policy text.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 500,
+        path: Optional[str] = None,
+        autosave_every: int = 10
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a cached question to count as a match
+            max_entries: Least recently used entries are evicted beyond this size
+            path: Directory to persist entries in (None = memory only)
+            autosave_every: Persist after this many new entries
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.autosave_every = autosave_every
+        self.fingerprint: Optional[str] = None
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()  # index id -> entry
+        self._index = None
+        self._next_id = 0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, embedding: np.ndarray) -> Optional[str]:
+        """Return the cached answer for a normalized (1, dim) question embedding, if any."""
+        with self._lock:
+            if self._entries:
+                scores, ids = self._index.search(embedding, 1)
+                entry_id = int(ids[0][0])
+                if entry_id != -1 and scores[0][0] >= self.threshold:
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id]["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, question: str, embedding: np.ndarray, answer: str):
+        with self._lock:
+            self._add(question, embedding[0], answer)
+            self._unsaved += 1
+            should_save = self.path is not None and self._unsaved >= self.autosave_every
+        if should_save:
+            self.save()
+
+    def _add(self, question: str, embedding: np.ndarray, answer: str):
+        if self._index is None:
+            self._index = faiss.IndexIDMap(faiss.IndexFlatIP(embedding.shape[0]))
+        entry_id = self._next_id
+        self._next_id += 1
+        self._index.add_with_ids(
+            np.asarray(embedding, dtype='float32').reshape(1, -1),
+            np.array([entry_id], dtype='int64')
+        )
+        self._entries[entry_id] = {"question": question, "answer": answer, "embedding": embedding}
+        while len(self._entries) > self.max_entries:
+            evicted_id, _ = self._entries.popitem(last=False)
+            self._index.remove_ids(np.array([evicted_id], dtype='int64'))
+
+    def validate(self, fingerprint: str):
+        """Drop every entry if the knowledge base changed since they were cached."""
+        if fingerprint == self.fingerprint:
+            return
+        if self._entries:
+            print("Knowledge base changed, clearing semantic cache")
+        self.clear()
+        self.fingerprint = fingerprint
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+            self._unsaved = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self):
+        if self.path is None:
+            return
+        # One save at a time, each writing the entries it snapshotted, so concurrent
+        # autosaves can't leave the two files from different states
+        with self._save_lock:
+            with self._lock:
+                entries = list(self._entries.values())
+                self._unsaved = 0
+            os.makedirs(self.path, exist_ok=True)
+            if entries:
+                embeddings = np.array([entry["embedding"] for entry in entries], dtype='float32')
+                write_atomically(
+                    os.path.join(self.path, SEMANTIC_EMBEDDINGS_FILE), lambda tmp: save_npy(tmp, embeddings)
+                )
+            # Entries are written last, oldest first, so load() restores the LRU order
+            data = {
+                "fingerprint": self.fingerprint,
+                "num_entries": len(entries),
+                "entries": [{"question": entry["question"], "answer": entry["answer"]} for entry in entries]
+            }
+            write_atomically(os.path.join(self.path, SEMANTIC_ENTRIES_FILE), lambda tmp: save_json(tmp, data))
+
+    def load(self) -> bool:
+        entries_path = os.path.join(self.path, SEMANTIC_ENTRIES_FILE) if self.path else None
+        if not entries_path or not os.path.exists(entries_path):
+            return False
+        try:
+            with open(entries_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            entries = data.get("entries", [])
+            embeddings = np.load(os.path.join(self.path, SEMANTIC_EMBEDDINGS_FILE)) if entries else []
+        except Exception as e:
+            print(f"Error loading semantic cache from {self.path}: {e}")
+            return False
+        # Files from different saves would pair answers with the wrong questions
+        if not len(entries) == data.get("num_entries") == len(embeddings):
+            print(f"Semantic cache in {self.path} doesn't match its embeddings, starting empty")
+            return False
+
+        self.clear()
+        with self._lock:
+            for entry, embedding in zip(entries, embeddings):
+                self._add(entry["question"], embedding, entry["answer"])
+        self.fingerprint = data.get("fingerprint")
+        return True
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,223 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from storage import ThreadConnections
+
+INDEX_FILE = "index.db"
+TITLE_LENGTH = 60
+# Shortest search the trigram title index can answer; shorter ones scan the titles
+MIN_INDEXED_SEARCH = 3
+
+# Position after the last session of a page: (updated_at, session_id)
+Cursor = Tuple[float, str]
+
+
+class ChatHistory:
+    """Chat transcripts for the sidebar, stored as an append-only log per session.
+
+    Each session is a JSONL file of events ({"type": "message", ...},
+    {"type": "mode", ...}), so recording a turn appends a line instead of
+    rewriting the whole conversation. A small SQLite index (session id, title,
+    mode, timestamps, message count) is updated alongside it, so listing
+    sessions never opens the transcripts. Titles are also kept in an FTS5
+    trigram index (maintained by triggers), so title search doesn't scan.
+    """
+
+    def __init__(self, folder: str = "chat_history"):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self._connections = ThreadConnections(self._connect)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                title TEXT,
+                mode TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS sessions_recent ON sessions (updated_at, session_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS session_titles USING fts5(title, tokenize = 'trigram');
+            CREATE TRIGGER IF NOT EXISTS session_titles_insert AFTER INSERT ON sessions
+            WHEN new.title IS NOT NULL BEGIN
+                INSERT INTO session_titles (rowid, title) VALUES (new.rowid, new.title);
+            END;
+            CREATE TRIGGER IF NOT EXISTS session_titles_update AFTER UPDATE OF title ON sessions
+            WHEN old.title IS NOT new.title BEGIN
+                DELETE FROM session_titles WHERE rowid = old.rowid;
+                INSERT INTO session_titles (rowid, title) SELECT new.rowid, new.title
+                WHERE new.title IS NOT NULL;
+            END;
+            CREATE TRIGGER IF NOT EXISTS session_titles_delete AFTER DELETE ON sessions BEGIN
+                DELETE FROM session_titles WHERE rowid = old.rowid;
+            END;
+            """
+        )
+        self._migrate_json_sessions()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(os.path.join(self.folder, INDEX_FILE), isolation_level=None, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _log_path(self, session_id: str) -> str:
+        return os.path.join(self.folder, f"{os.path.basename(session_id)}.jsonl")
+
+    def _append(self, session_id: str, events: List[Dict]):
+        with open(self._log_path(session_id), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+
+    def _touch(self, session_id: str, now: float, mode: Optional[str] = None,
+               title: Optional[str] = None, new_messages: int = 0):
+        self._conn.execute(
+            """
+            INSERT INTO sessions (session_id, title, mode, created_at, updated_at, message_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (session_id) DO UPDATE SET
+                title = COALESCE(sessions.title, excluded.title),
+                mode = COALESCE(excluded.mode, sessions.mode),
+                updated_at = excluded.updated_at,
+                message_count = sessions.message_count + excluded.message_count
+            """,
+            (session_id, title, mode, now, now, new_messages)
+        )
+
+    def append_messages(self, session_id: str, messages: List[Dict[str, str]], mode: Optional[str] = None):
+        """Record new messages (role/content dicts); cost is independent of the conversation length."""
+        now = time.time()
+        events = [{"type": "message", "role": m["role"], "content": m["content"], "ts": now} for m in messages]
+        if mode is not None:
+            events.insert(0, {"type": "mode", "mode": mode, "ts": now})
+        self._append(session_id, events)
+        title = next((m["content"][:TITLE_LENGTH] for m in messages if m["role"] == "user"), None)
+        self._touch(session_id, now, mode=mode, title=title, new_messages=len(messages))
+
+    def append_message(self, session_id: str, role: str, content: str, mode: Optional[str] = None):
+        self.append_messages(session_id, [{"role": role, "content": content}], mode)
+
+    @staticmethod
+    def _title_filter(query: Optional[str]) -> Tuple[str, list]:
+        if not query:
+            return "", []
+        if len(query) >= MIN_INDEXED_SEARCH:
+            # A trigram phrase query matches the text anywhere in the title, ignoring case
+            phrase = '"' + query.replace('"', '""') + '"'
+            return "rowid IN (SELECT rowid FROM session_titles WHERE session_titles MATCH ?)", [phrase]
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return "title LIKE ? ESCAPE '\\'", [pattern]
+
+    def list_sessions(
+        self,
+        limit: int = 20,
+        after: Optional[Cursor] = None,
+        query: Optional[str] = None
+    ) -> Tuple[List[Dict], Optional[Cursor]]:
+        """One page of sessions, most recently active first, read from the index only.
+
+        Args:
+            limit: Page size (-1 for all)
+            after: Cursor returned with the previous page; None for the first page
+            query: Only sessions whose title contains this text (case-insensitive)
+
+        Returns:
+            (sessions, cursor for the next page or None if this was the last)
+        """
+        conditions, params = [], []
+        title_condition, title_params = self._title_filter(query)
+        if title_condition:
+            conditions.append(title_condition)
+            params += title_params
+        if after is not None:
+            # Keyset pagination: cost depends on the page size, not on how far back the page is
+            conditions.append("(updated_at < ? OR (updated_at = ? AND session_id < ?))")
+            params += [after[0], after[0], after[1]]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._conn.execute(
+            f"SELECT * FROM sessions {where} ORDER BY updated_at DESC, session_id DESC LIMIT ?",
+            params + [limit + 1 if limit >= 0 else -1]
+        ).fetchall()
+        sessions = [dict(row) for row in rows]
+        if 0 <= limit < len(sessions):
+            sessions = sessions[:limit]
+            return sessions, (sessions[-1]["updated_at"], sessions[-1]["session_id"])
+        return sessions, None
+
+    def count_sessions(self, query: Optional[str] = None) -> int:
+        title_condition, params = self._title_filter(query)
+        where = f"WHERE {title_condition}" if title_condition else ""
+        return self._conn.execute(f"SELECT COUNT(*) FROM sessions {where}", params).fetchone()[0]
+
+    def get_session_info(self, session_id: str) -> Optional[Dict]:
+        """Index entry (title, mode, timestamps, message count) without reading the transcript."""
+        row = self._conn.execute("SELECT * FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return dict(row) if row else None
+
+    def load_session(self, session_id: str) -> Optional[Dict]:
+        """Replay a session's log into {"session_id", "mode", "messages", "context"}."""
+        path = self._log_path(session_id)
+        if not os.path.exists(path):
+            return None
+        session = {"session_id": session_id, "mode": None, "messages": [], "context": None}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a torn last line from an interrupted write
+                if event["type"] == "message":
+                    session["messages"].append({"role": event["role"], "content": event["content"]})
+                elif event["type"] == "mode":
+                    session["mode"] = event["mode"]
+                elif event["type"] == "context":
+                    session["context"] = event["context"]
+        return session
+
+    def delete_session(self, session_id: str):
+        try:
+            os.remove(self._log_path(session_id))
+        except FileNotFoundError:
+            pass
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def delete_all(self):
+        for (session_id,) in self._conn.execute("SELECT session_id FROM sessions").fetchall():
+            self.delete_session(session_id)
+
+    def __len__(self) -> int:
+        return self.count_sessions()
+
+    def _migrate_json_sessions(self):
+        """Convert sessions saved in the old one-JSON-file-per-session format (kept as .json.migrated)."""
+        for name in os.listdir(self.folder):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    chat = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping unreadable chat history file {name}: {e}")
+                continue
+            session_id = chat.get("session_id") or name[:-len(".json")]
+            updated_at = os.path.getmtime(path)
+            messages = [m for m in chat.get("messages", []) if "role" in m and "content" in m]
+            events = [{"type": "mode", "mode": chat.get("mode"), "ts": updated_at}]
+            events += [
+                {"type": "message", "role": m["role"], "content": m["content"], "ts": updated_at}
+                for m in messages
+            ]
+            if chat.get("context"):
+                events.append({"type": "context", "context": chat["context"], "ts": updated_at})
+            self._append(session_id, events)
+            title = next((m["content"][:TITLE_LENGTH] for m in messages if m["role"] == "user"), None)
+            self._touch(session_id, updated_at, mode=chat.get("mode"), title=title, new_messages=len(messages))
+            os.replace(path, path + ".migrated")
@@ -1,25 +1,101 @@
+import os
 import re
-from typing import Optional
+import uuid
+from typing import Dict, Generator, Optional, Tuple
 
+from cache import LRUCache, SemanticCache, normalize_query
 from knowledge_base import RAGKnowledgeBase
+from reranker import CrossEncoderReranker
 from order_manager import OrderManager
-from llm_client import GroqClient
-from context_manager import ConversationContext
+from llm_client import GroqClient, StreamError
+from prompt_budget import PromptBuilder, Tokenizer
+from request_scheduler import RequestScheduler
+from context_manager import ConversationContext, ExtractiveSummarizer
+from session_store import create_session_store
 
+# Words that usually make a question depend on earlier turns ("what about that one?")
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|that|this|those|these|they|them|above|previous|earlier|same|also|else"
+    r"|one|ones|other|more|again|first|second|last)\b"
+    r"|^\s*(and|but|so|what about|how about)\b"
+)
 
-class Chatbot:
-    def __init__(self, groq_key: str, pdf_folder: str = "pdfs/", data_folder: str = "data/"):
+
+class ChatbotResources:
+    """Heavy, read-mostly state shared by every conversation in the process.
+
+    The embedding model, FAISS index, order store, HTTP session and answer caches
+    are built once here; each Chatbot only adds its own ConversationContext.
+    """
+
+    def __init__(
+        self,
+        groq_key: str,
+        pdf_folder: str = "pdfs/",
+        data_folder: str = "data/",
+        index_folder: Optional[str] = "kb_index/",
+        index_type: str = "flat",
+        lexical_weight: float = 0.5,
+        reranker_model: Optional[str] = None,
+        rerank_candidates: int = 20,
+        rerank_time_budget: Optional[float] = 0.15,
+        response_cache_size: int = 512,
+        response_cache_ttl: Optional[float] = 3600,
+        semantic_cache_threshold: Optional[float] = 0.92,
+        order_backend: str = "memory",
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        prompt_token_budget: int = 3000,
+        session_backend: str = "memory",
+        session_path: Optional[str] = None,
+        session_ttl: Optional[float] = 86400
+    ):
         print("\nInitializing Chatbot...")
         
-        self.kb = RAGKnowledgeBase()
-        self.orders = OrderManager(data_folder)
-        self.llm = GroqClient(groq_key)
-        self.context = ConversationContext(max_history=10)  # Keep last 10 exchanges
+        # Optional cross-encoder pass over the retrieved candidates; no model name disables it
+        reranker = None
+        if reranker_model:
+            reranker = CrossEncoderReranker(
+                reranker_model, candidates=rerank_candidates, time_budget=rerank_time_budget
+            )
+        self.kb = RAGKnowledgeBase(index_type=index_type, lexical_weight=lexical_weight, reranker=reranker)
+        self.orders = OrderManager(data_folder, backend=order_backend)
+        self.llm = GroqClient(
+            groq_key,
+            scheduler=RequestScheduler(requests_per_minute, tokens_per_minute)
+        )
+        # Summarizes dropped conversation turns locally with the KB's embedding model
+        self.summarizer = ExtractiveSummarizer(self.kb.encode_texts)
+        self.prompt_builder = PromptBuilder(Tokenizer(self.llm.model), max_prompt_tokens=prompt_token_budget)
+        # Conversation contexts by session id; the sqlite/directory backends let any worker resume any session
+        self.sessions = create_session_store(
+            session_backend, session_path, ttl_seconds=session_ttl, new_context=self.new_context
+        )
+        self.index_folder = index_folder
+        # Exact-answer cache for repeated questions; a size of 0 disables it
+        self.response_cache = LRUCache(response_cache_size, response_cache_ttl) if response_cache_size else None
         
+        if index_folder:
+            self.kb.load(index_folder)
         self._load_pdfs(pdf_folder)
+        if index_folder and self.kb.dirty:
+            self.kb.save(index_folder)
+
+        # Paraphrase-tolerant answer cache; a threshold of None disables it
+        self.semantic_cache = None
+        if semantic_cache_threshold is not None:
+            self.semantic_cache = SemanticCache(
+                threshold=semantic_cache_threshold,
+                path=os.path.join(index_folder, "semantic_cache") if index_folder else None
+            )
+            self.semantic_cache.load()
+            self.semantic_cache.validate(self.kb.fingerprint())
         
         print("Chatbot initialized successfully!\n")
 
+    def new_context(self) -> ConversationContext:
+        return ConversationContext(max_history=10, summarizer=self.summarizer)  # Keep last 10 exchanges
+
     def _load_pdfs(self, pdf_folder: str):
         pdf_mapping = {
             "shopify-privacy policy.pdf": "Privacy Policy",
@@ -27,6 +103,59 @@ class Chatbot:
         }
         self.kb.load_pdf_folder(pdf_folder, pdf_mapping)
 
+
+class Chatbot:
+    def __init__(
+        self,
+        groq_key: str,
+        temperature: float = 0.7,
+        resources: Optional[ChatbotResources] = None,
+        session_id: Optional[str] = None,
+        **resource_options
+    ):
+        """
+        Pass `resources` to share an already initialized model, index and order
+        store between conversations; otherwise they are built here from
+        `resource_options` (the keyword arguments of ChatbotResources).
+        The conversation for `session_id` is resumed from the session store if it
+        exists there; by default a new session is started.
+        """
+        if resources is None:
+            resources = ChatbotResources(groq_key, **resource_options)
+        self.resources = resources
+        self.kb = resources.kb
+        self.orders = resources.orders
+        self.llm = resources.llm
+        self.response_cache = resources.response_cache
+        self.semantic_cache = resources.semantic_cache
+        self.prompt_builder = resources.prompt_builder
+        self.sessions = resources.sessions
+        self.temperature = temperature
+        if session_id is None or not self.load_session(session_id):
+            self.new_session(session_id)
+
+    def new_session(self, session_id: Optional[str] = None):
+        """Start an empty conversation under `session_id` (a new random id by default)."""
+        self.session_id = session_id or uuid.uuid4().hex
+        self.context = self.resources.new_context()
+
+    def load_session(self, session_id: str) -> bool:
+        """Resume a stored conversation; returns False (leaving the current one) if it isn't stored."""
+        context = self.sessions.get(session_id)
+        if context is None:
+            return False
+        self.session_id = session_id
+        self.context = context
+        return True
+
+    def save_session(self):
+        self.sessions.save(self.session_id, self.context)
+
+    def _record_reply(self, response: str):
+        """Add the assistant's reply to the conversation and persist the session."""
+        self.context.add_message("assistant", response)
+        self.save_session()
+
     def _is_order_action_request(self, text: str) -> bool:
         """
         Detect if user wants to PERFORM an order action (not just ask about policies).
@@ -62,14 +191,22 @@ class Chatbot:
         
         return False
 
-    def chat(self, user_input: str) -> str:
+    def _prepare_reply(self, user_input: Optional[str]) -> Tuple[Optional[str], Optional[Dict]]:
+        """Handle everything before the LLM call.
+
+        Returns (response, None) when the reply is already known (validation, order
+        redirect, cache hit), otherwise (None, request) describing the LLM call to make.
+        """
         # Input validation
         if user_input is None:
-            return "I didn't receive your message. Please try again."
+            return "I didn't receive your message. Please try again.", None
         
         user_input = user_input.strip()
         if not user_input:
-            return "Please enter a message."
+            return "Please enter a message.", None
+        # Checked with the longer RAG template, before retrieval decides which one is used
+        if not self.prompt_builder.fits(self.llm.fixed_prompt_texts(user_input, with_context=True)):
+            return "Your message is too long. Please shorten it and try again.", None
         
         # Add user message to context
         self.context.add_message("user", user_input)
@@ -81,37 +218,156 @@ class Chatbot:
                 "please use the **Order Management** tool available in the main menu. "
                 "It will help you view your order details and process refunds efficiently."
             )
-            self.context.add_message("assistant", response)
-            return response
+            self._record_reply(response)
+            return response, None
 
         # Search knowledge base (for policy questions, terms, etc.)
-        results = self.kb.search(user_input)
-        if results:
-            context_kb = "\n".join([chunk.content for chunk, _ in results])
+        candidates = self.kb.search_candidates(user_input)
+        # A follow-up ("explain that in more detail") means something different in every
+        # conversation, so neither cache may answer it or store its reply
+        standalone = self._is_standalone_question(user_input)
+        cache_key = None
+        if self.response_cache is not None and standalone:
+            # Keyed before reranking, whose order depends on how much of its time budget it got
+            cache_key = self._response_cache_key(user_input, candidates)
+            response = self.response_cache.get(cache_key)
+            if response is not None:
+                self._record_reply(response)
+                return response, None
+        results = self.kb.rerank(user_input, candidates)
+
+        query_embedding = None
+        if self.semantic_cache is not None and standalone:
+            self.semantic_cache.validate(self.kb.fingerprint())
+            query_embedding = self.kb.encode_query(user_input)
+            response = self.semantic_cache.lookup(query_embedding)
+            if response is not None:
+                self._record_reply(response)
+                return response, None
+
+        # The question itself goes in the final prompt, so it isn't repeated from history
+        chunks, history, _ = self.prompt_builder.fit(
+            self.llm.fixed_prompt_texts(user_input, with_context=bool(results)),
+            [chunk.content for chunk, _ in results],
+            self.context.get_messages_for_llm()[:-1],
+            self.context.summary
+        )
+        return None, {
+            "user_input": user_input,
+            "context_kb": "\n".join(chunks) if chunks else None,
+            "history": history,
+            "cache_key": cache_key,  # set only when the exact-answer cache applies
+            "query_embedding": query_embedding  # set only when the semantic cache applies
+        }
+
+    def _finish_reply(self, request: Dict, response: str) -> str:
+        """Cache a generated reply and record it in the conversation."""
+        if not self.llm.is_error(response):
+            if request["cache_key"] is not None:
+                self.response_cache.put(request["cache_key"], response)
+            if request["query_embedding"] is not None:
+                self.semantic_cache.store(request["user_input"], request["query_embedding"], response)
+        self._record_reply(response)
+        return response
+
+    def chat(self, user_input: str) -> str:
+        response, request = self._prepare_reply(user_input)
+        if request is None:
+            return response
+
+        if request["context_kb"]:
             # Pass conversation context to LLM
             response = self.llm.generate_with_context(
-                user_input, 
-                context_kb, 
-                conversation_history=self.context.get_context_for_llm()
+                request["user_input"], 
+                request["context_kb"], 
+                temperature=self.temperature,
+                conversation_history=request["history"]
             )
-            self.context.add_message("assistant", response)
-            return response
+        else:
+            # Fallback to general response with context
+            response = self.llm.generate(
+                request["user_input"],
+                temperature=self.temperature,
+                conversation_history=request["history"]
+            )
+        return self._finish_reply(request, response)
+
+    def chat_stream(self, user_input: str) -> Generator[str, None, None]:
+        """Like chat(), but yields the reply token by token as the LLM produces it.
 
-        # Fallback to general response with context
-        response = self.llm.generate(
-            user_input,
-            conversation_history=self.context.get_context_for_llm()
+        Known replies (validation, order redirects, cache hits) are yielded whole.
+        The full reply is recorded in the conversation once the stream completes;
+        it is only cached if the stream didn't fail partway.
+        """
+        response, request = self._prepare_reply(user_input)
+        if request is None:
+            yield response
+            return
+
+        if request["context_kb"]:
+            tokens = self.llm.generate_with_context_stream(
+                request["user_input"],
+                request["context_kb"],
+                temperature=self.temperature,
+                conversation_history=request["history"]
+            )
+        else:
+            tokens = self.llm.generate_stream(
+                request["user_input"],
+                temperature=self.temperature,
+                conversation_history=request["history"]
+            )
+
+        parts = []
+        failed = False
+        try:
+            for token in tokens:
+                failed = failed or isinstance(token, StreamError)
+                parts.append(token)
+                yield token
+        except GeneratorExit:
+            # Consumer stopped early: keep what was shown, but don't cache a partial answer
+            self._record_reply("".join(parts).strip())
+            raise
+        if failed:
+            self._record_reply("".join(parts).strip())
+        else:
+            self._finish_reply(request, "".join(parts).strip())
+
+    def _is_standalone_question(self, text: str) -> bool:
+        """True when earlier turns can't change what the question means."""
+        # The current question has already been added to the context
+        has_history = self.context.summary is not None or len(self.context.messages) > 1
+        return not has_history or not FOLLOW_UP_PATTERN.search(text.lower())
+
+    def _response_cache_key(self, user_input: str, results: list) -> tuple:
+        """Key answers by question, the exact chunks retrieved for it and sampling settings."""
+        chunk_ids = tuple(
+            (chunk.metadata['source'], self.kb.sources.get(chunk.metadata['source']), chunk.metadata['chunk_id'])
+            for chunk, _ in results
         )
-        self.context.add_message("assistant", response)
-        return response
+        return (normalize_query(user_input), chunk_ids, self.llm.model, self.temperature)
     
     def clear_context(self):
         """Clear conversation context."""
         self.context.clear()
+        self.save_session()
     
     def get_context_stats(self):
         """Get conversation statistics."""
         return self.context.get_conversation_stats()
+
+    def get_cache_stats(self) -> dict:
+        """Get hit/miss counters for the query embedding and response caches."""
+        return {
+            "query_embeddings": self.kb.query_cache.get_stats(),
+            "responses": self.response_cache.get_stats() if self.response_cache is not None else None,
+            "semantic": self.semantic_cache.get_stats() if self.semantic_cache is not None else None
+        }
+    
+    def get_llm_metrics(self) -> dict:
+        """Get request, retry and rate-limit counters for the LLM API."""
+        return self.llm.get_metrics()
     
     def export_context(self) -> dict:
         """Export conversation context."""
@@ -120,3 +376,4 @@ class Chatbot:
     def import_context(self, context_data: dict):
         """Import conversation context."""
         self.context.from_dict(context_data)
+        self.save_session()
@@ -0,0 +1,171 @@
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# "2.1 Store Owner", "7. How long we keep your information": a section number
+# (top-level numbers need their dot) and a short capitalized title without
+# sentence punctuation, alone on its line
+HEADING_PATTERN = re.compile(r'^(\d+\.(?:\d+\.?)*|\d+(?:\.\d+)+)\s+([A-Z][^.,;:!?]*)$')
+MAX_HEADING_WORDS = 8
+# A line this short right after a heading finishes the heading ("7. Limitation of Liability and" / "Indemnification")
+MAX_HEADING_CONTINUATION_WORDS = 3
+# Boxed plain-language summaries in the Terms of Service are numbered like
+# sections; they start a new chunk but stay in the current section
+SUMMARY_HEADINGS = {"which means"}
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+TERMINAL_PUNCTUATION = ('.', '!', '?', ':', '"', ')')
+
+# (page number or None, text) as produced page by page by the PDF extractor
+Page = Tuple[Optional[int], str]
+
+
+def parse_heading(line: str) -> Optional[Tuple[str, str]]:
+    """(number, title) if the line is a numbered section heading."""
+    match = HEADING_PATTERN.match(line)
+    if match is None or len(line.split()) > MAX_HEADING_WORDS:
+        return None
+    return match.group(1).rstrip('.'), match.group(2)
+
+
+def is_heading_continuation(line: str) -> bool:
+    return (
+        0 < len(line.split()) <= MAX_HEADING_CONTINUATION_WORDS
+        and line[0].isupper()
+        and not any(mark in line for mark in ".,;:!?")
+    )
+
+
+class StructuredChunker:
+    """Splits documents into chunks along their structure, sized in embedding-model tokens.
+
+    Pages are consumed one at a time. A numbered heading always starts a new
+    chunk and sets the section recorded for the chunks after it; within a
+    section, whole sentences are packed up to `max_tokens`, and the next chunk
+    repeats the last sentences of the previous one (up to `overlap_tokens`).
+    A sentence running over a page break is kept whole. Only sentences longer
+    than `max_tokens` on their own are cut, at word boundaries.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], max_tokens: int = 200, overlap_tokens: int = 30):
+        """
+        Args:
+            count_tokens: Token count of a text for the embedding model
+            max_tokens: Chunk size limit; keep it under the model's max sequence length
+            overlap_tokens: Trailing sentences (up to this many tokens) repeated in the next chunk
+        """
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def chunk_pages(self, pages: Iterable[Page]) -> Iterator[Tuple[str, Dict]]:
+        """Yield (content, metadata) per chunk; metadata has 'page', 'page_end' and 'section' when known."""
+        section: Optional[str] = None
+        sentences: List[Tuple[str, int, Optional[int]]] = []  # (sentence, tokens, page) in the open chunk
+        tokens = 0
+        fragment, fragment_page = "", None  # start of a sentence continued on the next page
+        headings_only = False  # the open chunk holds nothing but headings so far
+        previous_line_heading = False
+
+        def emit():
+            first_page, last_page = sentences[0][2], sentences[-1][2]
+            metadata = {"section": section}
+            if first_page is not None:
+                metadata.update(page=first_page, page_end=last_page)
+            return " ".join(s for s, _, _ in sentences), metadata
+
+        def add(sentence: str, page: Optional[int]) -> Iterator[Tuple[str, Dict]]:
+            nonlocal sentences, tokens, headings_only
+            headings_only = False
+            for piece in self._split_long(sentence):
+                n = self.count_tokens(piece)
+                if sentences and tokens + n > self.max_tokens:
+                    yield emit()
+                    # The repeated sentences count towards the next chunk's size
+                    sentences = self._overlap(sentences, min(self.overlap_tokens, self.max_tokens - n))
+                    tokens = sum(t for _, t, _ in sentences)
+                sentences.append((piece, n, page))
+                tokens += n
+
+        def close_chunk() -> Iterator[Tuple[str, Dict]]:
+            nonlocal sentences, tokens, fragment
+            if fragment:
+                yield from add(fragment, fragment_page)
+                fragment = ""
+            if sentences:
+                yield emit()
+            sentences, tokens = [], 0
+
+        for page_number, text in pages:
+            paragraph: List[str] = []
+            for line in text.splitlines() + [""]:
+                line = " ".join(line.split())
+                if previous_line_heading and is_heading_continuation(line):
+                    heading_line, n, page = sentences.pop()
+                    if section == heading_line:
+                        section = f"{heading_line} {line}"
+                    sentences.append((f"{heading_line} {line}", n + self.count_tokens(line), page))
+                    tokens += self.count_tokens(line)
+                    previous_line_heading = False
+                    continue
+                heading = parse_heading(line) if line else None
+                previous_line_heading = heading is not None
+                if line and heading is None:
+                    paragraph.append(line)
+                    continue
+
+                # A heading or the end of the page: split what came before into sentences
+                if paragraph:
+                    body = " ".join(paragraph)
+                    if fragment:
+                        body, page = fragment + " " + body, fragment_page
+                        fragment = ""
+                    else:
+                        page = page_number
+                    parts = SENTENCE_END.split(body)
+                    if heading is None and not parts[-1].endswith(TERMINAL_PUNCTUATION):
+                        fragment, fragment_page = parts.pop(), page
+                    for i, sentence in enumerate(parts):
+                        yield from add(sentence, page if i == 0 else page_number)
+                    paragraph = []
+                if heading is not None:
+                    # A sentence left open at the end of the last page belongs before the heading
+                    if fragment:
+                        yield from add(fragment, fragment_page)
+                        fragment = ""
+                    # Consecutive headings ("9. Additional Services", "9.1 Scope") open one chunk together
+                    if not headings_only:
+                        yield from close_chunk()
+                    if heading[1].lower() not in SUMMARY_HEADINGS:
+                        section = line
+                    n = self.count_tokens(line)
+                    sentences.append((line, n, page_number))
+                    tokens += n
+                    headings_only = True
+        yield from close_chunk()
+
+    @staticmethod
+    def _overlap(sentences: List[Tuple[str, int, Optional[int]]], limit: int) -> List[Tuple[str, int, Optional[int]]]:
+        """The trailing sentences totalling at most `limit` tokens."""
+        kept, total = [], 0
+        for sentence in reversed(sentences):
+            if total + sentence[1] > limit:
+                break
+            kept.insert(0, sentence)
+            total += sentence[1]
+        return kept
+
+    def _split_long(self, sentence: str) -> List[str]:
+        """The sentence, or word-boundary pieces of at most max_tokens if it is longer."""
+        if self.count_tokens(sentence) <= self.max_tokens:
+            return [sentence]
+        # Word piece tokenizers split on whitespace first, so word counts add up
+        pieces, words, total = [], [], 0
+        for word in sentence.split():
+            n = self.count_tokens(word)
+            if words and total + n > self.max_tokens:
+                pieces.append(" ".join(words))
+                words, total = [], 0
+            words.append(word)
+            total += n
+        if words:
+            pieces.append(" ".join(words))
+        return pieces
@@ -1,10 +1,37 @@
 import streamlit as st
 
+
+def _optional(name: str, cast, default=None):
+    """A secret converted with `cast`, or None when it is unset (or empty) and has no default."""
+    value = st.secrets.get(name, default)
+    return None if value is None or value == "" else cast(value)
+
+
 # Load secrets from Streamlit
 GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
 GROQ_MODEL = st.secrets["GROQ_MODEL"]
 PDF_FOLDER = st.secrets["PDF_FOLDER"]
 DATA_FOLDER = st.secrets["DATA_FOLDER"]
+INDEX_FOLDER = st.secrets.get("INDEX_FOLDER", "kb_index/")
+INDEX_TYPE = st.secrets.get("INDEX_TYPE", "flat")  # flat, ivf_flat, hnsw or ivf_pq
+ORDER_BACKEND = st.secrets.get("ORDER_BACKEND", "memory")  # memory or sqlite
+# Share of BM25 keyword ranking fused with vector search (0 = vector search only)
+RETRIEVAL_LEXICAL_WEIGHT = float(st.secrets.get("RETRIEVAL_LEXICAL_WEIGHT", 0.5))
+# Cross-encoder that reorders the top RERANK_CANDIDATES chunks, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2";
+# unset disables reranking. Past RERANK_TIME_BUDGET seconds per query the retrieval order is kept
+RERANKER_MODEL = st.secrets.get("RERANKER_MODEL")
+RERANK_CANDIDATES = int(st.secrets.get("RERANK_CANDIDATES", 20))
+RERANK_TIME_BUDGET = _optional("RERANK_TIME_BUDGET", float, 0.15)  # "" = no limit
+# Provider quotas for the Groq account; unset means only the API's rate-limit headers are followed
+GROQ_REQUESTS_PER_MINUTE = _optional("GROQ_REQUESTS_PER_MINUTE", float)
+GROQ_TOKENS_PER_MINUTE = _optional("GROQ_TOKENS_PER_MINUTE", float)
+# Upper bound on prompt tokens per LLM call (system prompt + history + KB context + question)
+PROMPT_TOKEN_BUDGET = int(st.secrets.get("PROMPT_TOKEN_BUDGET", 3000))
+# Where conversation contexts live: memory (this process), sqlite or directory (shared by workers)
+SESSION_BACKEND = st.secrets.get("SESSION_BACKEND", "memory")
+SESSION_PATH = st.secrets.get("SESSION_PATH")  # database file / folder; backend default if unset
+# Seconds idle before a session is evicted; set to "" to keep sessions forever
+SESSION_TTL = _optional("SESSION_TTL", float, 86400)
 EMBEDDING_MODEL = st.secrets["EMBEDDING_MODEL"]
 
 CHUNK_SIZE = int(st.secrets["CHUNK_SIZE"])
@@ -1,46 +1,282 @@
-from typing import List, Dict, Optional
+from collections import deque
+from enum import Enum
+from typing import Callable, Deque, List, Dict, Optional, Tuple
 from datetime import datetime
 import json
+import re
+import time
+
+import numpy as np
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+# Other spellings of the roles, as found in older transcripts and other chat exports
+ROLE_ALIASES = {"human": "user", "ai": "assistant", "bot": "assistant", "model": "assistant"}
+
+
+class Role(str, Enum):
+    """Message roles; one shared instance per role instead of a string per message."""
+    USER = "user"
+    ASSISTANT = "assistant"
+    SYSTEM = "system"
+
+    @classmethod
+    def _missing_(cls, value):
+        if isinstance(value, str):
+            value = value.strip().lower()
+            value = ROLE_ALIASES.get(value, value)
+            for role in cls:
+                if role.value == value:
+                    return role
+        return None
+
+
+class Message:
+    """One conversation message. Timestamps are epoch seconds; ISO strings only at the edges."""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role: Role, content: str, timestamp: float):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+    def to_dict(self) -> Dict[str, str]:
+        return {
+            "role": self.role.value,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Message":
+        timestamp = data.get("timestamp")
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp).timestamp()
+        elif timestamp is None:
+            timestamp = time.time()
+        return cls(Role(data["role"]), data["content"], float(timestamp))
+
+
+class SummaryState:
+    """Per-conversation state of an ExtractiveSummarizer.
+
+    `sentences` holds the (role, text, turn) currently in the summary, with their
+    embeddings; `centroid_sum`/`count` accumulate every sentence ever summarized.
+    Embeddings of the messages still in the verbatim window are cached so each
+    message is encoded once.
+    """
+
+    def __init__(self, sentences: Optional[List[Tuple[str, str, int]]] = None):
+        self.sentences: List[Tuple[str, str, int]] = sentences or []
+        self.embeddings: Optional[np.ndarray] = None  # recomputed lazily after loading
+        self.centroid_sum: Optional[np.ndarray] = None
+        self.count = 0
+        self.window_embeddings: Dict[str, np.ndarray] = {}  # verbatim messages, by content
+
+
+class ExtractiveSummarizer:
+    """Summarizes dropped messages by picking their most salient sentences, without an LLM call.
+
+    Sentences are scored by similarity to the centroid of everything summarized
+    so far (what the conversation is about), plus small bonuses for recency and
+    for what the user said, and picked greedily with an MMR penalty so the
+    summary doesn't repeat itself. Sentences close to a message that is still
+    sent verbatim score lower, since the model sees those anyway.
+    Near-duplicates (boilerplate, repeated questions) are dropped before scoring.
+
+    Updates are incremental: only sentences from newly dropped messages are
+    embedded, and they compete with the sentences already in the summary.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_sentences: int = 8,
+        redundancy_weight: float = 0.7,
+        recency_weight: float = 0.1,
+        user_weight: float = 0.1,
+        window_weight: float = 0.5,
+        duplicate_threshold: float = 0.95,
+        min_sentence_chars: int = 20,
+        max_sentence_chars: int = 300
+    ):
+        """
+        Args:
+            encode: Maps texts to normalized embeddings, e.g. RAGKnowledgeBase.encode_texts
+            max_sentences: Sentences kept in the summary
+            redundancy_weight: MMR trade-off; higher favours diverse over central sentences
+            recency_weight: Score bonus for the most recent sentence, scaled down for older ones
+            user_weight: Score bonus for user sentences, which carry the user's situation and facts
+            window_weight: Penalty for sentences similar to messages still sent verbatim
+            duplicate_threshold: Similarity above which a sentence counts as a repeat of an earlier one
+            min_sentence_chars: Shorter sentences ("ok", "thanks!") are ignored
+            max_sentence_chars: Longer sentences are cut to this length
+        """
+        self.encode = encode
+        self.max_sentences = max_sentences
+        self.redundancy_weight = redundancy_weight
+        self.recency_weight = recency_weight
+        self.user_weight = user_weight
+        self.window_weight = window_weight
+        self.duplicate_threshold = duplicate_threshold
+        self.min_sentence_chars = min_sentence_chars
+        self.max_sentence_chars = max_sentence_chars
+
+    def split(self, messages: List[Dict[str, str]], first_turn: int) -> List[Tuple[str, str, int]]:
+        sentences = []
+        for offset, message in enumerate(messages):
+            for sentence in SENTENCE_BOUNDARY.split(message["content"]):
+                sentence = sentence.strip()
+                if len(sentence) >= self.min_sentence_chars:
+                    sentences.append((message["role"], sentence[:self.max_sentence_chars], first_turn + offset))
+        return sentences
+
+    def update(
+        self,
+        state: SummaryState,
+        messages: List[Dict[str, str]],
+        first_turn: int,
+        window: Optional[List[Dict[str, str]]] = None
+    ) -> Optional[str]:
+        """Fold newly dropped messages into `state`; returns the new summary text.
+
+        `window` is the messages still sent verbatim: sentences they already cover
+        are worth less in the summary.
+        """
+        new_sentences = self.split(messages, first_turn)
+        restored = state.embeddings is None and bool(state.sentences)
+        window_texts = [message["content"] for message in window or []]
+        uncached = [text for text in dict.fromkeys(window_texts) if text not in state.window_embeddings]
+
+        # One encode call per update: new sentences, window messages not seen yet,
+        # and (only right after loading a saved conversation) the kept sentences
+        to_encode = [text for _, text, _ in new_sentences] + uncached
+        if restored:
+            to_encode += [text for _, text, _ in state.sentences]
+        encoded = self.encode(to_encode) if to_encode else np.zeros((0, 0), dtype=np.float32)
+        new_embeddings = encoded[:len(new_sentences)]
+        for text, embedding in zip(uncached, encoded[len(new_sentences):len(new_sentences) + len(uncached)]):
+            state.window_embeddings[text] = embedding
+        state.window_embeddings = {text: state.window_embeddings[text] for text in window_texts}
+        if restored:
+            state.embeddings = encoded[len(new_sentences) + len(uncached):]
+            state.centroid_sum = state.embeddings.sum(axis=0)
+            state.count = len(state.sentences)
+
+        if len(new_embeddings):
+            batch_sum = new_embeddings.sum(axis=0)
+            state.centroid_sum = batch_sum if state.centroid_sum is None else state.centroid_sum + batch_sum
+            state.count += len(new_embeddings)
+
+        candidates = state.sentences + new_sentences
+        if not candidates:
+            return None
+        parts = [e for e in (state.embeddings, new_embeddings) if e is not None and len(e)]
+        embeddings = np.vstack(parts)
+
+        # Drop repeats, keeping the earliest occurrence (sentences already in the summary come first)
+        similarity = embeddings @ embeddings.T
+        keep = [
+            i for i in range(len(candidates))
+            if not (similarity[i, :i] >= self.duplicate_threshold).any()
+        ]
+        candidates = [candidates[i] for i in keep]
+        embeddings = embeddings[keep]
+
+        centroid = state.centroid_sum / (np.linalg.norm(state.centroid_sum) or 1.0)
+        turns = np.array([turn for _, _, turn in candidates], dtype=np.float32)
+        span = (turns.max() - turns.min()) or 1.0
+        is_user = np.array([role == "user" for role, _, _ in candidates], dtype=np.float32)
+        relevance = (
+            embeddings @ centroid
+            + self.recency_weight * (turns - turns.min()) / span
+            + self.user_weight * is_user
+        )
+        if state.window_embeddings:
+            covered = embeddings @ np.vstack(list(state.window_embeddings.values())).T
+            relevance -= self.window_weight * covered.max(axis=1)
+
+        selected: List[int] = []
+        max_similarity = np.full(len(candidates), -np.inf, dtype=np.float32)
+        while len(selected) < min(self.max_sentences, len(candidates)):
+            if selected:
+                scores = relevance - self.redundancy_weight * max_similarity
+            else:
+                scores = relevance.copy()
+            scores[selected] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            max_similarity = np.maximum(max_similarity, embeddings @ embeddings[best])
+
+        selected.sort(key=lambda i: candidates[i][2])
+        state.sentences = [candidates[i] for i in selected]
+        state.embeddings = embeddings[selected]
+        return "Previous conversation:\n" + "\n".join(f"{role}: {text}" for role, text, _ in state.sentences)
 
 
 class ConversationContext:
-    """Manages conversation context with sliding window and summarization."""
+    """Manages conversation context with sliding window and summarization.
+
+    Messages live in a ring buffer of max_history pairs; the oldest message is
+    folded into the summary as a new one arrives. The LLM-facing views are built
+    once and reused until the conversation changes.
+    """
     
-    def __init__(self, max_history: int = 10, max_tokens_per_msg: int = 200):
+    def __init__(
+        self,
+        max_history: int = 10,
+        max_tokens_per_msg: int = 200,
+        summarizer: Optional[ExtractiveSummarizer] = None
+    ):
         """
         Args:
             max_history: Maximum number of message pairs to keep in full detail
             max_tokens_per_msg: Approximate token limit per message (rough estimate: 1 token ≈ 4 chars)
+            summarizer: Builds the summary of dropped messages; without one the
+                summary is the start of the last few dropped messages
         """
         self.max_history = max_history
         self.max_tokens_per_msg = max_tokens_per_msg
-        self.messages: List[Dict[str, str]] = []
+        self.summarizer = summarizer
+        self.messages: Deque[Message] = deque(maxlen=max_history * 2)  # *2 for user+assistant pairs
         self.summary: Optional[str] = None
+        self._summary_state = SummaryState()
+        self._llm_messages: Optional[List[Dict[str, str]]] = None
+        self._llm_context: Dict[bool, List[Dict[str, str]]] = {}
         self.metadata: Dict = {
             "created_at": datetime.now().isoformat(),
             "total_messages": 0
         }
+
+    def _invalidate(self):
+        self._llm_messages = None
+        self._llm_context = {}
     
     def add_message(self, role: str, content: str):
         """Add a message to conversation history."""
-        self.messages.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
+        message = Message(Role(role), content, time.time())
+        dropped = []
+        if len(self.messages) == self.messages.maxlen:
+            # Make room first so the dropped message can be summarized; with
+            # max_history=0 nothing is kept verbatim and the new message goes straight in
+            dropped.append(self.messages.popleft() if self.messages else message)
+        self.messages.append(message)
         self.metadata["total_messages"] += 1
+        self._invalidate()
         
-        # Trim if exceeds max history
-        if len(self.messages) > self.max_history * 2:  # *2 for user+assistant pairs
-            self._compress_history()
+        if dropped:
+            self._compress_history(dropped)
     
-    def _compress_history(self):
-        """Compress old messages into a summary, keep recent ones."""
-        # Keep last max_history pairs (user + assistant)
-        messages_to_keep = self.messages[-(self.max_history * 2):]
-        messages_to_compress = self.messages[:-(self.max_history * 2)]
+    def _compress_history(self, dropped: List[Message]):
+        """Fold messages that left the window into the summary."""
+        messages_to_compress = [{"role": msg.role.value, "content": msg.content} for msg in dropped]
         
-        if messages_to_compress:
+        if self.summarizer is not None:
+            first_turn = self.metadata["total_messages"] - len(self.messages) - len(dropped)
+            self.summary = self.summarizer.update(
+                self._summary_state, messages_to_compress, first_turn, self.get_messages_for_llm()
+            ) or self.summary
+        else:
             # Create simple summary of older messages
             summary_parts = []
             for msg in messages_to_compress:
@@ -49,14 +285,25 @@ class ConversationContext:
                 summary_parts.append(f"{role}: {content}...")
             
             self.summary = "Previous conversation:\n" + "\n".join(summary_parts[-6:])  # Last 6 old messages
-        
-        self.messages = messages_to_keep
+        self._invalidate()
+
+    def get_messages_for_llm(self) -> List[Dict[str, str]]:
+        """Messages in the window as role/content dicts, untruncated and without the summary.
+
+        The list is cached until the conversation changes; treat it as read-only.
+        """
+        if self._llm_messages is None:
+            self._llm_messages = [{"role": msg.role.value, "content": msg.content} for msg in self.messages]
+        return self._llm_messages
     
     def get_context_for_llm(self, include_summary: bool = True) -> List[Dict[str, str]]:
         """
         Get formatted context for LLM with optional summary.
-        Returns list of message dicts suitable for API calls.
+        Returns list of message dicts suitable for API calls (cached; treat as read-only).
         """
+        context = self._llm_context.get(include_summary)
+        if context is not None:
+            return context
         context = []
         
         # Add summary of old messages if exists
@@ -69,10 +316,11 @@ class ConversationContext:
         # Add recent messages (already trimmed)
         for msg in self.messages:
             context.append({
-                "role": msg["role"],
-                "content": self._truncate_message(msg["content"])
+                "role": msg.role.value,
+                "content": self._truncate_message(msg.content)
             })
         
+        self._llm_context[include_summary] = context
         return context
     
     def _truncate_message(self, content: str) -> str:
@@ -84,12 +332,14 @@ class ConversationContext:
     
     def get_recent_messages(self, n: int = 5) -> List[Dict[str, str]]:
         """Get last N messages for display purposes."""
-        return self.messages[-n:]
+        return [msg.to_dict() for msg in list(self.messages)[-n:]]
     
     def clear(self):
         """Clear conversation history."""
-        self.messages = []
+        self.messages.clear()
         self.summary = None
+        self._summary_state = SummaryState()
+        self._invalidate()
         self.metadata = {
             "created_at": datetime.now().isoformat(),
             "total_messages": 0
@@ -98,19 +348,34 @@ class ConversationContext:
     def to_dict(self) -> Dict:
         """Serialize context to dictionary."""
         return {
-            "messages": self.messages,
+            "messages": [msg.to_dict() for msg in self.messages],
             "summary": self.summary,
+            "summary_sentences": [list(sentence) for sentence in self._summary_state.sentences],
             "metadata": self.metadata
         }
     
     def from_dict(self, data: Dict):
         """Load context from dictionary."""
-        self.messages = data.get("messages", [])
+        messages = []
+        for msg in data.get("messages", []):
+            try:
+                messages.append(Message.from_dict(msg))
+            except (KeyError, ValueError) as e:
+                # e.g. a role this version doesn't know; the rest of the conversation still loads
+                print(f"Skipping unreadable message in saved conversation: {e}")
         self.summary = data.get("summary")
+        self._summary_state = SummaryState([tuple(sentence) for sentence in data.get("summary_sentences", [])])
         self.metadata = data.get("metadata", {
             "created_at": datetime.now().isoformat(),
-            "total_messages": len(self.messages)
+            "total_messages": len(messages)
         })
+        # Exports from before the ring buffer may hold more than fits; summarize the overflow
+        overflow = max(0, len(messages) - self.messages.maxlen)
+        self.messages.clear()
+        self.messages.extend(messages[overflow:])
+        self._invalidate()
+        if overflow:
+            self._compress_history(messages[:overflow])
     
     def get_conversation_stats(self) -> Dict:
         """Get statistics about the conversation."""
@@ -119,4 +384,4 @@ class ConversationContext:
             "messages_in_memory": len(self.messages),
             "has_summary": self.summary is not None,
             "created_at": self.metadata["created_at"]
-        }
\ No newline at end of file
+        }
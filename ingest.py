@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdf_extraction import PDFExtractor, PageRecord
+
+_DONE = object()  # end-of-stream marker passed down the queues
+
+
+class StageStats:
+    __slots__ = ("name", "unit", "items", "seconds")
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.seconds = 0.0  # time spent working, excluding waits on the other stages
+
+    def to_dict(self) -> Dict:
+        return {
+            "items": self.items,
+            "unit": self.unit,
+            "seconds": round(self.seconds, 3),
+            "per_second": round(self.items / self.seconds, 1) if self.seconds else None,
+        }
+
+
+class IngestPipeline:
+    """Ingests PDFs into a RAGKnowledgeBase as overlapping, bounded stages.
+
+        extract (process pool) -> chunk (thread) -> embed (thread) -> index (caller's thread)
+
+    Stages are connected by bounded queues, so only about
+    `queue_batches` embedding batches of chunks are in flight between
+    extraction and the index, however large the corpus; a slow stage blocks
+    the ones feeding it. Chunking (tokenizer work) runs while the previous
+    batch is being embedded, and the model releases the GIL while encoding.
+    """
+
+    def __init__(self, kb, workers: Optional[int] = None, queue_batches: int = 2):
+        """
+        Args:
+            kb: The RAGKnowledgeBase to add chunks to
+            workers: PDF extraction processes (default: one per core)
+            queue_batches: Capacity of each queue, in embedding batches
+        """
+        self.kb = kb
+        self.extractor = PDFExtractor(workers)
+        self.queue_batches = queue_batches
+        self.stats = {
+            "extract": StageStats("extract", "pages"),
+            "chunk": StageStats("chunk", "chunks"),
+            "embed": StageStats("embed", "chunks"),
+            "index": StageStats("index", "chunks"),
+        }
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up (returning False) once the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns the end marker once the pipeline is stopping."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _timed_records(self, records: Iterator[PageRecord]) -> Iterator[PageRecord]:
+        stats = self.stats["extract"]
+        while True:
+            start = time.perf_counter()
+            record = next(records, None)
+            stats.seconds += time.perf_counter() - start
+            if record is None:
+                return
+            stats.items += 1
+            yield record
+
+    def _chunk_stage(self, files: List[Tuple[str, str]], out: queue.Queue):
+        stats = self.stats["chunk"]
+        start = time.perf_counter()
+        blocked = 0.0
+        try:
+            records = self._timed_records(self.extractor.extract(files))
+            for source, group in groupby(records, key=lambda record: record[0]):
+                for chunk in self.kb.iter_chunks(((page, text) for _, page, text in group), source):
+                    stats.items += 1
+                    put_start = time.perf_counter()
+                    if not self._put(out, chunk):
+                        return
+                    blocked += time.perf_counter() - put_start
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            stats.seconds = time.perf_counter() - start - blocked - self.stats["extract"].seconds
+            self._put(out, _DONE)
+
+    def _embed_stage(self, chunks_in: queue.Queue, out: queue.Queue):
+        stats = self.stats["embed"]
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < self.kb.batch_size:
+                    chunk = self._get(chunks_in)
+                    if chunk is _DONE:
+                        done = True
+                        break
+                    batch.append(chunk)
+                if not batch:
+                    continue
+                start = time.perf_counter()
+                embeddings = self.kb.embedding_model.encode(
+                    [chunk.content for chunk in batch],
+                    batch_size=self.kb.batch_size,
+                    convert_to_numpy=True
+                )
+                for chunk, embedding in zip(batch, embeddings):
+                    chunk.embedding = embedding
+                stats.items += len(batch)
+                stats.seconds += time.perf_counter() - start
+                if not self._put(out, batch):
+                    return
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            self._put(out, _DONE)
+
+    def run(self, files: Iterable[Tuple[str, str, str]]) -> Dict:
+        """Add (pdf path, source, content hash) files; returns per-stage stats.
+
+        A source already in the knowledge base is replaced once the first chunk
+        of its new version reaches the index; it is kept as it was if no text
+        can be extracted from the new file. A file that could only be read in
+        part is indexed as far as it goes, but its hash isn't recorded, so the
+        next load tries it again.
+        """
+        files = list(files)
+        hashes = {source: content_hash for _, source, content_hash in files}
+        chunk_queue = queue.Queue(maxsize=self.queue_batches * self.kb.batch_size)
+        batch_queue = queue.Queue(maxsize=self.queue_batches)
+        # Load the model before the stages start so its load time isn't counted against them
+        self.kb.embedding_model
+
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=self._chunk_stage, args=([(path, source) for path, source, _ in files], chunk_queue),
+                name="ingest-chunk", daemon=True
+            ),
+            threading.Thread(
+                target=self._embed_stage, args=(chunk_queue, batch_queue), name="ingest-embed", daemon=True
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+
+        stats = self.stats["index"]
+        added: List[str] = []
+        try:
+            while True:
+                batch = batch_queue.get()
+                if batch is _DONE:
+                    break
+                start = time.perf_counter()
+                for chunk in batch:
+                    source = chunk.metadata['source']
+                    if source not in added:
+                        self.kb.remove_document(source)
+                        added.append(source)
+                self.kb.index_chunks(batch)
+                stats.items += len(batch)
+                stats.seconds += time.perf_counter() - start
+                if self.kb.show_progress:
+                    print(f"Indexed {stats.items} chunks")
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
+        # Batches were indexed as they came; train IVF clusters on the whole corpus
+        start = time.perf_counter()
+        self.kb.retrain_index()
+        stats.seconds += time.perf_counter() - start
+
+        for _, source, _ in files:
+            if source not in added:
+                print(f"Failed to extract text from {source}")
+            elif source in self.extractor.failed:
+                self.kb.sources.pop(source, None)
+                print(f"Added part of {source} to knowledge base; it will be read again next time")
+            else:
+                self.kb.sources[source] = hashes[source]
+                print(f"Added {source} to knowledge base")
+        if added:
+            self.kb.dirty = True
+
+        report = {name: stage.to_dict() for name, stage in self.stats.items()}
+        report["total_seconds"] = round(time.perf_counter() - started, 3)
+        return report
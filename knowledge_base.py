@@ -1,97 +1,677 @@
+import argparse
+import copy
+import glob
+import hashlib
+import json
 import os
-from typing import List, Optional
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 import numpy as np
 from sentence_transformers import SentenceTransformer
 import faiss
-import PyPDF2
 import torch  # ✅ added
 
+from cache import LRUCache, normalize_query
+from chunking import Page, StructuredChunker
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from ingest import IngestPipeline
+from pdf_extraction import extract_page_range
+from reranker import CrossEncoderReranker
+from storage import save_json, save_npy, write_atomically
+
+# Files written by RAGKnowledgeBase.save(), each through a temporary file and
+# os.replace(); the manifest goes last so a half-finished save is never
+# mistaken for a valid index.
+INDEX_FILE = "index.faiss"
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.json"
+MANIFEST_FILE = "manifest.json"
+# Bumped whenever the on-disk layout changes so stale saves get rebuilt
+FORMAT_VERSION = 3
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+DEFAULT_INDEX_PARAMS = {
+    # Build-time parameters (changing these rebuilds a saved index)
+    "nlist": 256,           # IVF: number of clusters, capped by corpus size
+    "pq_m": 48,             # IVF-PQ: sub-quantizers, must divide the embedding dimension
+    "pq_nbits": 8,          # IVF-PQ: bits per sub-quantizer code
+    "hnsw_m": 32,           # HNSW: neighbours per node
+    "ef_construction": 40,  # HNSW: candidate list size while building
+    # Query-time parameters
+    "nprobe": 16,           # IVF: clusters scanned per query
+    "ef_search": 64,        # HNSW: candidate list size per query
+}
+BUILD_PARAMS = ("nlist", "pq_m", "pq_nbits", "hnsw_m", "ef_construction")
+# faiss k-means wants roughly this many training points per centroid
+MIN_POINTS_PER_CENTROID = 39
+# Hybrid search fuses this many candidates (k * factor, at least the minimum) from each retriever
+HYBRID_CANDIDATES_FACTOR = 4
+HYBRID_MIN_CANDIDATES = 20
+# A lexical hit must contain at least this share of the query's term weight
+LEXICAL_MIN_MATCH = 0.5
+
+
+def _ivf_nlist(num_vectors: int, params: dict) -> int:
+    return min(params["nlist"], num_vectors // MIN_POINTS_PER_CENTROID)
+
+
+def can_build_index(index_type: str, num_vectors: int, params: dict) -> bool:
+    """Whether `num_vectors` is enough to train an index of `index_type`."""
+    if index_type in ("ivf_flat", "ivf_pq") and _ivf_nlist(num_vectors, params) < 2:
+        return False
+    if index_type == "ivf_pq" and num_vectors < 2 ** params["pq_nbits"]:
+        return False
+    return True
+
+
+def build_index(embeddings: np.ndarray, index_type: str, params: dict):
+    """Create and train an empty inner-product index for normalized `embeddings`.
+
+    Every index type accepts add_with_ids(). Returns (index, built_type), where
+    built_type falls back to "flat" when there are too few vectors to train.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+    if not can_build_index(index_type, len(embeddings), params):
+        index_type = "flat"
+
+    dimension = embeddings.shape[1]
+    if index_type == "flat":
+        index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = params["ef_construction"]
+        index = faiss.IndexIDMap(hnsw)
+    else:
+        nlist = _ivf_nlist(len(embeddings), params)
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(
+                quantizer, dimension, nlist, params["pq_m"], params["pq_nbits"], faiss.METRIC_INNER_PRODUCT
+            )
+        index.train(embeddings)
+
+    set_search_params(index, index_type, params["nprobe"], params["ef_search"])
+    return index, index_type
+
+
+def set_search_params(index, index_type: str, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Apply query-time tuning (IVF nprobe / HNSW efSearch) to an index built by build_index()."""
+    parameter_space = faiss.ParameterSpace()
+    if nprobe is not None and index_type in ("ivf_flat", "ivf_pq"):
+        parameter_space.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search is not None and index_type == "hnsw":
+        parameter_space.set_index_parameter(index, "efSearch", ef_search)
+
+
+def search_params(index_type: str, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Per-query overrides of set_search_params() for index.search(), or None to use the index's own."""
+    if nprobe is not None and index_type in ("ivf_flat", "ivf_pq"):
+        return faiss.SearchParametersIVF(nprobe=nprobe)
+    if ef_search is not None and index_type == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=ef_search)
+    return None
+
+
 class DocumentChunk:
     def __init__(self, content: str, metadata: dict, embedding: Optional[np.ndarray] = None):
         self.content = content
         self.metadata = metadata
         self.embedding = embedding
 
+    def lexical_text(self) -> str:
+        """Text indexed for keyword search: the content plus its section heading, so
+        "section 2.4" finds every chunk of that section."""
+        section = self.metadata.get('section')
+        return f"{section}\n{self.content}" if section else self.content
+
 class RAGKnowledgeBase:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        # ✅ Force model to load on CPU (fixes NotImplementedError on Streamlit Cloud)
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Loading embedding model on device: {device}")
-        self.embedding_model = SentenceTransformer(model_name, device=device)
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        batch_size: int = 64,
+        show_progress: bool = True,
+        index_type: str = "flat",
+        index_params: Optional[dict] = None,
+        query_cache_size: int = 1024,
+        query_cache_ttl: Optional[float] = 3600,
+        lexical_weight: float = 0.5,
+        extraction_workers: Optional[int] = None,
+        reranker: Optional[CrossEncoderReranker] = None
+    ):
+        """
+        Args:
+            lexical_weight: Share of the BM25 ranking in hybrid search, fused with
+                the dense ranking by reciprocal rank (0 = dense only, 1 = lexical only)
+            extraction_workers: Processes parsing PDFs (default: one per core)
+            reranker: Reorders search candidates before the top k are taken (None = off)
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+        self.model_name = model_name
+        self._embedding_model = None
+        self.batch_size = batch_size
+        self.show_progress = show_progress
 
-        self.chunks = []
+        self.chunks: Dict[int, DocumentChunk] = {}  # index id -> chunk
         self.index = None
-        self.chunk_size = 500
-        self.overlap = 50
+        self.index_type = index_type
+        self.index_params = {**DEFAULT_INDEX_PARAMS, **(index_params or {})}
+        self._built_index_type = None  # may be "flat" while too small to train index_type
+        self._index_mapped = False  # index is memory-mapped from disk (read-only)
+        self._next_id = 0
+        self._ids_by_source: Dict[str, List[int]] = {}
+        # In embedding-model tokens; all-MiniLM-L6-v2 ignores anything past 256
+        self.chunk_size = 200
+        self.overlap = 30
+        self.sources = {}  # source name -> hash of the content it was embedded from
+        self.dirty = False  # True when chunks changed since the last save()/load()
+        self.query_cache = LRUCache(query_cache_size, query_cache_ttl)
+        self.lexical_weight = lexical_weight
+        self.lexical_index = BM25Index()  # over the same chunk ids as the FAISS index
+        self.extraction_workers = extraction_workers
+        self._counting_tokenizer = None
+        self.reranker = reranker
+
+    @property
+    def embedding_model(self) -> SentenceTransformer:
+        # Loaded on first use so a warm start from a saved index doesn't pay for it
+        if self._embedding_model is None:
+            # ✅ Force model to load on CPU (fixes NotImplementedError on Streamlit Cloud)
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+            print(f"Loading embedding model on device: {device}")
+            self._embedding_model = SentenceTransformer(self.model_name, device=device)
+        return self._embedding_model
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def extract_pdf_pages(self, pdf_path: str) -> List[Tuple[int, str]]:
+        """(page number, text) for each page, starting at 1, extracted in this process."""
+        pages, _, error = extract_page_range(pdf_path, 0, sys.maxsize)
+        if error is not None:
+            print(f"Error reading PDF {pdf_path}: {error}")
+        return pages
 
     def extract_pdf_text(self, pdf_path: str) -> str:
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
-        except Exception as e:
-            print(f"Error reading PDF {pdf_path}: {e}")
-            return ""
+        return "".join(text + "\n" for _, text in self.extract_pdf_pages(pdf_path))
+
+    def count_tokens(self, text: str) -> int:
+        """Length of text in the embedding model's tokens (estimated if the model has no tokenizer)."""
+        if self._counting_tokenizer is None:
+            tokenizer = getattr(self.embedding_model, "tokenizer", None)
+            if tokenizer is None:
+                return (len(text.split()) * 4 + 2) // 3
+            # A copy of its own: the ingest pipeline chunks while another thread encodes,
+            # and a fast tokenizer can't be used from two threads at once
+            self._counting_tokenizer = copy.deepcopy(tokenizer)
+        return len(self._counting_tokenizer.tokenize(text))
+
+    def iter_chunks(self, pages: Iterable[Page], source: str) -> Iterator['DocumentChunk']:
+        """Chunk a document page by page along its headings and sentences, as the pages arrive."""
+        chunker = StructuredChunker(self.count_tokens, self.chunk_size, self.overlap)
+        for i, (content, metadata) in enumerate(chunker.chunk_pages(pages)):
+            yield DocumentChunk(content, {'source': source, 'chunk_id': i, **metadata})
+
+    def chunk_pages(self, pages: Iterable[Page], source: str) -> List['DocumentChunk']:
+        return list(self.iter_chunks(pages, source))
 
     def chunk_document(self, text: str, source: str) -> List['DocumentChunk']:
-        words = text.split()
-        chunks = []
-        for i in range(0, len(words), self.chunk_size - self.overlap):
-            chunk_words = words[i:i + self.chunk_size]
-            chunk_text = ' '.join(chunk_words)
-            chunk = DocumentChunk(
-                chunk_text, 
-                {'source': source, 'chunk_id': len(chunks)}
+        return self.chunk_pages([(None, text)], source)
+
+    def embed_chunks(self, chunks: List['DocumentChunk']):
+        """Encode chunks in batches of `batch_size`, storing each embedding on its chunk."""
+        total = len(chunks)
+        for start in range(0, total, self.batch_size):
+            batch = chunks[start:start + self.batch_size]
+            embeddings = self.embedding_model.encode(
+                [chunk.content for chunk in batch],
+                batch_size=self.batch_size,
+                convert_to_numpy=True
             )
-            chunks.append(chunk)
-        return chunks
-
-    def add_document(self, text: str, source: str):
-        chunks = self.chunk_document(text, source)
-        for chunk in chunks:
-            embedding = self.embedding_model.encode([chunk.content])
-            chunk.embedding = embedding[0]
-        self.chunks.extend(chunks)
-        self._rebuild_index()
-
-    def add_pdf_document(self, pdf_path: str, source_name: str):
-        text = self.extract_pdf_text(pdf_path)
-        if text.strip():
-            self.add_document(text, source_name)
-            print(f"Added {source_name} to knowledge base")
+            for chunk, embedding in zip(batch, embeddings):
+                chunk.embedding = embedding
+            if self.show_progress:
+                print(f"Embedded {start + len(batch)}/{total} chunks")
+
+    def add_documents(self, documents: List[Tuple[Union[str, List[Page]], str, Optional[str]]]):
+        """Add (text, source, content_hash) documents, embedding all their chunks together.
+
+        `text` is either a string or a list of (page number, text) pages, which
+        records page numbers in the chunk metadata. A source that is already in
+        the knowledge base is replaced.
+        """
+        for _, source, _ in documents:
+            if source in self.sources:
+                self.remove_document(source)
+
+        chunks = []
+        for text, source, _ in documents:
+            pages = [(None, text)] if isinstance(text, str) else text
+            chunks.extend(self.chunk_pages(pages, source))
+        self.embed_chunks(chunks)
+        self.index_chunks(chunks)
+        for text, source, content_hash in documents:
+            if content_hash is None:
+                full_text = text if isinstance(text, str) else "\n".join(page for _, page in text)
+                content_hash = hashlib.sha256(full_text.encode('utf-8')).hexdigest()
+            self.sources[source] = content_hash
+        self.dirty = True
+
+    def add_document(self, text: str, source: str, content_hash: Optional[str] = None):
+        self.add_documents([(text, source, content_hash)])
+
+    def add_pdf_document(self, pdf_path: str, source_name: str, content_hash: Optional[str] = None):
+        self.add_pdf_files([(pdf_path, source_name, content_hash or self.file_hash(pdf_path))])
+
+    def add_pdf_files(self, files: List[Tuple[str, str, str]]) -> Dict:
+        """Add (pdf path, source, content hash) files through the streaming ingest pipeline.
+
+        A source already in the knowledge base is replaced, unless no text could
+        be extracted from its new file. Returns per-stage throughput stats.
+        """
+        return IngestPipeline(self, self.extraction_workers).run(files)
+
+    def replace_document(self, text: str, source: str, content_hash: Optional[str] = None):
+        self.add_documents([(text, source, content_hash)])
+
+    def remove_document(self, source: str) -> int:
+        """Remove every chunk of `source` from the index. Returns the number removed."""
+        ids = self._ids_by_source.pop(source, [])
+        self.sources.pop(source, None)
+        if not ids:
+            return 0
+        self._ensure_writable()
+        for chunk_id in ids:
+            del self.chunks[chunk_id]
+            self.lexical_index.remove(chunk_id)
+        if self._built_index_type == "hnsw":
+            # HNSW graphs don't support deletion, so rebuild from what remains
+            self._rebuild_index()
         else:
-            print(f"Failed to extract text from {source_name}")
+            self.index.remove_ids(np.array(ids, dtype='int64'))
+        self.dirty = True
+        return len(ids)
+
+    @staticmethod
+    def _normalized(chunks: List['DocumentChunk']) -> np.ndarray:
+        embeddings = np.array([chunk.embedding for chunk in chunks], dtype='float32')
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def index_chunks(self, chunks: List['DocumentChunk']):
+        """Append chunks to the live index under fresh ids, without touching existing vectors."""
+        if not chunks:
+            return
+        embeddings = self._normalized(chunks)
+        ids = np.arange(self._next_id, self._next_id + len(chunks), dtype='int64')
+        self._next_id += len(chunks)
+
+        self._ensure_writable()
+        if self.index is None:
+            self.index, self._built_index_type = build_index(embeddings, self.index_type, self.index_params)
+        self.index.add_with_ids(embeddings, ids)
+
+        for chunk_id, chunk in zip(ids.tolist(), chunks):
+            self.chunks[chunk_id] = chunk
+            self._ids_by_source.setdefault(chunk.metadata['source'], []).append(chunk_id)
+            self.lexical_index.add(chunk_id, chunk.lexical_text())
+
+        # Upgrade a fallback flat index once the corpus is big enough to train the real one,
+        # and retrain IVF clusters each time the corpus could use twice as many
+        if (self._built_index_type != self.index_type
+                and can_build_index(self.index_type, len(self.chunks), self.index_params)):
+            self._rebuild_index()
+        elif self._is_ivf() and self._ivf_nlist_target() >= 2 * self._ivf_nlist_built():
+            self._rebuild_index()
+
+    def _is_ivf(self) -> bool:
+        return self.index is not None and self._built_index_type in ("ivf_flat", "ivf_pq")
+
+    def _ivf_nlist_built(self) -> int:
+        return faiss.extract_index_ivf(self.index).nlist
+
+    def _ivf_nlist_target(self) -> int:
+        """Cluster count a fresh IVF build would use now."""
+        return _ivf_nlist(len(self.chunks), self.index_params)
+
+    def retrain_index(self):
+        """Retrain IVF clusters if the corpus has grown since they were trained.
+
+        Incremental adds only retrain when the ideal cluster count doubles, so bulk
+        loads call this at the end to get the clustering a one-shot build would give.
+        """
+        if self._is_ivf() and self._ivf_nlist_target() > self._ivf_nlist_built():
+            self._rebuild_index()
+
+    def _ensure_writable(self):
+        # A memory-mapped index can't be modified in place; rebuild it in memory
+        # from the stored embeddings the first time it needs to change.
+        if self._index_mapped:
+            self._rebuild_index()
 
     def _rebuild_index(self):
+        self._index_mapped = False
         if not self.chunks:
+            self.index = None
             return
-        embeddings = np.array([chunk.embedding for chunk in self.chunks])
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
+        ids = np.array(list(self.chunks.keys()), dtype='int64')
+        embeddings = self._normalized(list(self.chunks.values()))
+        self.index, self._built_index_type = build_index(embeddings, self.index_type, self.index_params)
+        self.index.add_with_ids(embeddings, ids)
 
-    def search(self, query: str, k: int = 3, similarity_threshold: float = 0.25):
+    def search(
+        self,
+        query: str,
+        k: int = 3,
+        similarity_threshold: float = 0.25,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        lexical_weight: Optional[float] = None,
+        rerank: bool = True
+    ):
+        """Return up to k (chunk, similarity) pairs, best first.
+
+        Dense hits must score at least similarity_threshold. With a lexical weight
+        above 0, chunks matching the query's terms under BM25 (section numbers,
+        names, exact phrases) are added too, and both rankings are merged by
+        weighted reciprocal rank fusion; the returned score is still the cosine
+        similarity. With a reranker configured, the top `reranker.candidates`
+        of that ranking are reordered by it before taking k.
+
+        nprobe / ef_search override the configured IVF / HNSW search effort for this query,
+        lexical_weight the configured share of the lexical ranking; rerank=False skips the reranker.
+        """
+        if not rerank:
+            return self.retrieve(query, k, similarity_threshold, nprobe, ef_search, lexical_weight)
+        candidates = self.search_candidates(query, k, similarity_threshold, nprobe, ef_search, lexical_weight)
+        return self.rerank(query, candidates, k)
+
+    def search_candidates(
+        self,
+        query: str,
+        k: int = 3,
+        similarity_threshold: float = 0.25,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        lexical_weight: Optional[float] = None
+    ):
+        """What search() reranks: retrieve() results, as many as the reranker takes (k without one)."""
+        if self.reranker is not None:
+            k = max(k, self.reranker.candidates)
+        return self.retrieve(query, k, similarity_threshold, nprobe, ef_search, lexical_weight)
+
+    def rerank(self, query: str, candidates: List[Tuple['DocumentChunk', float]], k: int = 3):
+        """The best k of search_candidates(), reordered by the reranker if one is configured."""
+        if self.reranker is None:
+            return candidates[:k]
+        return self.reranker.rerank(query, candidates, k)
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 3,
+        similarity_threshold: float = 0.25,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        lexical_weight: Optional[float] = None
+    ):
+        """search() without the reranker: up to k (chunk, similarity) pairs in retrieval order."""
         if not self.index or not self.chunks:
             return []
-        
-        query_embedding = self.embedding_model.encode([query])
-        faiss.normalize_L2(query_embedding)
-        scores, indices = self.index.search(query_embedding, min(k, len(self.chunks)))
-        
-        results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if score >= similarity_threshold:
-                results.append((self.chunks[idx], float(score)))
-        return results
-
-    def load_pdf_folder(self, pdf_folder: str, pdf_mapping: dict):
+        if lexical_weight is None:
+            lexical_weight = self.lexical_weight
+
+        query_embedding = self.encode_query(query)
+        # Fusion needs more than k candidates from each side to rerank
+        n = k if lexical_weight <= 0 else max(k * HYBRID_CANDIDATES_FACTOR, HYBRID_MIN_CANDIDATES)
+        # Passed with the query rather than set on the index, which concurrent searches share
+        params = search_params(self._built_index_type, nprobe, ef_search)
+        scores, indices = self.index.search(query_embedding, min(n, len(self.chunks)), params=params)
+
+        similarities = {
+            int(idx): float(score)
+            for score, idx in zip(scores[0], indices[0])
+            if idx != -1 and score >= similarity_threshold
+        }
+        if lexical_weight <= 0:
+            return [(self.chunks[idx], score) for idx, score in similarities.items()]
+
+        lexical_ids = [
+            idx for idx, _ in self.lexical_index.search(query, n, min_match=LEXICAL_MIN_MATCH)
+        ]
+        missing = {idx for idx in lexical_ids if idx not in similarities}
+        if missing:
+            # Exact similarity for lexical-only hits, from the stored embeddings
+            missing_ids = list(missing)
+            embeddings = self._normalized([self.chunks[idx] for idx in missing_ids])
+            for idx, score in zip(missing_ids, (embeddings @ query_embedding[0]).tolist()):
+                similarities[idx] = float(score)
+
+        fused = reciprocal_rank_fusion(
+            [[idx for idx in similarities if idx not in missing], lexical_ids],
+            [1 - lexical_weight, lexical_weight]
+        )
+        return [(self.chunks[idx], similarities[idx]) for idx, _ in fused[:k]]
+
+    def fingerprint(self) -> str:
+        """Hash of everything that determines search results; changes whenever the content does."""
+        key = json.dumps(
+            {
+                "model_name": self.model_name,
+                "chunk_size": self.chunk_size,
+                "overlap": self.overlap,
+                "sources": self.sources
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Normalized (1, dim) query embedding, cached by normalized query text."""
+        key = normalize_query(query)
+        query_embedding = self.query_cache.get(key)
+        if query_embedding is None:
+            query_embedding = self.embedding_model.encode([query])
+            faiss.normalize_L2(query_embedding)
+            self.query_cache.put(key, query_embedding)
+        return query_embedding
+
+    def encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Normalized (n, dim) float32 embeddings for arbitrary texts (uncached)."""
+        embeddings = np.asarray(
+            self.embedding_model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True),
+            dtype=np.float32
+        ).reshape(len(texts), -1)
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def load_pdf_folder(self, pdf_folder: str, pdf_mapping: dict) -> Optional[Dict]:
+        """Add or refresh the PDFs in pdf_mapping (file name -> source name).
+
+        Returns the ingest pipeline's per-stage stats, or None if every PDF was unchanged.
+        """
+        pending = []
         for filename, source_name in pdf_mapping.items():
             path = os.path.join(pdf_folder, filename)
             if os.path.exists(path):
-                self.add_pdf_document(path, source_name)
+                content_hash = self.file_hash(path)
+                if self.sources.get(source_name) == content_hash:
+                    print(f"{source_name} unchanged, using saved index")
+                    continue
+                pending.append((path, source_name, content_hash))
             else:
                 print(f"PDF not found: {path}")
+
+        # Extract and embed every new or changed PDF in one pass; unchanged ones stay indexed
+        if pending:
+            return self.add_pdf_files(pending)
+        return None
+
+    def save(self, path: str):
+        """Persist the index, chunk store and manifest to the directory `path`.
+
+        Each file is written to a temporary name and renamed over the old one, so a
+        crash mid-save leaves the previous file intact, and processes that have
+        the old index memory-mapped keep reading the old file.
+        """
+        os.makedirs(path, exist_ok=True)
+        if self.index is not None:
+            embeddings = np.array([chunk.embedding for chunk in self.chunks.values()], dtype='float32')
+            write_atomically(os.path.join(path, EMBEDDINGS_FILE), lambda tmp: save_npy(tmp, embeddings))
+            write_atomically(os.path.join(path, INDEX_FILE), lambda tmp: faiss.write_index(self.index, tmp))
+
+        records = [
+            {"id": chunk_id, "content": chunk.content, "metadata": chunk.metadata}
+            for chunk_id, chunk in self.chunks.items()
+        ]
+        write_atomically(os.path.join(path, CHUNKS_FILE), lambda tmp: save_json(tmp, records))
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "model_name": self.model_name,
+            "chunk_size": self.chunk_size,
+            "overlap": self.overlap,
+            "index_type": self.index_type,
+            "built_index_type": self._built_index_type,
+            "index_params": self.index_params,
+            "num_chunks": len(self.chunks),
+            "sources": self.sources
+        }
+        write_atomically(os.path.join(path, MANIFEST_FILE), lambda tmp: save_json(tmp, manifest, indent=2))
+
+        self.dirty = False
+        print(f"Saved {len(self.chunks)} chunks to {path}")
+
+    def load(self, path: str) -> bool:
+        """Load a knowledge base written by save().
+
+        Returns False (leaving the knowledge base empty) when nothing usable is
+        saved at `path` or it was built with a different model or chunking.
+        Sources whose content changed since are re-embedded by load_pdf_folder.
+        """
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return False
+
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+
+            settings = (
+                manifest.get("format_version"),
+                manifest.get("model_name"),
+                manifest.get("chunk_size"),
+                manifest.get("overlap")
+            )
+            if settings != (FORMAT_VERSION, self.model_name, self.chunk_size, self.overlap):
+                print(f"Saved index in {path} uses different settings, rebuilding")
+                return False
+
+            with open(os.path.join(path, CHUNKS_FILE), 'r', encoding='utf-8') as file:
+                records = json.load(file)
+
+            index = None
+            mapped = False
+            embeddings = None
+            if records:
+                embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+                index, mapped = self._read_index(os.path.join(path, INDEX_FILE))
+            # Files from two different saves, read while a save was replacing them
+            if not len(records) == manifest.get("num_chunks") == (len(embeddings) if records else 0):
+                raise ValueError("files are from different saves")
+        except Exception as e:
+            print(f"Error loading saved index from {path}: {e}")
+            return False
+
+        self.chunks = {}
+        self._ids_by_source = {}
+        for i, record in enumerate(records):
+            chunk = DocumentChunk(record["content"], record["metadata"], embeddings[i])
+            self.chunks[record["id"]] = chunk
+            self._ids_by_source.setdefault(chunk.metadata['source'], []).append(record["id"])
+        self._next_id = max(self.chunks, default=-1) + 1
+        self.lexical_index = BM25Index()
+        self.lexical_index.add_many((chunk_id, chunk.lexical_text()) for chunk_id, chunk in self.chunks.items())
+        self.index = index
+        self._built_index_type = manifest.get("built_index_type")
+        self._index_mapped = mapped
+        self.sources = manifest.get("sources", {})
+        self.dirty = False
+
+        saved_params = manifest.get("index_params", {})
+        if (manifest.get("index_type") != self.index_type
+                or any(saved_params.get(name) != self.index_params[name] for name in BUILD_PARAMS)):
+            # Same embeddings, different index configuration: rebuild without re-embedding
+            print(f"Saved index in {path} uses a different index configuration, rebuilding it")
+            self._rebuild_index()
+            self.dirty = True
+        elif self.index is not None:
+            set_search_params(
+                self.index, self._built_index_type,
+                self.index_params["nprobe"], self.index_params["ef_search"]
+            )
+        print(f"Loaded {len(self.chunks)} chunks from {path}")
+        return True
+
+    @staticmethod
+    def _read_index(index_path: str):
+        """Returns (index, mapped), memory-mapping the index file where faiss supports it."""
+        try:
+            return faiss.read_index(index_path, faiss.IO_FLAG_MMAP), True
+        except RuntimeError:
+            # Not every index type can be memory-mapped; read it into memory instead
+            return faiss.read_index(index_path), False
+
+
+def print_ingest_stats(stats: Dict):
+    print(f"\n{'stage':<8} {'items':>8} {'busy s':>8} {'items/s':>9}")
+    for name in ("extract", "chunk", "embed", "index"):
+        stage = stats[name]
+        rate = f"{stage['per_second']:.1f}" if stage['per_second'] else "-"
+        print(f"{name:<8} {stage['items']:>8} {stage['seconds']:>8.2f} {rate:>9}  {stage['unit']}")
+    print(f"total    {stats['total_seconds']:>17.2f} s wall clock")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m knowledge_base", description="Knowledge base maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="add every PDF in a folder, each under its file name")
+    ingest.add_argument("folder")
+    ingest.add_argument("--index-folder", help="load this saved index first and save the result to it")
+    ingest.add_argument("--index-type", default="flat", choices=INDEX_TYPES)
+    ingest.add_argument("--workers", type=int, help="PDF extraction processes (default: one per core)")
+    ingest.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args(argv)
+
+    kb = RAGKnowledgeBase(
+        index_type=args.index_type,
+        batch_size=args.batch_size,
+        show_progress=False,
+        extraction_workers=args.workers
+    )
+    if args.index_folder:
+        kb.load(args.index_folder)
+    pdf_mapping = {
+        os.path.basename(path): os.path.splitext(os.path.basename(path))[0]
+        for path in sorted(glob.glob(os.path.join(args.folder, "*.pdf")))
+    }
+    if not pdf_mapping:
+        print(f"No PDFs found in {args.folder}")
+        return
+    stats = kb.load_pdf_folder(args.folder, pdf_mapping)
+    if stats is not None:
+        print_ingest_stats(stats)
+    if args.index_folder and kb.dirty:
+        kb.save(args.index_folder)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import math
+import re
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Words, plus dotted numbers kept whole so "7.2" matches section 7.2 rather than 7 and 2
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+(?:\.[0-9]+)*')
+# Too common to say anything about relevance; dropped from documents and queries
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it me my of on or our "
+    "the this to was we what when where which who why will with you your".split()
+)
+# Compact the postings once this fraction of indexed documents has been removed
+COMPACT_DEAD_FRACTION = 0.3
+# Document states in BM25Index._alive
+_ABSENT, _ALIVE, _REMOVED = 0, 1, 2  # removed = still in the postings until the next compaction
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over documents identified by small non-negative ints (KB chunk ids).
+
+    Postings are array-backed: per term, one array of doc ids and one of term
+    frequencies (4 + 2 bytes per posting instead of Python ints in lists), and
+    document lengths are a single array indexed by doc id. Queries score all
+    postings of the query terms at once with numpy. Removed documents are
+    masked out and dropped from the postings on the next compaction, which
+    also happens before a removed document's id is reused.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._term_ids: Dict[str, int] = {}
+        self._postings_docs: List[array] = []   # term id -> doc ids ('i')
+        self._postings_freqs: List[array] = []  # term id -> term frequencies ('H')
+        self._doc_lengths = array('i')          # doc id -> token count (0 = absent)
+        self._alive = bytearray()               # doc id -> _ABSENT, _ALIVE or _REMOVED
+        self._num_docs = 0
+        self._total_length = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return self._num_docs
+
+    def add(self, doc_id: int, text: str):
+        tokens = tokenize(text)
+        if doc_id >= len(self._doc_lengths):
+            grow = doc_id + 1 - len(self._doc_lengths)
+            self._doc_lengths.extend([0] * grow)
+            self._alive.extend(bytes(grow))
+        elif self._alive[doc_id] == _ALIVE:
+            self.remove(doc_id)
+        if self._alive[doc_id] == _REMOVED:
+            # Its old postings would count again once the id is alive
+            self._compact()
+
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            term_id = self._term_ids.get(token)
+            if term_id is None:
+                term_id = self._term_ids[token] = len(self._postings_docs)
+                self._postings_docs.append(array('i'))
+                self._postings_freqs.append(array('H'))
+            self._postings_docs[term_id].append(doc_id)
+            self._postings_freqs[term_id].append(min(count, 65535))
+
+        self._doc_lengths[doc_id] = len(tokens)
+        self._alive[doc_id] = _ALIVE
+        self._num_docs += 1
+        self._total_length += len(tokens)
+
+    def add_many(self, documents: Iterable[Tuple[int, str]]):
+        for doc_id, text in documents:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: int):
+        if doc_id >= len(self._alive) or self._alive[doc_id] != _ALIVE:
+            return
+        self._alive[doc_id] = _REMOVED
+        self._num_docs -= 1
+        self._total_length -= self._doc_lengths[doc_id]
+        self._dead += 1
+        if self._dead > COMPACT_DEAD_FRACTION * (self._num_docs + self._dead):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the postings without removed documents."""
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8) == _ALIVE
+        term_ids: Dict[str, int] = {}
+        postings_docs: List[array] = []
+        postings_freqs: List[array] = []
+        for term, term_id in self._term_ids.items():
+            docs = np.frombuffer(self._postings_docs[term_id], dtype=np.int32)
+            keep = alive[docs]
+            if not keep.any():
+                continue
+            term_ids[term] = len(postings_docs)
+            postings_docs.append(array('i', docs[keep].tobytes()))
+            postings_freqs.append(array('H', np.frombuffer(self._postings_freqs[term_id], dtype=np.uint16)[keep].tobytes()))
+        self._term_ids = term_ids
+        self._postings_docs = postings_docs
+        self._postings_freqs = postings_freqs
+        self._alive = bytearray(alive.astype(np.uint8).tobytes())
+        self._dead = 0
+
+    def search(self, query: str, k: int = 10, min_match: float = 0.0) -> List[Tuple[int, float]]:
+        """Top-k (doc_id, bm25 score) for the query; documents sharing no term are never returned.
+
+        min_match: Fraction of the query's term weight (idf of its indexed terms)
+            a document must contain, so a single common word doesn't make a match
+        """
+        if not self._num_docs:
+            return []
+        term_ids = {self._term_ids[t] for t in tokenize(query) if t in self._term_ids}
+        if not term_ids:
+            return []
+
+        doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.int32)
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8) == _ALIVE
+        average_length = self._total_length / self._num_docs
+        scores = np.zeros(len(doc_lengths), dtype=np.float32)
+        matched = np.zeros(len(doc_lengths), dtype=np.float32) if min_match > 0 else None
+        total_idf = 0.0
+        for term_id in term_ids:
+            docs = np.frombuffer(self._postings_docs[term_id], dtype=np.int32)
+            freqs = np.frombuffer(self._postings_freqs[term_id], dtype=np.uint16).astype(np.float32)
+            if self._dead:
+                live = alive[docs]
+                docs, freqs = docs[live], freqs[live]
+            if not len(docs):
+                continue
+            idf = math.log(1 + (self._num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[docs] / average_length)
+            scores[docs] += idf * freqs * (self.k1 + 1) / (freqs + norm)
+            if matched is not None:
+                matched[docs] += idf
+                total_idf += idf
+
+        if matched is not None:
+            scores[matched < min_match * total_idf] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates]
+
+    def get_stats(self) -> Dict:
+        postings = sum(len(docs) for docs in self._postings_docs)
+        return {
+            "documents": self._num_docs,
+            "terms": len(self._term_ids),
+            "postings": postings,
+            "postings_bytes": postings * 6,
+        }
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[int]],
+    weights: List[float],
+    k: int = 60
+) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: score(id) = sum(weight / (k + rank)), rank starting at 1."""
+    fused: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        if weight <= 0:
+            continue
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
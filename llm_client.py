@@ -1,16 +1,53 @@
+import asyncio
+import importlib.util
+import time
 import requests
 import json
-from typing import Generator, Optional, List, Dict
+from typing import AsyncGenerator, Generator, Optional, List, Dict, Tuple
 
+try:
+    import httpx
+except ImportError:  # only needed for AsyncGroqClient
+    httpx = None
 
-class GroqClient:
-    """Optimized client for interacting with Groq's LLM API (streaming + auto-join)."""
+from request_scheduler import RequestScheduler
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+class StreamError(str):
+    """Error message yielded by a stream in place of the rest of the reply.
+
+    Streams can fail after some text was already sent, so consumers check the
+    chunk type rather than the start of the joined text.
+    """
+
+
+class BaseGroqClient:
+    """Prompt building and request/response formats shared by the sync and async clients."""
 
-    def __init__(self, api_key: str, model: str = "llama-3.1-8b-instant"):
+    # Failures are returned as text starting with one of these rather than raised
+    ERROR_PREFIXES = ("API Error", "Request timed out", "Network error", "Unexpected error", "Error:")
+    UNAVAILABLE_MESSAGE = "API Error: the assistant is temporarily unavailable. Please try again in a moment."
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "llama-3.1-8b-instant",
+        base_url: str = "https://api.groq.com/openai/v1/chat/completions",
+        scheduler: Optional[RequestScheduler] = None,
+        coalesce: bool = True
+    ):
+        """
+        Args:
+            scheduler: Rate limiting / retry / circuit breaker policy; the default retries
+                429 and 5xx responses with backoff and follows the API's rate-limit headers
+            coalesce: Share one upstream call between concurrent identical requests
+        """
         self.api_key = api_key
         self.model = model
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
-        self.session = requests.Session()
+        self.base_url = base_url
+        self.scheduler = scheduler or RequestScheduler()
+        self.coalesce = coalesce
 
         # Enhanced system identity with clear boundaries
         self.default_system_prompt = (
@@ -23,25 +60,82 @@ class GroqClient:
             "- Be conversational, friendly, and thorough in your responses"
         )
 
-    def _post_request(self, messages, temperature: float, max_tokens: int, stream: bool):
-        """Helper for making POST requests (streaming or non-streaming)."""
-        return self.session.post(
-            self.base_url,
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "stream": stream,
-            },
-            stream=stream,
-            timeout=15,
+    @classmethod
+    def is_error(cls, response: str) -> bool:
+        """Check whether a generated response is actually an error message."""
+        return response.startswith(cls.ERROR_PREFIXES)
+
+    @staticmethod
+    def _join_stream(parts: List[str]) -> str:
+        """The streamed reply, or just the error if the stream failed partway."""
+        error = next((part for part in parts if isinstance(part, StreamError)), None)
+        return error if error is not None else "".join(parts)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _payload(self, messages, temperature: float, max_tokens: int, stream: bool) -> Dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
+    def _request_key(self, messages, temperature: float, max_tokens: int, stream: bool) -> tuple:
+        """Identity of a request for coalescing: the exact messages sent plus sampling settings."""
+        return (
+            tuple((message["role"], message["content"]) for message in messages),
+            self.model,
+            temperature,
+            max_tokens,
+            stream,
+        )
+
+    def get_metrics(self) -> Dict:
+        """Request, retry, throttling, circuit breaker and coalescing counters."""
+        metrics = self.scheduler.get_metrics()
+        if self.single_flight is not None:
+            metrics["coalesced"] = self.single_flight.get_stats()["coalesced"]
+        return metrics
+
+    def _record_usage(self, messages, max_tokens: int, usage: Optional[Dict]):
+        self.scheduler.record_usage(
+            self.scheduler.estimate_tokens(messages, max_tokens),
+            (usage or {}).get("total_tokens")
         )
 
+    def _record_stream_usage(self, messages, max_tokens: int, usage: Optional[Dict], streamed: int):
+        """Credit back a stream's unused estimate, counting the streamed text when the API sent no usage."""
+        if usage is None:
+            # Also reached when the reader stops early: nothing past what was streamed is generated
+            usage = {"total_tokens": self.scheduler.estimate_tokens(messages, 0) + streamed // 4}
+        self._record_usage(messages, max_tokens, usage)
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Tuple[bool, str, Optional[Dict]]:
+        """Parse one server-sent-events line into (done, content, usage).
+
+        Usage comes with the last chunk only: Groq puts it under "x_groq",
+        OpenAI-compatible servers at the top level.
+        """
+        if not line or not line.startswith("data: "):
+            return False, "", None
+        chunk = line[len("data: "):]
+        if chunk == "[DONE]":
+            return True, "", None
+        try:
+            delta = json.loads(chunk)
+            usage = delta.get("usage") or (delta.get("x_groq") or {}).get("usage")
+            choices = delta.get("choices") or [{}]
+            return False, choices[0].get("delta", {}).get("content", "") or "", usage
+        except Exception:
+            return False, "", None
+
     def _build_messages(
         self,
         user_prompt: str,
@@ -65,6 +159,81 @@ class GroqClient:
         
         return messages
 
+    def fixed_prompt_texts(self, query: str, with_context: bool) -> List[str]:
+        """Texts sent for a question regardless of KB context and history, for token budgeting."""
+        return [self.default_system_prompt, self._build_rag_prompt(query, "") if with_context else query]
+
+    def _build_rag_prompt(self, query: str, context: str) -> str:
+        """Wrap the user's question with retrieved knowledge base context and answer instructions."""
+        return f"""You are Shopify's expert support AI. Answer the user's question thoroughly and accurately.
+
+Knowledge Base Context:
+{context}
+
+User Question: {query}
+
+Instructions:
+- Use the context above as your primary source, but supplement with your general Shopify knowledge
+- Provide complete, detailed answers - explain policies, features, and processes clearly
+- DO NOT just refer users to "official documentation" or "Shopify's website" - give them the actual answer
+- If the question is about order tracking, order status, or processing refunds, respond: "For order-specific actions like tracking details or processing refunds, please use our Order Management tool available in the main menu. I'm here to answer general questions about Shopify policies and services!"
+- For off-topic questions (weather, sports, etc.), politely redirect: "I'm here to help with Shopify-related questions. How can I assist you with your store, policies, or services?"
+- Be friendly, conversational, and helpful
+- Provide actionable information when possible
+
+Answer:"""
+
+
+class GroqClient(BaseGroqClient):
+    """Optimized client for interacting with Groq's LLM API (streaming + auto-join)."""
+
+    def __init__(self, api_key: str, model: str = "llama-3.1-8b-instant", **kwargs):
+        super().__init__(api_key, model, **kwargs)
+        self.session = requests.Session()
+        self.single_flight = SingleFlight() if self.coalesce else None
+
+    def _post_request(self, messages, temperature: float, max_tokens: int, stream: bool):
+        """Helper for making POST requests (streaming or non-streaming)."""
+        return self.session.post(
+            self.base_url,
+            headers=self._headers(),
+            json=self._payload(messages, temperature, max_tokens, stream),
+            stream=stream,
+            timeout=15,
+        )
+
+    def _send(self, messages, temperature: float, max_tokens: int, stream: bool):
+        """POST through the scheduler: wait for quota, retry 429/5xx and network errors.
+
+        Returns the final response (possibly still an error status), or None when
+        the circuit breaker is open. Network errors are re-raised once retries run out.
+        """
+        estimated_tokens = self.scheduler.estimate_tokens(messages, max_tokens)
+        attempt = 0
+        while True:
+            if not self.scheduler.allow_request():
+                return None
+            time.sleep(self.scheduler.acquire(estimated_tokens))
+            try:
+                response = self._post_request(messages, temperature, max_tokens, stream)
+            except requests.exceptions.RequestException:
+                self.scheduler.observe_network_error()
+                self.scheduler.release(estimated_tokens)
+                if not self.scheduler.should_retry(attempt):
+                    raise
+                delay = self.scheduler.retry_delay(attempt)
+            else:
+                self.scheduler.observe(response.status_code, response.headers)
+                # Only a 200 consumes tokens; its real usage is recorded once it is read
+                if response.status_code != 200:
+                    self.scheduler.release(estimated_tokens)
+                if not self.scheduler.should_retry(attempt, response.status_code):
+                    return response
+                response.close()
+                delay = self.scheduler.retry_delay(attempt, response.headers)
+            attempt += 1
+            time.sleep(delay)
+
     def generate_stream(
         self,
         user_prompt: str,
@@ -75,27 +244,39 @@ class GroqClient:
     ) -> Generator[str, None, None]:
         """Stream a response (yields chunks)."""
         messages = self._build_messages(user_prompt, system_prompt, conversation_history)
+        if self.single_flight is None:
+            return self._stream(messages, temperature, max_tokens)
+        return self.single_flight.stream(
+            self._request_key(messages, temperature, max_tokens, stream=True),
+            lambda: self._stream(messages, temperature, max_tokens)
+        )
 
+    def _stream(self, messages, temperature: float, max_tokens: int) -> Generator[str, None, None]:
+        """Yield the reply's text chunks; a failure is yielded as a final StreamError."""
         try:
-            with self._post_request(messages, temperature, max_tokens, stream=True) as response:
+            response = self._send(messages, temperature, max_tokens, stream=True)
+            if response is None:
+                yield StreamError(self.UNAVAILABLE_MESSAGE)
+                return
+            with response:
                 if response.status_code != 200:
-                    yield f"API Error {response.status_code}: {response.text}"
+                    yield StreamError(f"API Error {response.status_code}: {response.text}")
                     return
 
-                for line in response.iter_lines():
-                    if line and line.startswith(b"data: "):
-                        chunk = line[len(b"data: ") :].decode("utf-8")
-                        if chunk == "[DONE]":
+                usage, streamed = None, 0
+                try:
+                    for line in response.iter_lines():
+                        done, content, line_usage = self._parse_stream_line(line.decode("utf-8"))
+                        usage = line_usage or usage
+                        if done:
                             break
-                        try:
-                            delta = json.loads(chunk)
-                            content = delta["choices"][0]["delta"].get("content", "")
-                            if content:
-                                yield content
-                        except Exception:
-                            continue
+                        if content:
+                            streamed += len(content)
+                            yield content
+                finally:
+                    self._record_stream_usage(messages, max_tokens, usage, streamed)
         except Exception as e:
-            yield f"Error: {str(e)}"
+            yield StreamError(f"Error: {str(e)}")
 
     def generate(
         self,
@@ -107,11 +288,22 @@ class GroqClient:
     ) -> str:
         """Generate a full response (blocking, returns complete string)."""
         messages = self._build_messages(user_prompt, system_prompt, conversation_history)
+        if self.single_flight is None:
+            return self._complete(messages, temperature, max_tokens)
+        return self.single_flight.do(
+            self._request_key(messages, temperature, max_tokens, stream=False),
+            lambda: self._complete(messages, temperature, max_tokens)
+        )
 
+    def _complete(self, messages, temperature: float, max_tokens: int) -> str:
         try:
-            response = self._post_request(messages, temperature, max_tokens, stream=False)
+            response = self._send(messages, temperature, max_tokens, stream=False)
+            if response is None:
+                return self.UNAVAILABLE_MESSAGE
             if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"].strip()
+                data = response.json()
+                self._record_usage(messages, max_tokens, data.get("usage"))
+                return data["choices"][0]["message"]["content"].strip()
             else:
                 return f"API Error {response.status_code}: {response.text}"
         except requests.exceptions.Timeout:
@@ -121,6 +313,22 @@ class GroqClient:
         except Exception as e:
             return f"Unexpected error: {str(e)}"
 
+    def generate_with_context_stream(
+        self,
+        query: str,
+        context: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> Generator[str, None, None]:
+        """Stream a RAG response (yields chunks as they arrive)."""
+        return self.generate_stream(
+            self._build_rag_prompt(query, context),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            conversation_history=conversation_history
+        )
+
     def generate_with_context(
         self,
         query: str,
@@ -141,33 +349,18 @@ class GroqClient:
             conversation_history: Optional conversation history for context
         
         Returns:
-            Complete response string (never a generator)
+            Complete response string (never a generator); use generate_with_context_stream
+            to consume tokens as they arrive
         """
-        prompt = f"""You are Shopify's expert support AI. Answer the user's question thoroughly and accurately.
-
-Knowledge Base Context:
-{context}
-
-User Question: {query}
-
-Instructions:
-- Use the context above as your primary source, but supplement with your general Shopify knowledge
-- Provide complete, detailed answers - explain policies, features, and processes clearly
-- DO NOT just refer users to "official documentation" or "Shopify's website" - give them the actual answer
-- If the question is about order tracking, order status, or processing refunds, respond: "For order-specific actions like tracking details or processing refunds, please use our Order Management tool available in the main menu. I'm here to answer general questions about Shopify policies and services!"
-- For off-topic questions (weather, sports, etc.), politely redirect: "I'm here to help with Shopify-related questions. How can I assist you with your store, policies, or services?"
-- Be friendly, conversational, and helpful
-- Provide actionable information when possible
-
-Answer:"""
+        prompt = self._build_rag_prompt(query, context)
 
         if stream:
-            return "".join(self.generate_stream(
+            return self._join_stream(list(self.generate_stream(
                 prompt, 
                 temperature=temperature, 
                 max_tokens=max_tokens,
                 conversation_history=conversation_history
-            ))
+            )))
         else:
             return self.generate(
                 prompt, 
@@ -175,3 +368,214 @@ Answer:"""
                 max_tokens=max_tokens,
                 conversation_history=conversation_history
             )
+
+
+class AsyncGroqClient(BaseGroqClient):
+    """asyncio client for Groq's API with a pooled, keep-alive (HTTP/2 when available) connection.
+
+    Lets one worker hold many chats in flight at once. Use as an async context
+    manager, or call aclose() when done.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "llama-3.1-8b-instant",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 15.0,
+        http2: Optional[bool] = None,
+        **kwargs
+    ):
+        """
+        Args:
+            max_connections: Upper bound on concurrent connections in the pool
+            max_keepalive_connections: Idle connections kept open for reuse
+            keepalive_expiry: Seconds an idle connection is kept open
+            timeout: Per-request timeout in seconds
+            http2: Use HTTP/2; defaults to on when the optional `h2` package is installed
+        """
+        if httpx is None:
+            raise ImportError("AsyncGroqClient requires the 'httpx' package")
+        super().__init__(api_key, model, **kwargs)
+        self.single_flight = AsyncSingleFlight() if self.coalesce else None
+        if http2 is None:
+            http2 = importlib.util.find_spec("h2") is not None
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+    async def __aenter__(self) -> "AsyncGroqClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _send(self, messages, temperature: float, max_tokens: int, stream: bool):
+        """Async counterpart of GroqClient._send; a streamed response must be aclose()d."""
+        estimated_tokens = self.scheduler.estimate_tokens(messages, max_tokens)
+        attempt = 0
+        while True:
+            if not self.scheduler.allow_request():
+                return None
+            await asyncio.sleep(self.scheduler.acquire(estimated_tokens))
+            request = self.client.build_request(
+                "POST",
+                self.base_url,
+                headers=self._headers(),
+                json=self._payload(messages, temperature, max_tokens, stream),
+            )
+            try:
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError:
+                self.scheduler.observe_network_error()
+                self.scheduler.release(estimated_tokens)
+                if not self.scheduler.should_retry(attempt):
+                    raise
+                delay = self.scheduler.retry_delay(attempt)
+            else:
+                self.scheduler.observe(response.status_code, response.headers)
+                if response.status_code != 200:
+                    self.scheduler.release(estimated_tokens)
+                if not self.scheduler.should_retry(attempt, response.status_code):
+                    return response
+                await response.aclose()
+                delay = self.scheduler.retry_delay(attempt, response.headers)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def generate_stream(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream a response (yields chunks)."""
+        messages = self._build_messages(user_prompt, system_prompt, conversation_history)
+        if self.single_flight is None:
+            return self._stream(messages, temperature, max_tokens)
+        return self.single_flight.stream(
+            self._request_key(messages, temperature, max_tokens, stream=True),
+            lambda: self._stream(messages, temperature, max_tokens)
+        )
+
+    async def _stream(self, messages, temperature: float, max_tokens: int) -> AsyncGenerator[str, None]:
+        try:
+            response = await self._send(messages, temperature, max_tokens, stream=True)
+            if response is None:
+                yield StreamError(self.UNAVAILABLE_MESSAGE)
+                return
+            try:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    yield StreamError(f"API Error {response.status_code}: {body.decode('utf-8', 'replace')}")
+                    return
+
+                usage, streamed = None, 0
+                try:
+                    async for line in response.aiter_lines():
+                        done, content, line_usage = self._parse_stream_line(line)
+                        usage = line_usage or usage
+                        if done:
+                            break
+                        if content:
+                            streamed += len(content)
+                            yield content
+                finally:
+                    self._record_stream_usage(messages, max_tokens, usage, streamed)
+            finally:
+                await response.aclose()
+        except Exception as e:
+            yield StreamError(f"Error: {str(e)}")
+
+    async def generate(
+        self,
+        user_prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """Generate a full response."""
+        messages = self._build_messages(user_prompt, system_prompt, conversation_history)
+        if self.single_flight is None:
+            return await self._complete(messages, temperature, max_tokens)
+        return await self.single_flight.do(
+            self._request_key(messages, temperature, max_tokens, stream=False),
+            lambda: self._complete(messages, temperature, max_tokens)
+        )
+
+    async def _complete(self, messages, temperature: float, max_tokens: int) -> str:
+        try:
+            response = await self._send(messages, temperature, max_tokens, stream=False)
+            if response is None:
+                return self.UNAVAILABLE_MESSAGE
+            if response.status_code == 200:
+                data = response.json()
+                self._record_usage(messages, max_tokens, data.get("usage"))
+                return data["choices"][0]["message"]["content"].strip()
+            else:
+                return f"API Error {response.status_code}: {response.text}"
+        except httpx.TimeoutException:
+            return "Request timed out. Please try again."
+        except httpx.HTTPError as e:
+            return f"Network error: {str(e)}"
+        except Exception as e:
+            return f"Unexpected error: {str(e)}"
+
+    def generate_with_context_stream(
+        self,
+        query: str,
+        context: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream a RAG response (yields chunks as they arrive)."""
+        return self.generate_stream(
+            self._build_rag_prompt(query, context),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            conversation_history=conversation_history
+        )
+
+    async def generate_with_context(
+        self,
+        query: str,
+        context: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        stream: bool = False,
+        conversation_history: Optional[List[Dict[str, str]]] = None
+    ) -> str:
+        """Generate a response using RAG context; see GroqClient.generate_with_context."""
+        prompt = self._build_rag_prompt(query, context)
+
+        if stream:
+            parts = []
+            async for content in self.generate_stream(
+                prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                conversation_history=conversation_history
+            ):
+                parts.append(content)
+            return self._join_stream(parts)
+        return await self.generate(
+            prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            conversation_history=conversation_history
+        )
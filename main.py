@@ -1,5 +1,10 @@
 from chatbot import Chatbot
-from config import GROQ_API_KEY, PDF_FOLDER, DATA_FOLDER
+from config import (
+    GROQ_API_KEY, PDF_FOLDER, DATA_FOLDER, INDEX_FOLDER, INDEX_TYPE, ORDER_BACKEND,
+    RETRIEVAL_LEXICAL_WEIGHT, RERANKER_MODEL, RERANK_CANDIDATES, RERANK_TIME_BUDGET,
+    GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, PROMPT_TOKEN_BUDGET,
+    SESSION_BACKEND, SESSION_PATH, SESSION_TTL
+)
 
 def print_header():
     print("\n" + "="*60)
@@ -59,7 +64,10 @@ def chat_mode(bot: Chatbot):
             print(f"  • Started at: {stats['created_at']}\n")
             continue
         
-        print(f"\nBot: {bot.chat(user_input)}\n")
+        print("\nBot: ", end="", flush=True)
+        for token in bot.chat_stream(user_input):
+            print(token, end="", flush=True)
+        print("\n")
 
 def order_details_mode(bot: Chatbot):
     print("\n" + "─"*60)
@@ -146,7 +154,24 @@ def view_context_stats(bot: Chatbot):
 
 def main():
     print_header()
-    bot = Chatbot(GROQ_API_KEY, PDF_FOLDER, DATA_FOLDER)
+    bot = Chatbot(
+        GROQ_API_KEY,
+        pdf_folder=PDF_FOLDER,
+        data_folder=DATA_FOLDER,
+        index_folder=INDEX_FOLDER,
+        index_type=INDEX_TYPE,
+        lexical_weight=RETRIEVAL_LEXICAL_WEIGHT,
+        reranker_model=RERANKER_MODEL,
+        rerank_candidates=RERANK_CANDIDATES,
+        rerank_time_budget=RERANK_TIME_BUDGET,
+        order_backend=ORDER_BACKEND,
+        requests_per_minute=GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute=GROQ_TOKENS_PER_MINUTE,
+        prompt_token_budget=PROMPT_TOKEN_BUDGET,
+        session_backend=SESSION_BACKEND,
+        session_path=SESSION_PATH,
+        session_ttl=SESSION_TTL
+    )
     
     print("\n✨ New Feature: I now remember our conversation!")
     print("This helps me provide more relevant and personalized responses.\n")
@@ -1,50 +1,68 @@
-import csv
-import os
-from typing import Optional, Dict
+import time
+from typing import Optional, Dict, List
+
+from order_store import create_order_store
 
 
 class OrderManager:
     """Manages order lookups, customer data, and refund processing."""
     
-    def __init__(self, data_path: str = "data/"):
+    def __init__(
+        self,
+        data_path: str = "data/",
+        backend: str = "memory",
+        reload_interval: Optional[float] = 5.0
+    ):
+        """
+        Args:
+            data_path: Folder containing the orders/customers/products/transactions CSVs
+            backend: "memory" to load the CSVs into indexed dicts, "sqlite" to query an
+                indexed SQLite import of them (see order_store)
+            reload_interval: Minimum seconds between checks for CSV changes during
+                lookups (None disables automatic reloading; reload() still works)
+        """
         self.data_path = data_path
-        self.orders = self._load_csv("orders.csv")
-        self.customers = self._load_csv("customers.csv")
-        self.products = self._load_csv("products.csv")
-        self.transactions = self._load_csv("transactions.csv")
-        
-        print(f"Loaded {len(self.orders)} orders, {len(self.customers)} customers, "
-              f"{len(self.products)} products, {len(self.transactions)} transactions")
-
-    def _load_csv(self, filename: str) -> list:
-        """Load CSV file and return list of dictionaries."""
-        try:
-            filepath = os.path.join(self.data_path, filename)
-            with open(filepath, 'r', newline='', encoding='utf-8') as file:
-                return list(csv.DictReader(file))
-        except FileNotFoundError:
-            print(f"⚠ Warning: {filename} not found in {self.data_path}")
-            return []
-
-    def _find_by_id(self, data: list, id_field: str, search_id: str):
-        """Find a record by ID in the data list."""
-        for record in data:
-            if record.get(id_field) == search_id:
-                return record
-        return None
+        self.store = create_order_store(backend, data_path)
+        self.reload_interval = reload_interval
+        self._last_reload_check = time.monotonic()
+
+        counts = self.store.counts()
+        print(f"Loaded {counts['orders']} orders, {counts['customers']} customers, "
+              f"{counts['products']} products, {counts['transactions']} transactions")
+
+    def reload(self) -> bool:
+        """Pick up new or changed order data without restarting. Returns True if anything changed."""
+        self._last_reload_check = time.monotonic()
+        changed = self.store.reload()
+        if changed:
+            counts = self.store.counts()
+            print(f"Reloaded order data: {counts['orders']} orders, {counts['transactions']} transactions")
+        return changed
+
+    def _maybe_reload(self):
+        if self.reload_interval is None:
+            return
+        if time.monotonic() - self._last_reload_check >= self.reload_interval:
+            self.reload()
+
+    def get_transactions(self, order_id: str) -> List[Dict]:
+        """All transactions recorded against an order."""
+        return self.store.get_transactions(order_id)
 
     def get_order_details(self, order_id: str) -> Optional[Dict]:
         """Retrieve complete order details including customer and product info."""
-        order = self._find_by_id(self.orders, 'id', order_id)
+        self._maybe_reload()
+        order = self.store.get_order(order_id)
         if not order:
             return None
         
-        transaction = self._find_by_id(self.transactions, 'order_id', order_id)
-        customer = self._find_by_id(
-            self.customers, 'id', transaction.get('customer_id', '')
+        transactions = self.get_transactions(order_id)
+        transaction = transactions[0] if transactions else None
+        customer = self.store.get_customer(
+            transaction.get('customer_id', '')
         ) if transaction else None
-        product = self._find_by_id(
-            self.products, 'id', transaction.get('product_id', '')
+        product = self.store.get_product(
+            transaction.get('product_id', '')
         ) if transaction else None
         
         return {
@@ -116,4 +134,5 @@ within 5-7 business days.
 
     def validate_order_exists(self, order_id: str) -> bool:
         """Check if an order ID exists in the system."""
-        return self._find_by_id(self.orders, 'id', order_id) is not None
\ No newline at end of file
+        self._maybe_reload()
+        return self.store.get_order(order_id) is not None
\ No newline at end of file
@@ -0,0 +1,434 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from storage import ThreadConnections
+
+# table name -> (CSV file, column that gets a lookup index)
+TABLES = {
+    "orders": ("orders.csv", "id"),
+    "customers": ("customers.csv", "id"),
+    "products": ("products.csv", "id"),
+    "transactions": ("transactions.csv", "order_id"),
+}
+# Tables that only ever grow by appended rows, so a reload can parse just the new ones
+APPENDABLE_TABLES = {"orders", "transactions"}
+# Tables whose key column repeats, looked up as every matching row rather than the first
+GROUPED_TABLES = {"transactions"}
+# Bytes just before the read offset, compared on reload to tell appends from rewrites
+TAIL_BYTES = 64
+
+
+class CSVTail:
+    """Streams CSV rows from a byte offset, tracking where the next read should start."""
+
+    def __init__(self, path: str, offset: int = 0, complete_only: bool = False):
+        """
+        Args:
+            path: CSV file to read
+            offset: Byte position to start from (0 = the header line)
+            complete_only: Stop at a final line without a newline, since it may still be
+                being written; it is picked up by the next read instead
+        """
+        self.path = path
+        self.offset = offset
+        self.complete_only = complete_only
+
+    def _lines(self) -> Iterator[str]:
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            for line in file:
+                if self.complete_only and not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                yield line.decode('utf-8')
+
+    def rows(self) -> Iterator[List[str]]:
+        return (row for row in csv.reader(self._lines()) if row)
+
+
+def fit_rows(rows: Iterator[List[str]], width: int) -> Iterator[List[Optional[str]]]:
+    """Pad or cut rows to the header width, as csv.DictReader tolerates ragged rows."""
+    for row in rows:
+        yield (row + [None] * (width - len(row)))[:width]
+
+
+def file_state(path: str, offset: int) -> Dict:
+    """Size/mtime of a CSV plus the read offset and the bytes just before it."""
+    stat = os.stat(path)
+    with open(path, 'rb') as file:
+        start = max(0, offset - TAIL_BYTES)
+        file.seek(start)
+        tail = file.read(offset - start)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "offset": offset, "tail": tail.hex()}
+
+
+def detect_changes(data_path: str, file_states: Dict[str, Optional[Dict]]) -> Optional[str]:
+    """Compare the CSVs with the states they were last read at.
+
+    Returns None when nothing changed, "append" when appendable tables only grew,
+    and "full" for anything else (a changed file that didn't grow, a deletion, any
+    change to customers/products).
+
+    Growing appendable files are trusted to be append-only: only the last
+    TAIL_BYTES before the read offset are compared, so an edit to earlier rows
+    made together with an append goes unnoticed until the next full load.
+    """
+    mode = None
+    for table, (filename, _) in TABLES.items():
+        path = os.path.join(data_path, filename)
+        state = file_states.get(table)
+        if not os.path.exists(path):
+            if state is not None:
+                return "full"
+            continue
+        if state is None:
+            return "full"
+
+        stat = os.stat(path)
+        if (stat.st_mtime_ns, stat.st_size) == (state["mtime_ns"], state["size"]):
+            continue
+        # An in-place edit can keep the size; without growth there is nothing to append
+        if table not in APPENDABLE_TABLES or stat.st_size <= state["size"]:
+            return "full"
+        if file_state(path, state["offset"])["tail"] != state["tail"]:
+            return "full"  # the rows just before the new ones were rewritten
+        mode = "append"
+    return mode
+
+
+class _Segment:
+    """An immutable run of rows from one table, with the index of their key column.
+
+    `grouped` indexes map each key to all of its rows in file order; the others
+    map it to its first row.
+    """
+
+    __slots__ = ("rows", "index", "grouped")
+
+    def __init__(self, rows: list, key_column: str, grouped: bool):
+        self.rows = rows
+        self.grouped = grouped
+        self.index: Dict[str, object] = {}
+        for record in rows:
+            if grouped:
+                self.index.setdefault(record.get(key_column), []).append(record)
+            else:
+                self.index.setdefault(record.get(key_column), record)
+
+    def merged(self, newer: '_Segment') -> '_Segment':
+        segment = _Segment.__new__(_Segment)
+        segment.rows = self.rows + newer.rows
+        segment.grouped = self.grouped
+        if self.grouped:
+            segment.index = dict(self.index)
+            for key, records in newer.index.items():
+                segment.index[key] = segment.index.get(key, []) + records
+        else:
+            segment.index = {**newer.index, **self.index}  # the earlier row wins
+        return segment
+
+
+class _Snapshot:
+    """One immutable generation of the in-memory tables and their indexes.
+
+    Each table is a short list of segments. Appended rows become a new segment,
+    which is merged into the one before it only once it is at least half that
+    size, so a reload copies O(log n) earlier rows per new row on average
+    rather than the whole table, and lookups check O(log n) small dicts.
+    """
+
+    def __init__(self, segments: Dict[str, Tuple[_Segment, ...]]):
+        self.segments = segments
+
+    @classmethod
+    def load(cls, tables: Dict[str, list]) -> '_Snapshot':
+        return cls({
+            table: (_Segment(rows, TABLES[table][1], table in GROUPED_TABLES),)
+            for table, rows in tables.items()
+        })
+
+    def rows(self, table: str) -> list:
+        segments = self.segments[table]
+        if len(segments) == 1:
+            return segments[0].rows
+        return [row for segment in segments for row in segment.rows]
+
+    def count(self, table: str) -> int:
+        return sum(len(segment.rows) for segment in self.segments[table])
+
+    def get(self, table: str, key: str) -> Optional[Dict]:
+        for segment in self.segments[table]:
+            record = segment.index.get(key)
+            if record is not None:
+                return record
+        return None
+
+    def get_all(self, table: str, key: str) -> List[Dict]:
+        found = [segment.index[key] for segment in self.segments[table] if key in segment.index]
+        if len(found) == 1:
+            return found[0]
+        return [record for records in found for record in records]
+
+    def extended(self, new_rows: Dict[str, list]) -> '_Snapshot':
+        """A new snapshot with rows appended, leaving this one untouched for current readers."""
+        segments = dict(self.segments)
+        for table, rows in new_rows.items():
+            if not rows:
+                continue
+            layers = list(segments[table])
+            layers.append(_Segment(rows, TABLES[table][1], table in GROUPED_TABLES))
+            while len(layers) > 1 and 2 * len(layers[-1].rows) >= len(layers[-2].rows):
+                newest = layers.pop()
+                layers[-1] = layers[-1].merged(newest)
+            segments[table] = tuple(layers)
+        return _Snapshot(segments)
+
+
+class InMemoryOrderStore:
+    """Keeps every CSV row in memory, with hash indexes for O(1) lookups.
+
+    reload() parses only rows appended to orders/transactions since the last read
+    and publishes them as a new snapshot, so concurrent lookups always see either
+    the old or the new data in full.
+    """
+
+    def __init__(self, data_path: str = "data/"):
+        self.data_path = data_path
+        self._reload_lock = threading.Lock()
+        self._file_states: Dict[str, Optional[Dict]] = {}
+        self._headers: Dict[str, List[str]] = {}
+        self._snapshot = self._load_all()
+
+    def _load_all(self) -> _Snapshot:
+        tables = {}
+        for table, (filename, _) in TABLES.items():
+            path = os.path.join(self.data_path, filename)
+            if not os.path.exists(path):
+                print(f"⚠ Warning: {filename} not found in {self.data_path}")
+                tables[table] = []
+                self._file_states[table] = None
+                continue
+            tail = CSVTail(path)
+            rows = tail.rows()
+            header = next(rows, [])
+            tables[table] = [dict(zip(header, row)) for row in rows]
+            self._headers[table] = header
+            self._file_states[table] = file_state(path, tail.offset)
+        return _Snapshot.load(tables)
+
+    def reload(self) -> bool:
+        """Pick up changes to the CSVs. Returns True if the data changed."""
+        # A reload already in progress will publish the same changes
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            mode = detect_changes(self.data_path, self._file_states)
+            if mode is None:
+                return False
+            if mode == "full":
+                self._snapshot = self._load_all()
+                return True
+
+            new_rows = {}
+            for table in APPENDABLE_TABLES:
+                path = os.path.join(self.data_path, TABLES[table][0])
+                tail = CSVTail(path, self._file_states[table]["offset"], complete_only=True)
+                header = self._headers[table]
+                new_rows[table] = [dict(zip(header, row)) for row in tail.rows()]
+                self._file_states[table] = file_state(path, tail.offset)
+            self._snapshot = self._snapshot.extended(new_rows)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def orders(self) -> list:
+        return self._snapshot.rows("orders")
+
+    @property
+    def customers(self) -> list:
+        return self._snapshot.rows("customers")
+
+    @property
+    def products(self) -> list:
+        return self._snapshot.rows("products")
+
+    @property
+    def transactions(self) -> list:
+        return self._snapshot.rows("transactions")
+
+    def get_order(self, order_id: str) -> Optional[Dict]:
+        return self._snapshot.get("orders", order_id)
+
+    def get_customer(self, customer_id: str) -> Optional[Dict]:
+        return self._snapshot.get("customers", customer_id)
+
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        return self._snapshot.get("products", product_id)
+
+    def get_transactions(self, order_id: str) -> List[Dict]:
+        return self._snapshot.get_all("transactions", order_id)
+
+    def counts(self) -> Dict[str, int]:
+        return {table: self._snapshot.count(table) for table in self._snapshot.segments}
+
+
+class SQLiteOrderStore:
+    """Serves lookups from an indexed SQLite copy of the CSVs.
+
+    The database is kept in sync with the CSVs it was built from, so startup cost
+    and resident memory don't grow with order history. reload() appends only new
+    orders/transactions rows and re-imports everything for any other change, each
+    in a single transaction that readers (in WAL mode) see all at once. Values are
+    kept as text, exactly as read from the CSVs.
+    """
+
+    def __init__(self, data_path: str = "data/", db_path: Optional[str] = None):
+        self.data_path = data_path
+        self.db_path = db_path or os.path.join(data_path, "orders.db")
+        self._connections = ThreadConnections(self._read_conn)
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def _write_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _file_states(self) -> Optional[Dict[str, Optional[Dict]]]:
+        if not os.path.exists(self.db_path):
+            return None
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute("SELECT name, state FROM source_files").fetchall()
+        except sqlite3.Error:
+            return None
+        return {name: json.loads(state) if state else None for name, state in rows}
+
+    def reload(self) -> bool:
+        """Pick up changes to the CSVs. Returns True if the data changed."""
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            file_states = self._file_states()
+            mode = "full" if file_states is None else detect_changes(self.data_path, file_states)
+            if mode is None:
+                return False
+            if mode == "full":
+                self.import_csvs()
+            else:
+                self._append_rows(file_states)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def import_csvs(self):
+        """Rebuild every table from the CSVs in one transaction."""
+        conn = self._write_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in list(TABLES) + ["source_files", "row_counts"]:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute("CREATE TABLE source_files (name TEXT PRIMARY KEY, state TEXT)")
+            conn.execute("CREATE TABLE row_counts (name TEXT PRIMARY KEY, count INTEGER)")
+            for table, (filename, key_column) in TABLES.items():
+                state, count = self._import_table(conn, table, filename, key_column)
+                conn.execute("INSERT INTO source_files VALUES (?, ?)", (table, json.dumps(state)))
+                conn.execute("INSERT INTO row_counts VALUES (?, ?)", (table, count))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _import_table(self, conn: sqlite3.Connection, table: str, filename: str, key_column: str):
+        path = os.path.join(self.data_path, filename)
+        if not os.path.exists(path):
+            print(f"⚠ Warning: {filename} not found in {self.data_path}")
+            conn.execute(f'CREATE TABLE {table} ("{key_column}" TEXT)')
+            return None, 0
+
+        tail = CSVTail(path)
+        rows = tail.rows()
+        header = next(rows, [key_column])
+        columns = ", ".join(f'"{column}" TEXT' for column in header)
+        conn.execute(f"CREATE TABLE {table} ({columns})")
+        placeholders = ", ".join("?" for _ in header)
+        count = conn.executemany(
+            f"INSERT INTO {table} VALUES ({placeholders})", fit_rows(rows, len(header))
+        ).rowcount
+        conn.execute(f'CREATE INDEX idx_{table}_{key_column} ON {table} ("{key_column}")')
+        return file_state(path, tail.offset), count
+
+    def _append_rows(self, file_states: Dict[str, Optional[Dict]]):
+        conn = self._write_conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for table in APPENDABLE_TABLES:
+                path = os.path.join(self.data_path, TABLES[table][0])
+                tail = CSVTail(path, file_states[table]["offset"], complete_only=True)
+                width = len(conn.execute(f"SELECT * FROM {table} LIMIT 0").description)
+                placeholders = ", ".join("?" for _ in range(width))
+                count = conn.executemany(
+                    f"INSERT INTO {table} VALUES ({placeholders})", fit_rows(tail.rows(), width)
+                ).rowcount
+                conn.execute(
+                    "UPDATE source_files SET state = ? WHERE name = ?",
+                    (json.dumps(file_state(path, tail.offset)), table)
+                )
+                conn.execute("UPDATE row_counts SET count = count + ? WHERE name = ?", (max(count, 0), table))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _read_conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _fetch_one(self, sql: str, value: str) -> Optional[Dict]:
+        row = self._conn.execute(sql, (value,)).fetchone()
+        return dict(row) if row else None
+
+    # Constant SQL text, so sqlite's per-connection statement cache reuses the prepared statements
+    def get_order(self, order_id: str) -> Optional[Dict]:
+        return self._fetch_one("SELECT * FROM orders WHERE id = ? ORDER BY rowid LIMIT 1", order_id)
+
+    def get_customer(self, customer_id: str) -> Optional[Dict]:
+        return self._fetch_one("SELECT * FROM customers WHERE id = ? ORDER BY rowid LIMIT 1", customer_id)
+
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        return self._fetch_one("SELECT * FROM products WHERE id = ? ORDER BY rowid LIMIT 1", product_id)
+
+    def get_transactions(self, order_id: str) -> List[Dict]:
+        rows = self._conn.execute(
+            "SELECT * FROM transactions WHERE order_id = ? ORDER BY rowid", (order_id,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT name, count FROM row_counts").fetchall())
+
+
+STORE_BACKENDS = {
+    "memory": InMemoryOrderStore,
+    "sqlite": SQLiteOrderStore,
+}
+
+
+def create_order_store(backend: str = "memory", data_path: str = "data/"):
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown order store backend '{backend}', expected one of {tuple(STORE_BACKENDS)}")
+    return STORE_BACKENDS[backend](data_path)
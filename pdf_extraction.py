@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+import PyPDF2
+
+# Pages per worker task: big PDFs are split so their pages are parsed on several cores
+PAGES_PER_TASK = 8
+# Workers are started lazily, mid-run, from a process that has other threads (the
+# ingest pipeline's embedder, the Streamlit server); forking it then can hang on
+# locks held by those threads, so they come from a clean forkserver process instead,
+# or are spawned where there is no forkserver (Windows)
+WORKER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# (source, page number starting at 1, text)
+PageRecord = Tuple[str, int, str]
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> Tuple[List[Tuple[int, str]], Optional[int], Optional[str]]:
+    """Text of pages [start, stop) (0-based) as [(page number, text)], the PDF's page count
+    (None if it couldn't be opened) and an error message if reading failed.
+
+    Runs in worker processes, so it only takes and returns picklable values.
+    """
+    pages, num_pages = [], None
+    try:
+        with open(pdf_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            num_pages = len(reader.pages)
+            for index in range(start, min(stop, num_pages)):
+                pages.append((index + 1, reader.pages[index].extract_text() or ""))
+    except Exception as e:
+        return pages, num_pages, str(e)
+    return pages, num_pages, None
+
+
+class _Range:
+    """One page range of a file, in output order; `future` is set once it is submitted."""
+
+    __slots__ = ("pdf_path", "source", "start", "stop", "future")
+
+    def __init__(self, pdf_path: str, source: str, start: int, stop: int):
+        self.pdf_path = pdf_path
+        self.source = source
+        self.start = start
+        self.stop = stop
+        self.future = None
+
+
+class PDFExtractor:
+    """Extracts text from many PDFs in parallel, page ranges spread over a process pool.
+
+    Records come out in order (file by file, page by page) as soon as the
+    ranges before them are done, so the chunker can start on the first
+    pages while later ones are still being parsed. At most `max_pending`
+    page ranges are in flight, which bounds the text held in memory.
+
+    A file's first range also reports its page count, so no separate pass
+    opens every file before extraction starts; the rest of a file's ranges
+    are submitted once that first range is done. Sources that could only be
+    read in part are listed in `failed` after extract() finishes.
+    """
+
+    def __init__(self, workers: Optional[int] = None, pages_per_task: int = PAGES_PER_TASK,
+                 max_pending: Optional[int] = None):
+        """
+        Args:
+            workers: Worker processes (default: one per core; 1 extracts in this process)
+            pages_per_task: Pages each task parses
+            max_pending: Page ranges submitted ahead of the consumer (default: 2 per worker)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_pending = max_pending or 2 * self.workers
+        self.failed: Set[str] = set()
+
+    def extract(self, files: Iterable[Tuple[str, str]]) -> Iterator[PageRecord]:
+        """Yield (source, page, text) for every page of the given (pdf path, source) files."""
+        self.failed = set()
+        if self.workers <= 1:
+            for pdf_path, source in files:
+                pages, _, error = extract_page_range(pdf_path, 0, sys.maxsize)
+                yield from self._records(pdf_path, source, pages, error)
+            return
+
+        pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD))
+        files = iter(files)
+        ranges = deque()  # in output order; submitted ones first, except a file's later ranges
+        in_flight = 0
+        try:
+            while True:
+                for task in ranges:
+                    if in_flight >= self.max_pending:
+                        break
+                    if task.future is None:
+                        task.future = pool.submit(extract_page_range, task.pdf_path, task.start, task.stop)
+                        in_flight += 1
+                while in_flight < self.max_pending:
+                    file = next(files, None)
+                    if file is None:
+                        break
+                    task = _Range(file[0], file[1], 0, self.pages_per_task)
+                    task.future = pool.submit(extract_page_range, task.pdf_path, task.start, task.stop)
+                    ranges.append(task)
+                    in_flight += 1
+                if not ranges:
+                    return
+
+                task = ranges.popleft()
+                in_flight -= 1
+                pages, num_pages, error = task.future.result()
+                if task.start == 0 and num_pages is not None:
+                    # The rest of this file goes ahead of the files submitted after its first range
+                    ranges.extendleft(reversed([
+                        _Range(task.pdf_path, task.source, start, start + self.pages_per_task)
+                        for start in range(task.stop, num_pages, self.pages_per_task)
+                    ]))
+                yield from self._records(task.pdf_path, task.source, pages, error)
+        finally:
+            # Also reached when the consumer stops early: drop the ranges nobody will read
+            pool.shutdown(cancel_futures=True)
+
+    def _records(self, pdf_path: str, source: str, pages: List[Tuple[int, str]], error: Optional[str]):
+        if error is not None:
+            print(f"Error reading PDF {pdf_path}: {error}")
+            self.failed.add(source)
+        for page_number, text in pages:
+            yield source, page_number, text
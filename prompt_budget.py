@@ -0,0 +1,180 @@
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # falls back to a character-based estimate
+    tiktoken = None
+
+from cache import LRUCache
+
+# Llama 3 uses a tiktoken BPE whose first 100k merges are cl100k_base, so counts
+# match closely for the Groq-hosted Llama models
+TIKTOKEN_ENCODINGS = {
+    "llama-3": "cl100k_base",
+    "llama3": "cl100k_base",
+}
+DEFAULT_ENCODING = "cl100k_base"
+
+# Chat formatting adds a few tokens per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = "... [truncated]"
+# Don't bother including a trimmed item with less room than this
+MIN_USEFUL_TOKENS = 32
+
+
+class Tokenizer:
+    """Counts and truncates text in the configured model's tokens.
+
+    Uses tiktoken when it is installed, otherwise estimates 4 characters per token.
+    Counts are cached since the same KB chunks are counted again on every query.
+    """
+
+    def __init__(self, model: str = "llama-3.1-8b-instant", cache_size: int = 4096):
+        self.model = model
+        self.encoding = None
+        if tiktoken is not None:
+            name = next(
+                (encoding for prefix, encoding in TIKTOKEN_ENCODINGS.items() if model.startswith(prefix)),
+                DEFAULT_ENCODING
+            )
+            try:
+                self.encoding = tiktoken.get_encoding(name)
+            except Exception as e:
+                print(f"Could not load tokenizer '{name}' ({e}); estimating token counts")
+        else:
+            print("tiktoken not installed; estimating token counts from characters")
+        self._counts = LRUCache(cache_size)
+        self._marker_tokens = self.count(TRUNCATION_MARKER)
+
+    def count(self, text: str) -> int:
+        cached = self._counts.get(text)
+        if cached is not None:
+            return cached
+        if self.encoding is not None:
+            n = len(self.encoding.encode(text, disallowed_special=()))
+        else:
+            n = (len(text) + 3) // 4
+        self._counts.put(text, n)
+        return n
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens (marker included); unchanged if it fits."""
+        if self.count(text) <= max_tokens:
+            return text
+        keep = max(0, max_tokens - self._marker_tokens)
+        if self.encoding is not None:
+            head = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:keep])
+        else:
+            head = text[:keep * 4]
+        return head + TRUNCATION_MARKER
+
+
+class PromptBuilder:
+    """Fits knowledge base chunks, conversation summary and history into a token budget.
+
+    The system prompt and question are always sent, so callers must reject a
+    question that doesn't fit on its own (see fits()); what remains is filled in
+    priority order:
+        1. the top-ranked KB chunk
+        2. the last exchange (most recent user + assistant messages)
+        3. the remaining KB chunks, by rank
+        4. the summary of older conversation
+        5. older history messages, newest first
+    Items that don't fit are truncated if a useful amount of room is left,
+    otherwise skipped; older history stops at the first message that doesn't fit
+    so what is sent stays contiguous.
+    """
+
+    def __init__(
+        self,
+        tokenizer: Tokenizer,
+        max_prompt_tokens: int = 3000,
+        max_chunk_tokens: int = 800,
+        max_message_tokens: int = 200
+    ):
+        """
+        Args:
+            tokenizer: Token counter for the target model
+            max_prompt_tokens: Budget for everything sent to the model (excluding the reply)
+            max_chunk_tokens: Cap on any single KB chunk
+            max_message_tokens: Cap on any single history message
+        """
+        self.tokenizer = tokenizer
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_message_tokens = max_message_tokens
+
+    def fixed_tokens(self, fixed_texts: List[str]) -> int:
+        return sum(self.tokenizer.count(text) + MESSAGE_OVERHEAD_TOKENS for text in fixed_texts)
+
+    def fits(self, fixed_texts: List[str]) -> bool:
+        """Whether the texts always sent leave room for at least a useful amount of context."""
+        return self.fixed_tokens(fixed_texts) + MIN_USEFUL_TOKENS <= self.max_prompt_tokens
+
+    def fit(
+        self,
+        fixed_texts: List[str],
+        chunks: List[str],
+        history: List[Dict[str, str]],
+        summary: Optional[str] = None
+    ) -> Tuple[List[str], List[Dict[str, str]], int]:
+        """Choose what to send.
+
+        Args:
+            fixed_texts: Texts always sent (system prompt, prompt template with the question)
+            chunks: Retrieved chunk texts, best first
+            history: Earlier messages, oldest first (not including the current question)
+            summary: Summary of messages older than `history`
+
+        Returns:
+            (chunks to send in rank order, history messages to send including the
+            summary as a leading system message, total prompt tokens)
+        """
+        count = self.tokenizer.count
+        used = self.fixed_tokens(fixed_texts)
+
+        def take(text: str, overhead: int, cap: Optional[int] = None) -> Optional[str]:
+            nonlocal used
+            room = self.max_prompt_tokens - used - overhead
+            if cap is not None:
+                room = min(room, cap)
+            if count(text) > room:
+                if room < MIN_USEFUL_TOKENS:
+                    return None
+                text = self.tokenizer.truncate(text, room)
+            used += count(text) + overhead
+            return text
+
+        last_exchange = list(range(len(history)))[-2:]
+        order = []
+        if chunks:
+            order.append(("chunk", 0))
+        order += [("message", i) for i in reversed(last_exchange)]
+        order += [("chunk", i) for i in range(1, len(chunks))]
+        if summary:
+            order.append(("summary", 0))
+        order += [("message", i) for i in reversed(range(len(history) - len(last_exchange)))]
+
+        kept_chunks: Dict[int, str] = {}
+        kept_messages: Dict[int, Dict[str, str]] = {}
+        kept_summary = None
+        history_full = False
+        for kind, i in order:
+            if kind == "chunk":
+                text = take(chunks[i], 1, self.max_chunk_tokens)  # joined with newlines
+                if text is not None:
+                    kept_chunks[i] = text
+            elif kind == "message":
+                if history_full:
+                    continue
+                text = take(history[i]["content"], MESSAGE_OVERHEAD_TOKENS, self.max_message_tokens)
+                if text is not None:
+                    kept_messages[i] = {"role": history[i]["role"], "content": text}
+                elif i not in last_exchange:
+                    history_full = True
+            else:
+                kept_summary = take(summary, MESSAGE_OVERHEAD_TOKENS)
+
+        messages = [{"role": "system", "content": kept_summary}] if kept_summary else []
+        messages += [kept_messages[i] for i in sorted(kept_messages)]
+        return [kept_chunks[i] for i in sorted(kept_chunks)], messages, used
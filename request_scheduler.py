@@ -0,0 +1,252 @@
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional
+
+# Statuses worth retrying: rate limited, or a transient server-side failure
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Groq reports reset times like "2m59.56s", "7.66s" or "120ms"
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse a rate-limit reset duration ("1m30s", "250ms", "12") into seconds."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds from now."""
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    if seconds is not None:
+        return max(0.0, seconds)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` tokens a minute.
+
+    reserve() debits immediately and returns how long the caller must wait, so
+    concurrent callers queue up behind each other instead of all retrying at once.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens; returns the seconds to wait before they are really available."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def credit(self, amount: float):
+        """Return over-reserved tokens (e.g. when actual usage was below the estimate)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class CircuitBreaker:
+    """Stops sending requests after repeated failures, then lets a single trial through.
+
+    closed -> open after `failure_threshold` consecutive failures; open -> half-open
+    once `reset_timeout` seconds have passed; half-open -> closed on success, or
+    back to open on failure. A trial that never reports (cancelled, or its caller
+    gave up) expires after `reset_timeout`, and another one is let through.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                self._trial_started = now
+                return True
+            if self.state == "half-open" and now - self._trial_started >= self.reset_timeout:
+                self._trial_started = now
+                return True
+            # Open, or half-open with a trial request still in flight
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RequestScheduler:
+    """Rate limiting, retry policy and circuit breaking for LLM API requests.
+
+    The client drives the loop; the scheduler decides how long to wait before each
+    attempt, whether a response should be retried and after what delay, and keeps
+    counters for monitoring. Shared by sync and async clients alike (it never sleeps
+    itself).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        """
+        Args:
+            requests_per_minute: Local request quota (None = only follow the API's headers)
+            tokens_per_minute: Local token quota, charged with an estimate per request
+            max_retries: Retries after the first attempt for 429/5xx and network errors
+            base_delay: First backoff delay in seconds, doubled on each retry
+            max_delay: Upper bound on any single backoff delay
+            failure_threshold: Consecutive failures before the circuit opens
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._paused_until = 0.0  # set when the API says a quota is exhausted
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, float] = {
+            "requests": 0,
+            "successes": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "network_errors": 0,
+            "circuit_rejections": 0,
+            "throttle_wait_seconds": 0.0,
+        }
+
+    def _count(self, name: str, amount: float = 1):
+        with self._lock:
+            self.metrics[name] += amount
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Rough prompt + completion token count for quota accounting (~4 chars per token)."""
+        return sum(len(message.get("content", "")) for message in messages) // 4 + max_tokens
+
+    def allow_request(self) -> bool:
+        if self.breaker.allow():
+            return True
+        self._count("circuit_rejections")
+        return False
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Reserve quota for one request; returns seconds to wait before sending it."""
+        waits = [max(0.0, self._paused_until - time.monotonic())]
+        if self.request_bucket:
+            waits.append(self.request_bucket.reserve(1))
+        if self.token_bucket:
+            waits.append(self.token_bucket.reserve(estimated_tokens))
+        wait = max(waits)
+        self._count("requests")
+        self._count("throttle_wait_seconds", wait)
+        return wait
+
+    def release(self, estimated_tokens: int):
+        """Give back the reservation of an attempt that got no completion (retried, or not a 200)."""
+        if self.token_bucket:
+            self.token_bucket.credit(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Give back the part of the token estimate a completed request didn't use."""
+        if self.token_bucket and actual_tokens is not None and actual_tokens < estimated_tokens:
+            self.token_bucket.credit(estimated_tokens - actual_tokens)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]):
+        """Update breaker, counters and quota pauses from an API response."""
+        if status_code == 429:
+            self._count("rate_limited")
+        elif status_code >= 500:
+            self._count("server_errors")
+
+        if status_code in RETRYABLE_STATUS_CODES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            if status_code == 200:
+                self._count("successes")
+
+        # Pause everyone, not just this caller, until an exhausted quota resets
+        for kind in ("requests", "tokens"):
+            if headers.get(f"x-ratelimit-remaining-{kind}") == "0":
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    with self._lock:
+                        self._paused_until = max(self._paused_until, time.monotonic() + reset)
+
+    def observe_network_error(self):
+        self._count("network_errors")
+        self.breaker.record_failure()
+
+    def should_retry(self, attempt: int, status_code: Optional[int] = None) -> bool:
+        """Whether to retry after `attempt` (0-based) failed; status None means a network error."""
+        if attempt >= self.max_retries:
+            return False
+        return status_code is None or status_code in RETRYABLE_STATUS_CODES
+
+    def retry_delay(self, attempt: int, headers: Optional[Mapping[str, str]] = None) -> float:
+        """Delay before retry number attempt + 1: the server's Retry-After, else full-jitter backoff."""
+        self._count("retries")
+        if headers is not None:
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            if retry_after is not None:
+                return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+        metrics["circuit_state"] = self.breaker.state
+        return metrics
@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import torch
+
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class CrossEncoderReranker:
+    """Reorders retrieved chunks by a cross-encoder's (query, chunk) relevance score.
+
+    Pairs are scored in batches on the CPU within a per-query time budget.
+    The model is loaded and timed when the reranker is created, and each batch
+    is cut to the pairs that the running estimate of the cost per pair says still
+    fit in the time left; candidates left unscored keep their retrieval order
+    after the scored ones, so with no time at all the dense order is returned
+    unchanged.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANKER_MODEL,
+        candidates: int = 20,
+        batch_size: int = 8,
+        time_budget: Optional[float] = 0.15,
+        min_score: Optional[float] = None,
+        max_length: int = 256
+    ):
+        """
+        Args:
+            model_name: Sentence-transformers cross-encoder to load
+            candidates: How many retrieved chunks to rerank per query
+            batch_size: Pairs scored per forward pass
+            time_budget: Seconds of scoring per query (None = always score every candidate)
+            min_score: Drop reranked chunks scoring below this (the model's logit scale)
+            max_length: Token limit per (query, chunk) pair
+        """
+        self.model_name = model_name
+        self.candidates = candidates
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.min_score = min_score
+        self.max_length = max_length
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._pair_seconds: Optional[float] = None  # moving average of scoring cost per pair
+        self._stats = {"queries": 0, "complete": 0, "partial": 0, "fallback": 0, "seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        # Pay the load and first-call costs now rather than out of a query's budget
+        self.warm_up()
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import CrossEncoder
+                device = "cuda" if torch.cuda.is_available() else "cpu"
+                print(f"Loading reranker model on device: {device}")
+                self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=device)
+            return self._model
+
+    def warm_up(self):
+        """Load the model and time one batch, so the first query's budget isn't spent on that."""
+        pairs = [("warm up", "warm up")] * self.batch_size
+        self.model.predict(pairs, batch_size=self.batch_size)  # the first call pays one-off setup costs
+        self._score(pairs, time.perf_counter(), None)
+
+    def _score(self, pairs: List[Tuple[str, str]], start: float, budget: Optional[float]) -> List[float]:
+        """Scores for a prefix of pairs: as many as fit in the budget."""
+        scores: List[float] = []
+        while len(scores) < len(pairs):
+            batch = pairs[len(scores):len(scores) + self.batch_size]
+            if budget is not None:
+                # Without an estimate there is no telling whether even one pair fits
+                if self._pair_seconds is None:
+                    break
+                fits = int((budget - (time.perf_counter() - start)) / self._pair_seconds)
+                if fits <= 0:
+                    break
+                batch = batch[:fits]
+            batch_start = time.perf_counter()
+            scores.extend(float(s) for s in self.model.predict(batch, batch_size=self.batch_size))
+            pair_seconds = (time.perf_counter() - batch_start) / len(batch)
+            self._pair_seconds = pair_seconds if self._pair_seconds is None else (
+                0.8 * self._pair_seconds + 0.2 * pair_seconds
+            )
+        return scores
+
+    def rerank(self, query: str, results: List[Tuple[object, float]], k: int) -> List[Tuple[object, float]]:
+        """The best k of (chunk, score) results, which are in retrieval order.
+
+        Returned scores are unchanged (the retrieval similarity); only the order
+        and selection change.
+        """
+        start = time.perf_counter()
+        candidates = results[:self.candidates]
+        scores = self._score([(query, chunk.content) for chunk, _ in candidates], start, self.time_budget)
+
+        scored = sorted(zip(scores, range(len(scores))), key=lambda pair: pair[0], reverse=True)
+        if self.min_score is not None:
+            scored = [(score, i) for score, i in scored if score >= self.min_score]
+        reranked = [candidates[i] for _, i in scored] + candidates[len(scores):]
+
+        with self._stats_lock:
+            self._stats["queries"] += 1
+            self._stats["seconds"] += time.perf_counter() - start
+            if len(scores) == len(candidates):
+                self._stats["complete"] += 1
+            elif scores:
+                self._stats["partial"] += 1
+            else:
+                self._stats["fallback"] += 1
+        return reranked[:k]
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        seconds = stats.pop("seconds")
+        stats["avg_ms"] = round(1000 * seconds / stats["queries"], 2) if stats["queries"] else 0.0
+        return stats
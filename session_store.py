@@ -0,0 +1,275 @@
+import json
+from abc import ABC, abstractmethod
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from context_manager import ConversationContext
+from storage import ThreadConnections
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,128}$')
+# Stores that persist sessions sweep expired ones every this many saves
+EVICT_EVERY = 100
+
+
+class SessionStore(ABC):
+    """Loads and saves ConversationContexts by session id.
+
+    Sessions idle for longer than `ttl_seconds` are evicted. Implementations:
+    InMemorySessionStore (one process), SQLiteSessionStore and
+    DirectorySessionStore (shared by every worker that can reach the file/folder).
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = 86400,
+        new_context: Callable[[], ConversationContext] = ConversationContext
+    ):
+        """
+        Args:
+            ttl_seconds: Idle time after which a session is evicted (None = keep forever)
+            new_context: Creates the empty context a stored session is loaded into
+        """
+        self.ttl_seconds = ttl_seconds
+        self.new_context = new_context
+        self._saves = 0
+
+    @staticmethod
+    def _check_id(session_id: str):
+        if not SESSION_ID_PATTERN.match(session_id):
+            raise ValueError(f"Invalid session id '{session_id}'")
+
+    def _expired(self, updated_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - updated_at >= self.ttl_seconds
+
+    def _maybe_evict(self):
+        self._saves += 1
+        if self._saves % EVICT_EVERY == 0:
+            self.evict_expired()
+
+    def _deserialize(self, data: str) -> ConversationContext:
+        context = self.new_context()
+        context.from_dict(json.loads(data))
+        return context
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[ConversationContext]:
+        """The stored context, or None if the session is unknown or expired."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, session_id: str, context: ConversationContext):
+        """Store the context and mark the session as active now."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        """Drop sessions idle for longer than the TTL; returns how many were dropped."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """Keeps live ConversationContext objects in this process, LRU-bounded with an idle TTL.
+
+    Nothing is serialized, so saving is only bookkeeping; sessions are lost on
+    restart and not visible to other workers.
+    """
+
+    def __init__(self, max_sessions: int = 10000, **kwargs):
+        """
+        Args:
+            max_sessions: Least recently used sessions are evicted beyond this count
+        """
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        # Ordered by last use, so expired sessions are always at the front
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ConversationContext]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def save(self, session_id: str, context: ConversationContext):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (context, now)
+            self._sessions.move_to_end(session_id)
+            self._evict_expired(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _evict_expired(self, now: float) -> int:
+        evicted = 0
+        while self._sessions:
+            _, (_, used_at) = next(iter(self._sessions.items()))
+            if not self._expired(used_at, now):
+                break
+            self._sessions.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            return self._evict_expired(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions as JSON rows in a SQLite database (WAL mode), shared by all local workers."""
+
+    def __init__(self, db_path: str = "sessions.db", **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self._connections = ThreadConnections(self._connect)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+            """
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def get(self, session_id: str) -> Optional[ConversationContext]:
+        row = self._conn.execute(
+            "SELECT data, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or self._expired(row[1], time.time()):
+            return None
+        return self._deserialize(row[0])
+
+    def save(self, session_id: str, context: ConversationContext):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(context.to_dict()), time.time())
+        )
+        self._maybe_evict()
+
+    def delete(self, session_id: str):
+        self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict_expired(self) -> int:
+        if self.ttl_seconds is None:
+            return 0
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE updated_at <= ?", (time.time() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class DirectorySessionStore(SessionStore):
+    """One JSON file per session in a folder (local disk or a shared mount).
+
+    Files are replaced atomically, so a reader never sees a half-written session;
+    the file's mtime is the session's last activity.
+    """
+
+    def __init__(self, path: str = "sessions/", **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, session_id: str) -> str:
+        self._check_id(session_id)
+        return os.path.join(self.path, f"{session_id}.json")
+
+    def get(self, session_id: str) -> Optional[ConversationContext]:
+        path = self._file(session_id)
+        try:
+            if self._expired(os.path.getmtime(path), time.time()):
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return self._deserialize(f.read())
+        except FileNotFoundError:
+            return None
+
+    def save(self, session_id: str, context: ConversationContext):
+        path = self._file(session_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(context.to_dict(), f)
+        os.replace(tmp_path, path)
+        self._maybe_evict()
+
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._file(session_id))
+        except FileNotFoundError:
+            pass
+
+    def evict_expired(self) -> int:
+        if self.ttl_seconds is None:
+            return 0
+        now = time.time()
+        evicted = 0
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    if self._expired(entry.stat().st_mtime, now):
+                        os.remove(entry.path)
+                        evicted += 1
+                except FileNotFoundError:
+                    pass
+        return evicted
+
+    def __len__(self) -> int:
+        with os.scandir(self.path) as entries:
+            return sum(1 for entry in entries if entry.name.endswith(".json"))
+
+
+SESSION_BACKENDS = {
+    "memory": InMemorySessionStore,
+    "sqlite": SQLiteSessionStore,
+    "directory": DirectorySessionStore,
+}
+
+
+def create_session_store(backend: str = "memory", path: Optional[str] = None, **kwargs) -> SessionStore:
+    """Build a session store; `path` is the database file (sqlite) or folder (directory)."""
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session store backend '{backend}', expected one of {tuple(SESSION_BACKENDS)}")
+    if path is not None and backend != "memory":
+        return SESSION_BACKENDS[backend](path, **kwargs)
+    return SESSION_BACKENDS[backend](**kwargs)
@@ -0,0 +1,234 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """One in-flight call and the result every waiter receives."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _SharedStream:
+    """Buffers one upstream iterator so several subscribers can each replay it.
+
+    Whichever subscriber reaches the end of the buffer pulls the next chunk, so
+    nobody depends on a particular consumer staying around.
+    """
+
+    def __init__(self, upstream: Iterator):
+        self.upstream = upstream
+        self.subscribers = 0
+        self._chunks: List = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._pull_lock = threading.Lock()
+
+    def get(self, index: int) -> Tuple[bool, object]:
+        """Return (True, chunk) for chunk `index`, or (False, None) once the stream has ended."""
+        if index == len(self._chunks) and not self._done:
+            with self._pull_lock:
+                # Another subscriber may have pulled while we waited for the lock
+                if index == len(self._chunks) and not self._done:
+                    try:
+                        self._chunks.append(next(self.upstream))
+                    except StopIteration:
+                        self._done = True
+                    except Exception as e:
+                        self._error = e
+                        self._done = True
+        if index < len(self._chunks):
+            return True, self._chunks[index]
+        if self._error is not None:
+            raise self._error
+        return False, None
+
+    def close(self):
+        """Release the upstream (e.g. its HTTP connection) if it hasn't finished."""
+        with self._pull_lock:
+            if not self._done:
+                self._done = True
+                close = getattr(self.upstream, "close", None)
+                if close:
+                    close()
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls (thread-safe).
+
+    While a call for a key is in flight, further callers with the same key wait
+    for it and receive its result instead of starting their own. Nothing is kept
+    once the call completes; this deduplicates, it does not cache.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _SharedStream] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run fn() once per key at a time; concurrent callers share its result or exception."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterator[T]]) -> Iterator[T]:
+        """Like do(), for an iterator: every concurrent caller receives every chunk of one upstream.
+
+        Callers joining late replay the chunks already produced first. A caller
+        only joins once it asks for its first chunk, so an iterator that is never
+        consumed holds nothing; one that is started must be consumed or closed.
+        """
+        with self._lock:
+            self.calls += 1
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = _SharedStream(fn())
+            else:
+                self.coalesced += 1
+            shared.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                available, chunk = shared.get(index)
+                if not available:
+                    return
+                yield chunk
+                index += 1
+        finally:
+            with self._lock:
+                shared.subscribers -= 1
+                last = shared.subscribers == 0
+                if last and self._streams.get(key) is shared:
+                    del self._streams[key]
+            if last:
+                shared.close()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._streams),
+            }
+
+
+class _AsyncSharedStream:
+    """asyncio counterpart of _SharedStream."""
+
+    def __init__(self, upstream: AsyncIterator):
+        self.upstream = upstream
+        self.subscribers = 0
+        self._chunks: List = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._pull_lock = asyncio.Lock()
+
+    async def get(self, index: int) -> Tuple[bool, object]:
+        if index == len(self._chunks) and not self._done:
+            async with self._pull_lock:
+                if index == len(self._chunks) and not self._done:
+                    try:
+                        self._chunks.append(await self.upstream.__anext__())
+                    except StopAsyncIteration:
+                        self._done = True
+                    except Exception as e:
+                        self._error = e
+                        self._done = True
+        if index < len(self._chunks):
+            return True, self._chunks[index]
+        if self._error is not None:
+            raise self._error
+        return False, None
+
+    async def close(self):
+        async with self._pull_lock:
+            if not self._done:
+                self._done = True
+                aclose = getattr(self.upstream, "aclose", None)
+                if aclose:
+                    await aclose()
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight (for use from a single event loop)."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._streams: Dict[Hashable, _AsyncSharedStream] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn() once per key at a time; concurrent callers share its result or exception."""
+        self.calls += 1
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled waiter doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Like do(), for an async iterator; see SingleFlight.stream."""
+        self.calls += 1
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _AsyncSharedStream(fn())
+        else:
+            self.coalesced += 1
+        shared.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                available, chunk = await shared.get(index)
+                if not available:
+                    return
+                yield chunk
+                index += 1
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0:
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+                await shared.close()
+
+    def get_stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
@@ -0,0 +1,50 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def write_atomically(path: str, write: Callable[[str], None]):
+    """Call write(temporary path), then rename the result over `path`.
+
+    Readers see either the old file or the new one in full, never a partial write.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def save_npy(path: str, array: np.ndarray):
+    with open(path, 'wb') as file:  # np.save(path) would append ".npy" to the temporary name
+        np.save(file, array)
+
+
+def save_json(path: str, data, indent: Optional[int] = None):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=indent)
+
+
+class ThreadConnections:
+    """One SQLite connection per thread, opened by `connect` on first use.
+
+    sqlite connections can't be shared across threads, so stores used from several
+    threads (Streamlit runs every session in its own) each get theirs from here.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]):
+        self.connect = connect
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+        return conn
@@ -1,11 +1,13 @@
 import streamlit as st
-import time
-import json
-import os
 from datetime import datetime
-from pathlib import Path
-from chatbot import Chatbot
-from config import GROQ_API_KEY, PDF_FOLDER, DATA_FOLDER
+from chat_history import ChatHistory
+from chatbot import Chatbot, ChatbotResources
+from config import (
+    GROQ_API_KEY, PDF_FOLDER, DATA_FOLDER, INDEX_FOLDER, INDEX_TYPE, ORDER_BACKEND,
+    RETRIEVAL_LEXICAL_WEIGHT, RERANKER_MODEL, RERANK_CANDIDATES, RERANK_TIME_BUDGET,
+    GROQ_REQUESTS_PER_MINUTE, GROQ_TOKENS_PER_MINUTE, PROMPT_TOKEN_BUDGET,
+    SESSION_BACKEND, SESSION_PATH, SESSION_TTL
+)
 
 st.set_page_config(
     page_title="Shopify Customer Support",
@@ -378,43 +380,69 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-CHAT_HISTORY_DIR = Path("chat_history")
-CHAT_HISTORY_DIR.mkdir(exist_ok=True)
+CHAT_HISTORY_DIR = "chat_history"
+SIDEBAR_PAGE_SIZE = 20
+
+@st.cache_resource
+def get_chat_history():
+    """Append-only transcripts plus the sidebar index, shared by all sessions"""
+    return ChatHistory(CHAT_HISTORY_DIR)
+
+def sidebar_chats(search):
+    """Chats for the sidebar and the cursor for "Show more".
 
-def load_chat_history():
-    """Load all chat sessions from files"""
-    chat_files = sorted(CHAT_HISTORY_DIR.glob("*.json"), key=os.path.getmtime, reverse=True)
-    chats = []
-    for file in chat_files:
-        try:
-            with open(file, 'r') as f:
-                chat_data = json.load(f)
-                chats.append(chat_data)
-        except Exception as e:
-            st.error(f"Error loading chat {file.name}: {e}")
-    return chats
+    The first page is re-read on every rerun, so new activity shows up; pages
+    added with "Show more" are kept in the session and not read again.
+    """
+    first_page, cursor = get_chat_history().list_sessions(limit=SIDEBAR_PAGE_SIZE, query=search or None)
+    older = st.session_state.get('history_older', [])
+    if not older:
+        return first_page, cursor
+    # A chat active since its page was loaded has moved up to the first page
+    shown = {chat['session_id'] for chat in first_page}
+    return first_page + [chat for chat in older if chat['session_id'] not in shown], st.session_state.history_cursor
+
+def show_more_chats(search, cursor):
+    page, next_cursor = get_chat_history().list_sessions(
+        limit=SIDEBAR_PAGE_SIZE, after=cursor, query=search or None
+    )
+    st.session_state.history_older = st.session_state.get('history_older', []) + page
+    st.session_state.history_cursor = next_cursor
 
-def save_chat_session(session_id, messages, mode, context_data=None):
-    """Save chat session to file with context"""
-    file_path = CHAT_HISTORY_DIR / f"{session_id}.json"
-    chat_data = {
-        "session_id": session_id,
-        "timestamp": datetime.now().isoformat(),
-        "mode": mode,
-        "messages": messages,
-        "context": context_data
-    }
-    with open(file_path, 'w') as f:
-        json.dump(chat_data, f, indent=2)
+def save_chat_messages(session_id, messages, mode=None):
+    """Append new messages to the session's transcript"""
+    get_chat_history().append_messages(session_id, messages, mode)
+
+@st.cache_resource(show_spinner="Initializing AI Assistant...")
+def get_chatbot_resources():
+    """Model, index, order store and HTTP session, built once per process and shared by all sessions"""
+    return ChatbotResources(
+        GROQ_API_KEY,
+        PDF_FOLDER,
+        DATA_FOLDER,
+        index_folder=INDEX_FOLDER,
+        index_type=INDEX_TYPE,
+        lexical_weight=RETRIEVAL_LEXICAL_WEIGHT,
+        reranker_model=RERANKER_MODEL,
+        rerank_candidates=RERANK_CANDIDATES,
+        rerank_time_budget=RERANK_TIME_BUDGET,
+        order_backend=ORDER_BACKEND,
+        requests_per_minute=GROQ_REQUESTS_PER_MINUTE,
+        tokens_per_minute=GROQ_TOKENS_PER_MINUTE,
+        prompt_token_budget=PROMPT_TOKEN_BUDGET,
+        session_backend=SESSION_BACKEND,
+        session_path=SESSION_PATH,
+        session_ttl=SESSION_TTL
+    )
 
 def initialize_session_state():
     """Initialize session state variables"""
     if 'chatbot' not in st.session_state:
-        with st.spinner("Initializing AI Assistant..."):
-            st.session_state.chatbot = Chatbot(GROQ_API_KEY, PDF_FOLDER, DATA_FOLDER)
-    
-    if 'current_session_id' not in st.session_state:
-        st.session_state.current_session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Only the conversation context is per session; it is kept in the shared session store.
+        # A visitor always starts a fresh session with a random id: stored sessions are only
+        # resumed through load_chat_session, for chats listed in this visitor's sidebar.
+        st.session_state.chatbot = Chatbot(GROQ_API_KEY, resources=get_chatbot_resources())
+        st.session_state.current_session_id = st.session_state.chatbot.session_id
     
     if 'messages' not in st.session_state:
         st.session_state.messages = []
@@ -433,37 +461,45 @@ def initialize_session_state():
 
 def new_chat():
     """Start a new chat session"""
-    st.session_state.current_session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    st.session_state.chatbot.new_session()
+    st.session_state.current_session_id = st.session_state.chatbot.session_id
     st.session_state.messages = []
     st.session_state.mode = None
     st.session_state.typing = False
     st.session_state.pending_input = None
     st.session_state.order_submenu = None
-    st.session_state.chatbot.clear_context()
 
-def load_chat_session(session_id, messages, mode, context_data=None):
+def load_chat_session(session_id):
     """Load a specific chat session with context"""
+    chat = get_chat_history().load_session(session_id)
+    if chat is None:
+        st.error("This chat is no longer available")
+        return
     st.session_state.current_session_id = session_id
-    st.session_state.messages = messages
-    st.session_state.mode = mode
+    st.session_state.messages = chat["messages"]
+    st.session_state.mode = chat["mode"]
     st.session_state.typing = False
     st.session_state.pending_input = None
     st.session_state.order_submenu = None
     
-    if context_data:
-        st.session_state.chatbot.import_context(context_data)
-    else:
-        st.session_state.chatbot.clear_context()
+    # Prefer the session store (kept current by whichever worker served the chat),
+    # falling back to rebuilding the context from the transcript
+    if st.session_state.chatbot.load_session(session_id):
+        return
+    st.session_state.chatbot.new_session(session_id)
+    st.session_state.chatbot.import_context(chat["context"] or {"messages": chat["messages"]})
 
 def delete_chat_session(session_id):
     """Delete a chat session"""
-    file_path = CHAT_HISTORY_DIR / f"{session_id}.json"
     try:
-        if file_path.exists():
-            file_path.unlink()
-            if st.session_state.current_session_id == session_id:
-                new_chat()
-            return True
+        st.session_state.chatbot.sessions.delete(session_id)
+        get_chat_history().delete_session(session_id)
+        st.session_state.history_older = [
+            chat for chat in st.session_state.get('history_older', []) if chat['session_id'] != session_id
+        ]
+        if st.session_state.current_session_id == session_id:
+            new_chat()
+        return True
     except Exception as e:
         st.error(f"Error deleting chat: {e}")
     return False
@@ -478,8 +514,8 @@ def display_typing_indicator():
     </div>
     """
 
-def render_message(message, is_user=True):
-    """Render a chat message with styling"""
+def message_html(message, is_user=True):
+    """Build the styled HTML for a chat message"""
     css_class = "user-message" if is_user else "bot-message"
     role_label = "You" if is_user else "AI Assistant"
     
@@ -489,15 +525,26 @@ def render_message(message, is_user=True):
     # Determine alignment
     style = "margin-left: auto; display: block;" if is_user else "margin-right: auto; display: block;"
     
-    st.markdown(
-        f"""
+    return f"""
         <div class="chat-message {css_class}" style="{style}">
             <strong>{role_label}:</strong><br/>
             {safe_message}
         </div>
-        """,
-        unsafe_allow_html=True
-    )
+        """
+
+def render_message(message, is_user=True):
+    """Render a chat message with styling"""
+    st.markdown(message_html(message, is_user), unsafe_allow_html=True)
+
+def stream_bot_response(user_input):
+    """Render the reply token by token as it streams in and return the full text"""
+    placeholder = st.empty()
+    placeholder.markdown(display_typing_indicator(), unsafe_allow_html=True)
+    parts = []
+    for token in st.session_state.chatbot.chat_stream(user_input):
+        parts.append(token)
+        placeholder.markdown(message_html("".join(parts), is_user=False), unsafe_allow_html=True)
+    return "".join(parts).strip()
 
 def main():
     initialize_session_state()
@@ -516,16 +563,23 @@ def main():
         st.markdown("### Chat History")
         
         # Load and display chat history
-        all_chats = load_chat_history()
+        # Only the index is read here, one page at a time; transcripts are opened when a chat is loaded
+        search = st.text_input("Search chats", key="history_search", placeholder="Search by title")
+        if search != st.session_state.get('history_search_applied'):
+            st.session_state.history_search_applied = search
+            st.session_state.history_older = []
+        all_chats, next_cursor = sidebar_chats(search)
         
         if all_chats:
             if st.button("Delete All Chats", use_container_width=True, type="secondary"):
                 if st.session_state.get('confirm_delete_all', False):
-                    for chat_file in CHAT_HISTORY_DIR.glob("*.json"):
-                        try:
-                            chat_file.unlink()
-                        except Exception as e:
-                            st.error(f"Error deleting {chat_file.name}: {e}")
+                    try:
+                        for chat in get_chat_history().list_sessions(limit=-1)[0]:
+                            st.session_state.chatbot.sessions.delete(chat['session_id'])
+                        get_chat_history().delete_all()
+                        st.session_state.history_older = []
+                    except Exception as e:
+                        st.error(f"Error deleting chats: {e}")
                     new_chat()
                     st.session_state.confirm_delete_all = False
                     st.rerun()
@@ -543,10 +597,12 @@ def main():
             
             for chat in all_chats:
                 session_id = chat['session_id']
-                timestamp = datetime.fromisoformat(chat['timestamp'])
-                message_count = len(chat['messages'])
+                timestamp = datetime.fromtimestamp(chat['updated_at'])
+                message_count = chat['message_count']
                 
                 preview_text = f"{timestamp.strftime('%b %d, %I:%M %p')}"
+                if chat['title']:
+                    preview_text = f"{chat['title']}\n{preview_text}"
                 is_active = session_id == st.session_state.current_session_id
                 
                 col1, col2 = st.columns([5, 1])
@@ -558,18 +614,20 @@ def main():
                         use_container_width=True,
                         type="primary" if is_active else "secondary"
                     ):
-                        load_chat_session(
-                            session_id, 
-                            chat['messages'], 
-                            chat.get('mode'),
-                            chat.get('context')
-                        )
+                        load_chat_session(session_id)
                         st.rerun()
                 
                 with col2:
                     if st.button("X", key=f"delete_{session_id}", help="Delete", use_container_width=True):
                         if delete_chat_session(session_id):
                             st.rerun()
+            
+            if next_cursor is not None:
+                if st.button("Show more", use_container_width=True):
+                    show_more_chats(search, next_cursor)
+                    st.rerun()
+        elif search:
+            st.info("No chats match your search")
         else:
             st.info("No chat history yet")
         
@@ -609,16 +667,12 @@ def main():
             
             if st.button("Start Chat", key="start_chat", use_container_width=True):
                 st.session_state.mode = "chat"
-                st.session_state.messages.append({
+                greeting = {
                     "role": "assistant",
                     "content": "Hello! I'm your Shopify AI assistant. I'll remember our conversation to provide better help. How can I assist you today?"
-                })
-                save_chat_session(
-                    st.session_state.current_session_id,
-                    st.session_state.messages,
-                    st.session_state.mode,
-                    st.session_state.chatbot.export_context()
-                )
+                }
+                st.session_state.messages.append(greeting)
+                save_chat_messages(st.session_state.current_session_id, [greeting], st.session_state.mode)
                 st.rerun()
         
         with col2:
@@ -831,9 +885,6 @@ def main():
             for message in st.session_state.messages:
                 is_user = message["role"] == "user"
                 render_message(message["content"], is_user)
-            
-            if st.session_state.typing:
-                st.markdown(display_typing_indicator(), unsafe_allow_html=True)
         
         # Chat input
         user_input = st.chat_input("Type your message here...")
@@ -851,27 +902,23 @@ def main():
         # Process bot response
         if st.session_state.typing:
             if st.session_state.pending_input:
-                with st.spinner(""):
-                    time.sleep(0.5)
-                    
-                    bot_response = st.session_state.chatbot.chat(st.session_state.pending_input)
-                    
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": bot_response
-                    })
-                    
-                    # Save with context
-                    save_chat_session(
-                        st.session_state.current_session_id,
-                        st.session_state.messages,
-                        st.session_state.mode,
-                        st.session_state.chatbot.export_context()
-                    )
-                    
-                    st.session_state.typing = False
-                    st.session_state.pending_input = None
-                    st.rerun()
+                with chat_container:
+                    bot_response = stream_bot_response(st.session_state.pending_input)
+                
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": bot_response
+                })
+                
+                # Append this turn; the conversation context is saved by the chatbot's session store
+                save_chat_messages(
+                    st.session_state.current_session_id,
+                    st.session_state.messages[-2:]
+                )
+                
+                st.session_state.typing = False
+                st.session_state.pending_input = None
+                st.rerun()
             else:
                 st.session_state.typing = False
                 st.rerun()
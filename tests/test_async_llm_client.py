@@ -0,0 +1,114 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from benchmarks.bench_async_llm import REPLY_TOKENS, MockServer, make_handler
+from llm_client import AsyncGroqClient, StreamError
+from request_scheduler import RequestScheduler
+
+REPLY = "".join(REPLY_TOKENS)
+
+
+def start_server(handler):
+    server = MockServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+@pytest.fixture
+def server():
+    server, base_url = start_server(make_handler(0))
+    yield server, base_url
+    server.shutdown()
+
+
+def run(base_url, chat, **kwargs):
+    async def main():
+        async with AsyncGroqClient("test-key", base_url=base_url, **kwargs) as client:
+            return await chat(client)
+    return asyncio.run(main())
+
+
+def test_generate(server):
+    _, base_url = server
+    assert run(base_url, lambda client: client.generate("question")) == REPLY
+
+
+def test_generate_stream(server):
+    _, base_url = server
+
+    async def chat(client):
+        return [token async for token in client.generate_stream("question")]
+
+    assert run(base_url, chat) == REPLY_TOKENS
+
+
+def test_generate_with_context(server):
+    _, base_url = server
+
+    async def chat(client):
+        return await asyncio.gather(
+            client.generate_with_context("question", "policy context"),
+            client.generate_with_context("question", "policy context", stream=True),
+        )
+
+    assert run(base_url, chat) == [REPLY, REPLY]
+
+
+def test_concurrent_identical_requests_are_coalesced(server):
+    mock, base_url = server
+
+    async def chat(client):
+        return await asyncio.gather(*(client.generate("question") for _ in range(5)))
+
+    assert run(base_url, chat) == [REPLY] * 5
+    assert mock.requests_served == 1
+
+
+def test_rate_limited_request_is_retried():
+    base = make_handler(0)
+
+    class RateLimitedOnceHandler(base):
+        def do_POST(self):
+            with self.server.counter_lock:
+                first = self.server.requests_served == 0
+                if first:
+                    self.server.requests_served += 1
+            if not first:
+                return super().do_POST()
+            self.rfile.read(int(self.headers["Content-Length"]))
+            payload = json.dumps({"error": "rate limited"}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server, base_url = start_server(RateLimitedOnceHandler)
+    try:
+        async def chat(client):
+            return await client.generate("question"), client.get_metrics()
+
+        scheduler = RequestScheduler(tokens_per_minute=6000, base_delay=0.01)
+        reply, metrics = run(base_url, chat, scheduler=scheduler)
+        assert reply == REPLY
+        # The rate-limited attempt's reservation was given back; the mock reports no usage
+        assert scheduler.token_bucket._tokens > 6000 - 2 * scheduler.estimate_tokens([], 1000)
+        assert server.requests_served == 2
+        assert metrics["rate_limited"] == 1 and metrics["retries"] == 1 and metrics["successes"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_failed_stream_yields_stream_error():
+    server, base_url = start_server(make_handler(0))
+    server.shutdown()
+    server.server_close()
+
+    async def chat(client):
+        return [token async for token in client.generate_stream("question")]
+
+    tokens = run(base_url, chat, scheduler=RequestScheduler(max_retries=0))
+    assert len(tokens) == 1 and isinstance(tokens[0], StreamError)
@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+
+from cache import SEMANTIC_ENTRIES_FILE, LRUCache, SemanticCache, normalize_query
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).reshape(1, -1)
+
+
+def test_normalize_query():
+    assert normalize_query("  What is the   Refund policy?? ") == "what is the refund policy"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get_stats()["hits"] == 3
+
+
+def test_lru_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(ttl_seconds=10)
+    cache.put("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_semantic_cache_threshold_and_fingerprint():
+    cache = SemanticCache(threshold=0.9)
+    cache.validate("kb-1")
+    cache.store("refund policy", unit([1, 0, 0]), "30 days")
+    assert cache.lookup(unit([1, 0.1, 0])) == "30 days"
+    assert cache.lookup(unit([0, 1, 0])) is None
+    cache.validate("kb-2")
+    assert cache.lookup(unit([1, 0, 0])) is None
+
+
+def test_semantic_cache_save_and_load(tmp_path):
+    cache = SemanticCache(path=str(tmp_path))
+    cache.validate("kb-1")
+    cache.store("refund policy", unit([1, 0, 0]), "30 days")
+    cache.save()
+    loaded = SemanticCache(path=str(tmp_path))
+    assert loaded.load()
+    assert loaded.fingerprint == "kb-1"
+    assert loaded.lookup(unit([1, 0, 0])) == "30 days"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_semantic_cache_rejects_files_from_different_saves(tmp_path):
+    cache = SemanticCache(path=str(tmp_path))
+    cache.store("refund policy", unit([1, 0, 0]), "30 days")
+    cache.store("shipping", unit([0, 1, 0]), "2 days")
+    cache.save()
+    entries_path = tmp_path / SEMANTIC_ENTRIES_FILE
+    data = json.loads(entries_path.read_text())
+    data["entries"].append({"question": "warranty", "answer": "1 year"})
+    entries_path.write_text(json.dumps(data))
+    assert not SemanticCache(path=str(tmp_path)).load()
@@ -0,0 +1,92 @@
+import json
+import threading
+
+import pytest
+
+from chat_history import TITLE_LENGTH, ChatHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ChatHistory(str(tmp_path))
+
+
+def test_append_and_load(history):
+    history.append_messages("s1", [{"role": "user", "content": "Where is my order?"},
+                                   {"role": "assistant", "content": "It shipped."}], mode="orders")
+    history.append_message("s1", "user", "Thanks")
+    session = history.load_session("s1")
+    assert session["mode"] == "orders"
+    assert [m["content"] for m in session["messages"]] == ["Where is my order?", "It shipped.", "Thanks"]
+    info = history.get_session_info("s1")
+    assert info["title"] == "Where is my order?" and info["message_count"] == 3
+    assert history.load_session("missing") is None
+
+
+def test_title_is_the_first_user_message(history):
+    history.append_message("s1", "assistant", "Hi!")
+    history.append_message("s1", "user", "x" * 100)
+    history.append_message("s1", "user", "second")
+    assert history.get_session_info("s1")["title"] == "x" * TITLE_LENGTH
+
+
+def test_list_sessions_pages_most_recent_first(history):
+    for i in range(5):
+        history.append_message(f"s{i}", "user", f"question {i}")
+    page, cursor = history.list_sessions(limit=2)
+    assert [s["session_id"] for s in page] == ["s4", "s3"]
+    page, cursor = history.list_sessions(limit=2, after=cursor)
+    assert [s["session_id"] for s in page] == ["s2", "s1"]
+    page, cursor = history.list_sessions(limit=2, after=cursor)
+    assert [s["session_id"] for s in page] == ["s0"] and cursor is None
+    assert len(history.list_sessions(limit=-1)[0]) == 5
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("REFUND", ["s1", "s0"]),
+    ("fund pol", ["s0"]),
+    ("%", ["s2"]),
+    ("o", ["s2", "s0"]),
+    ("50%", ["s2"]),
+])
+def test_title_search(history, query, expected):
+    history.append_message("s0", "user", "Refund policy")
+    history.append_message("s1", "user", "refund status")
+    history.append_message("s2", "user", "50% off coupon")
+    assert [s["session_id"] for s in history.list_sessions(query=query)[0]] == expected
+    assert history.count_sessions(query) == len(expected)
+
+
+def test_delete_removes_session_from_search(history):
+    history.append_message("s0", "user", "Refund policy")
+    history.append_message("s1", "user", "Refund status")
+    history.delete_session("s0")
+    assert [s["session_id"] for s in history.list_sessions(query="refund")[0]] == ["s1"]
+    history.delete_all()
+    assert len(history) == 0
+    assert history.load_session("s1") is None
+
+
+def test_reopening_keeps_the_title_index(tmp_path):
+    ChatHistory(str(tmp_path)).append_message("s0", "user", "Refund policy")
+    history = ChatHistory(str(tmp_path))
+    history.append_message("s1", "user", "Refund status")
+    assert history.count_sessions("refund") == 2
+
+
+def test_migrates_old_json_sessions(tmp_path):
+    (tmp_path / "old.json").write_text(json.dumps({
+        "session_id": "old", "mode": "kb",
+        "messages": [{"role": "user", "content": "Shipping times?"}],
+    }))
+    history = ChatHistory(str(tmp_path))
+    assert history.load_session("old")["messages"] == [{"role": "user", "content": "Shipping times?"}]
+    assert history.count_sessions("shipping") == 1
+    assert (tmp_path / "old.json.migrated").exists()
+
+
+def test_usable_from_several_threads(history):
+    worker = threading.Thread(target=history.append_message, args=("s1", "user", "from a worker"))
+    worker.start()
+    worker.join()
+    assert history.get_session_info("s1")["title"] == "from a worker"
@@ -0,0 +1,56 @@
+from chunking import StructuredChunker, parse_heading
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def test_parse_heading():
+    assert parse_heading("2.1 Store Owner") == ("2.1", "Store Owner")
+    assert parse_heading("7. How long we keep your information") == ("7", "How long we keep your information")
+    assert parse_heading("2021 was a good year") is None
+    assert parse_heading("3. This ends like a sentence.") is None
+
+
+def test_heading_starts_new_chunk_and_sets_section():
+    chunker = StructuredChunker(count_words)
+    chunks = list(chunker.chunk_pages([(1, "1. Intro\nFirst sentence.\n2. Next\nSecond sentence.")]))
+    assert chunks == [
+        ("1. Intro First sentence.", {"section": "1. Intro", "page": 1, "page_end": 1}),
+        ("2. Next Second sentence.", {"section": "2. Next", "page": 1, "page_end": 1}),
+    ]
+
+
+def test_sentence_across_page_break_is_kept_whole():
+    chunker = StructuredChunker(count_words)
+    chunks = list(chunker.chunk_pages([(1, "1. Intro\nA sentence that runs"), (2, "onto the next page.")]))
+    assert chunks == [("1. Intro A sentence that runs onto the next page.",
+                       {"section": "1. Intro", "page": 1, "page_end": 1})]
+
+
+def test_fragment_before_heading_on_next_page_stays_in_its_section():
+    chunker = StructuredChunker(count_words)
+    chunks = list(chunker.chunk_pages([(1, "1. Intro\nFirst line without period"), (2, "2. Next\nBody of next.")]))
+    assert chunks == [
+        ("1. Intro First line without period", {"section": "1. Intro", "page": 1, "page_end": 1}),
+        ("2. Next Body of next.", {"section": "2. Next", "page": 2, "page_end": 2}),
+    ]
+
+
+def test_overlap_counts_towards_max_tokens():
+    chunker = StructuredChunker(count_words, max_tokens=5, overlap_tokens=3)
+    chunks = [content for content, _ in chunker.chunk_pages([(1, "One two three. Four five six. Seven eight.")])]
+    assert all(count_words(content) <= 5 for content in chunks)
+    assert " ".join(chunks).endswith("Seven eight.")
+
+
+def test_overlap_repeats_trailing_sentences():
+    chunker = StructuredChunker(count_words, max_tokens=6, overlap_tokens=3)
+    chunks = [content for content, _ in chunker.chunk_pages([(1, "One two. Three four five. Six seven.")])]
+    assert chunks == ["One two. Three four five.", "Three four five. Six seven."]
+
+
+def test_long_sentence_is_split_at_word_boundaries():
+    chunker = StructuredChunker(count_words, max_tokens=4, overlap_tokens=0)
+    chunks = [content for content, _ in chunker.chunk_pages([(None, "a b c d e f g h i j.")])]
+    assert chunks == ["a b c d", "e f g h", "i j."]
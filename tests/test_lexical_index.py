@@ -0,0 +1,54 @@
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_section_numbers_and_drops_stopwords():
+    assert tokenize("What is section 7.2 of the Terms?") == ["section", "7.2", "terms"]
+
+
+def test_search_ranks_matching_documents():
+    index = BM25Index()
+    index.add_many([(0, "refund policy for orders"), (1, "shipping times"), (2, "refund refund refund")])
+    results = index.search("refund")
+    assert [doc_id for doc_id, _ in results] == [2, 0]
+    assert index.search("warranty") == []
+
+
+def test_min_match_requires_most_of_the_query():
+    index = BM25Index()
+    index.add_many([(0, "store owner account"), (1, "store hours"), (2, "unrelated text")])
+    assert [doc_id for doc_id, _ in index.search("store owner", min_match=0.9)] == [0]
+
+
+def test_remove_hides_document():
+    index = BM25Index()
+    index.add_many([(0, "refund policy"), (1, "refund window")])
+    index.remove(0)
+    assert [doc_id for doc_id, _ in index.search("refund")] == [1]
+    assert len(index) == 1
+
+
+def test_reused_id_does_not_bring_back_old_text():
+    index = BM25Index()
+    index.add_many([(i, f"filler {i}") for i in range(10)])
+    index.add(3, "refund policy")
+    index.remove(3)
+    index.add(3, "shipping times")
+    assert index.search("refund") == []
+    index.add(3, "returns window")  # replacing a live document
+    assert index.search("shipping") == []
+    assert [doc_id for doc_id, _ in index.search("returns")] == [3]
+
+
+def test_compaction_keeps_results():
+    index = BM25Index()
+    index.add_many([(i, f"term{i % 3} common") for i in range(20)])
+    for doc_id in range(0, 20, 2):
+        index.remove(doc_id)
+    assert index.get_stats()["postings"] < 40
+    assert sorted(doc_id for doc_id, _ in index.search("term1", k=20)) == [1, 7, 13, 19]
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], [0.5, 0.5])
+    assert [doc_id for doc_id, _ in fused] == [1, 3, 2]
+    assert reciprocal_rank_fusion([[1], [2]], [1.0, 0.0]) == [(1, 1.0 / 61)]
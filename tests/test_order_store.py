@@ -0,0 +1,99 @@
+import os
+
+import pytest
+
+from order_store import InMemoryOrderStore, SQLiteOrderStore, create_order_store
+
+CSVS = {
+    "orders.csv": "id,date,status\n1,2024-01-01,shipped\n2,2024-01-02,pending\n",
+    "customers.csv": "id,name\nc1,Ada\n",
+    "products.csv": "id,name\np1,Lamp\n",
+    "transactions.csv": "id,customer_id,product_id,order_id\nt1,c1,p1,1\nt2,c1,p1,1\nt3,c1,p1,2\n",
+}
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    for filename, text in CSVS.items():
+        (tmp_path / filename).write_text(text)
+    return tmp_path
+
+
+def append(path, text):
+    stat = os.stat(path)
+    with open(path, "a") as f:
+        f.write(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_lookups(data_path, backend):
+    store = create_order_store(backend, str(data_path))
+    assert store.get_order("2")["status"] == "pending"
+    assert store.get_order("3") is None
+    assert store.get_customer("c1")["name"] == "Ada"
+    assert store.get_product("p1")["name"] == "Lamp"
+    assert [t["id"] for t in store.get_transactions("1")] == ["t1", "t2"]
+    assert store.counts() == {"orders": 2, "customers": 1, "products": 1, "transactions": 3}
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_reload_picks_up_appended_rows(data_path, backend):
+    store = create_order_store(backend, str(data_path))
+    assert not store.reload()
+    append(data_path / "orders.csv", "3,2024-01-03,new\n")
+    append(data_path / "transactions.csv", "t4,c1,p1,1\nt5,c1,p1,3\n")
+    assert store.reload()
+    assert store.get_order("3")["status"] == "new"
+    assert [t["id"] for t in store.get_transactions("1")] == ["t1", "t2", "t4"]
+    assert store.counts()["transactions"] == 5
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_reload_skips_an_unfinished_last_line(data_path, backend):
+    store = create_order_store(backend, str(data_path))
+    append(data_path / "orders.csv", "3,2024-01-03,new\n4,2024-")
+    store.reload()
+    assert store.get_order("3") is not None
+    assert store.get_order("4") is None
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_reload_after_rewrite(data_path, backend):
+    store = create_order_store(backend, str(data_path))
+    (data_path / "customers.csv").write_text("id,name\nc2,Grace\n")
+    os.utime(data_path / "customers.csv", ns=(0, 10**18))
+    assert store.reload()
+    assert store.get_customer("c1") is None
+    assert store.get_customer("c2")["name"] == "Grace"
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_reload_after_same_size_edit(data_path, backend):
+    path = data_path / "orders.csv"
+    later_rows = "".join(f"{i},2024-02-01,shipped\n" for i in range(3, 13))
+    path.write_text(CSVS["orders.csv"] + later_rows)
+    store = create_order_store(backend, str(data_path))
+    stat = os.stat(path)
+    path.write_text(CSVS["orders.csv"].replace("pending", "on_hold") + later_rows)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert os.stat(path).st_size == stat.st_size
+    assert store.reload()
+    assert store.get_order("2")["status"] == "on_hold"
+
+
+def test_memory_store_matches_sqlite_after_many_appends(data_path):
+    memory = InMemoryOrderStore(str(data_path))
+    sqlite = SQLiteOrderStore(str(data_path))
+    for i in range(10):
+        append(data_path / "transactions.csv", f"x{i},c1,p1,{i % 3}\n")
+        memory.reload()
+        sqlite.reload()
+    for order_id in ["0", "1", "2"]:
+        assert memory.get_transactions(order_id) == sqlite.get_transactions(order_id)
+    assert memory.counts() == sqlite.counts()
+
+
+def test_unknown_backend(data_path):
+    with pytest.raises(ValueError):
+        create_order_store("csv", str(data_path))
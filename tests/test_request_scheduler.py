@@ -0,0 +1,95 @@
+import pytest
+
+from request_scheduler import CircuitBreaker, RequestScheduler, TokenBucket, parse_duration, parse_retry_after
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("request_scheduler.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_parse_duration():
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("12") == 12.0
+    assert parse_duration("soon") is None
+    assert parse_duration(None) is None
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+
+
+def test_token_bucket_reserve_and_credit(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0)
+    bucket.credit(2)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock[0] += 2
+    assert bucket.reserve(1) == 0.0
+
+
+def test_circuit_breaker_opens_and_recovers(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    clock[0] += 10
+    assert breaker.allow() and breaker.state == "half-open"
+    assert not breaker.allow()  # the trial is still in flight
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_circuit_breaker_lets_another_trial_through_after_a_lost_one(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    clock[0] += 5
+    assert not breaker.allow()
+    clock[0] += 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_retry_policy():
+    scheduler = RequestScheduler(max_retries=2, base_delay=1, max_delay=5)
+    assert scheduler.should_retry(0, 429)
+    assert scheduler.should_retry(1, None)
+    assert not scheduler.should_retry(0, 400)
+    assert not scheduler.should_retry(2, 503)
+    assert scheduler.retry_delay(0, {"retry-after": "30"}) == 5
+    assert 0 <= scheduler.retry_delay(3) <= 5
+    assert scheduler.get_metrics()["retries"] == 2
+
+
+def test_observe_pauses_on_exhausted_quota(clock):
+    scheduler = RequestScheduler()
+    scheduler.observe(200, {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "7.5s"})
+    assert scheduler.acquire(100) == pytest.approx(7.5)
+    scheduler.observe(429, {})
+    metrics = scheduler.get_metrics()
+    assert metrics["successes"] == 1 and metrics["rate_limited"] == 1
+
+
+def test_record_usage_returns_unused_tokens(clock):
+    scheduler = RequestScheduler(tokens_per_minute=600)
+    assert scheduler.acquire(600) == 0.0
+    scheduler.record_usage(600, 100)
+    assert scheduler.acquire(500) == 0.0
+    assert scheduler.acquire(10) > 0
+
+
+def test_release_returns_the_whole_reservation(clock):
+    scheduler = RequestScheduler(tokens_per_minute=600)
+    assert scheduler.acquire(600) == 0.0
+    scheduler.release(600)
+    assert scheduler.acquire(600) == 0.0
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from context_manager import ConversationContext
+from session_store import InMemorySessionStore, SessionStore, create_session_store
+
+
+def context_with(text):
+    context = ConversationContext()
+    context.add_message("user", text)
+    return context
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "directory"])
+def test_save_get_delete(tmp_path, backend):
+    path = None if backend == "memory" else str(tmp_path / "sessions")
+    store = create_session_store(backend, path)
+    assert store.get("abc") is None
+    store.save("abc", context_with("hello"))
+    assert store.get("abc").get_messages_for_llm()[-1]["content"] == "hello"
+    assert len(store) == 1
+    store.delete("abc")
+    assert store.get("abc") is None
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "directory"])
+def test_expired_sessions_are_hidden_and_evicted(tmp_path, backend):
+    store = create_session_store(backend, str(tmp_path / "sessions"), ttl_seconds=60)
+    store.save("old", context_with("hi"))
+    if backend == "directory":
+        os.utime(tmp_path / "sessions" / "old.json", (0, 0))
+    else:
+        store._conn.execute("UPDATE sessions SET updated_at = 0")
+    store.save("new", context_with("hi"))
+    assert store.get("old") is None
+    assert store.evict_expired() == 1
+    assert len(store) == 1
+
+
+def test_memory_store_ttl_and_lru(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("session_store.time.monotonic", lambda: now[0])
+    store = InMemorySessionStore(max_sessions=2, ttl_seconds=60)
+    store.save("a", context_with("a"))
+    store.save("b", context_with("b"))
+    store.get("a")
+    store.save("c", context_with("c"))
+    assert store.get("b") is None
+    now[0] += 60
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def test_no_ttl_keeps_sessions(tmp_path):
+    store = create_session_store("sqlite", str(tmp_path / "s.db"), ttl_seconds=None)
+    store.save("a", context_with("a"))
+    store._conn.execute("UPDATE sessions SET updated_at = 0")
+    assert store.get("a") is not None
+    assert store.evict_expired() == 0
+
+
+def test_directory_store_rejects_path_like_ids(tmp_path):
+    store = create_session_store("directory", str(tmp_path))
+    with pytest.raises(ValueError):
+        store.get("../secrets")
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+    with pytest.raises(ValueError):
+        create_session_store("redis")
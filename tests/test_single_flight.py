@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_do_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        started.set()
+        release.wait()
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("q", slow)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.append(flight.do("q", slow)))
+    follower.start()
+    while flight.get_stats()["coalesced"] == 0:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+    assert results == ["answer", "answer"]
+    assert len(runs) == 1
+    assert flight.get_stats() == {"calls": 2, "coalesced": 1, "in_flight": 0}
+
+
+def test_do_shares_exceptions_and_forgets_the_call():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        flight.do("q", fail)
+    assert flight.do("q", lambda: 1) == 1
+
+
+def test_stream_replays_chunks_to_late_subscribers():
+    flight = SingleFlight()
+    upstream_calls = []
+
+    def upstream():
+        upstream_calls.append(1)
+        yield from ["a", "b", "c"]
+
+    first = flight.stream("q", upstream)
+    assert next(first) == "a"
+    second = flight.stream("q", upstream)
+    assert list(second) == ["a", "b", "c"]
+    assert list(first) == ["b", "c"]
+    assert len(upstream_calls) == 1
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_stream_registers_only_when_consumed():
+    flight = SingleFlight()
+    unused = flight.stream("q", lambda: iter(["a"]))
+    assert flight.get_stats()["in_flight"] == 0
+    del unused
+    assert list(flight.stream("q", lambda: iter(["b"]))) == ["b"]
+
+
+def test_stream_closes_upstream_when_last_subscriber_leaves():
+    flight = SingleFlight()
+    closed = []
+
+    def upstream():
+        try:
+            yield from ["a", "b"]
+        finally:
+            closed.append(True)
+
+    stream = flight.stream("q", upstream)
+    assert next(stream) == "a"
+    stream.close()
+    assert closed == [True]
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_async_do_and_stream():
+    flight = AsyncSingleFlight()
+    runs = []
+
+    async def answer():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def chunks():
+        for chunk in ["a", "b"]:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def collect():
+        return [chunk async for chunk in flight.stream("s", chunks)]
+
+    async def main():
+        answers = await asyncio.gather(flight.do("q", answer), flight.do("q", answer))
+        streams = await asyncio.gather(collect(), collect())
+        return answers, streams
+
+    answers, streams = asyncio.run(main())
+    assert answers == ["answer", "answer"]
+    assert len(runs) == 1
+    assert streams == [["a", "b"], ["a", "b"]]
+    assert flight.get_stats() == {"calls": 4, "coalesced": 2, "in_flight": 0}